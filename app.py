@@ -1,218 +1,165 @@
 import streamlit as st
-import pymysql
 import pandas as pd
-import plotly.express as px
-import openpyxl
-from openpyxl import Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
 from io import BytesIO
-from datetime import datetime
-from db_config import MYSQL_INFO, TITLE
+from datetime import date, datetime
+from functools import partial
+from contextlib import contextmanager
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from db_config import DETAIL_PAGE_SIZE, HISTORY_INFO, METRICS_INFO, TITLE
+from data_import import EXPORT_MIME_TYPES, IMPORT_READERS, export_frame, is_valid_phone, issues_to_excel, load_subjects
+from db_pool import get_pool
+from import_jobs import FAILED, SUCCEEDED, get_import_jobs
+from parallel_load import load_concurrently
+from prefetch import get_prefetcher
+from query_metrics import cache_event_counts, query_stats, slow_queries
+from result_cache import cache_stats, catalog_cache, user_cache
+from history import downsample_history, net_worth_series
+from local_store import get_local_store, local_detail, local_trend
+from period_utils import bucket_start, history_bucket, period_dates, period_range, trend_period_ends, trend_window
+from queries import (
+    ASOF_DETAIL_SQL, DETAIL_SORTS, EXPORT_SQL, PERIOD_TOTALS_SQL, asof_trend_sql, detail_page_sql, history_sql,
+    summarize_detail, trend_sql
+)
 
 # ===================== 极简数据库连接+数据获取 =====================
-#1:连接数据库
+# 在脚本线程以外借出连接失败
+class DatabaseUnavailable(Exception):
+    pass
+
+
+#1:从连接池借出数据库连接（with get_db_conn() as conn: ...，退出时自动归还）
+@contextmanager
 def get_db_conn():
+    pool = get_pool()
     try:
-        conn = pymysql.connect(**MYSQL_INFO)
-        return conn
+        conn = pool.acquire()
     except Exception as e:
+        # 不在脚本线程中（看板加载线程、后台预取）时没有页面可显示，抛出DatabaseUnavailable由调用方处理
+        if get_script_run_ctx(suppress_warning=True) is None:
+            raise DatabaseUnavailable(f"数据库连接失败: {e}") from e
         st.error(f"数据库连接失败: {e}")
         st.stop()
-
-#2:获取核心数据
-@st.cache_data(ttl=3600)  # 缓存1小时
-def get_data(time_period_type, start_date=None, end_date=None, phone_number=None):
-    conn = get_db_conn()
-    
-    # 根据时间粒度构建查询条件
-    if time_period_type == '年度':
-        # 获取当前选中年份的所有数据
-        year = start_date[:4]
-        where_clause = f"b.record_date LIKE '{year}%%' AND b.phone_number = %s"
-    elif time_period_type == '季度':
-        # 获取当前选中季度的所有数据
-        year = start_date[:4]
-        month = int(start_date[5:7])
-        quarter = (month - 1) // 3 + 1
-        if quarter == 1:
-            where_clause = f"b.record_date BETWEEN '{year}-01-01' AND '{year}-03-31' AND b.phone_number = %s"
-        elif quarter == 2:
-            where_clause = f"b.record_date BETWEEN '{year}-04-01' AND '{year}-06-30' AND b.phone_number = %s"
-        elif quarter == 3:
-            where_clause = f"b.record_date BETWEEN '{year}-07-01' AND '{year}-09-30' AND b.phone_number = %s"
+    try:
+        yield conn
+    except BaseException:
+        pool.release(conn, failed=True)
+        raise
+    else:
+        pool.release(conn)
+
+#2:获取核心数据（每个科目一行）；as_of为True时取每个科目截至期末的最新余额（期末余额口径），否则为期间内所有记录的累计
+@user_cache("get_data", ttl=3600)  # 按用户缓存1小时
+def get_data(time_period_type, start_date=None, end_date=None, phone_number=None, as_of=False):
+    # 根据时间粒度计算半开区间 [开始日期, 结束日期)，参数化传入以便走索引范围扫描
+    period_start, period_end = period_range(time_period_type, start_date, end_date)
+    
+    # 启用本地快照缓存时在本地计算
+    local_store = get_local_store()
+    if local_store is not None:
+        df_detail = local_detail(local_store.rows(phone_number), get_all_subjects(), period_start, period_end, as_of)
+        return df_detail, summarize_detail(df_detail)
+    
+    # 只查询一次明细数据，汇总（总资产/总负债/净资产）直接由明细计算
+    with get_db_conn() as conn:
+        if as_of:
+            df_detail = pd.read_sql(ASOF_DETAIL_SQL, conn, params=(phone_number, period_end))
         else:
-            where_clause = f"b.record_date BETWEEN '{year}-10-01' AND '{year}-12-31' AND b.phone_number = %s"
-    elif time_period_type == '月度':
-        # 获取当前选中月份的所有数据
-        month = start_date[:7]
-        where_clause = f"b.record_date LIKE '{month}%%' AND b.phone_number = %s"
-    else:  # 自定义
-        where_clause = f"b.record_date BETWEEN '{start_date}' AND '{end_date}' AND b.phone_number = %s"
-    
-    # 查询明细数据
-    df_detail = pd.read_sql(f"""
-        SELECT s.subject_name, s.subject_type, COALESCE(b.current_balance, 0) AS current_balance, b.remark, b.record_date
-        FROM t_personal_balance b
-        LEFT JOIN t_personal_subject s ON b.subject_id = s.subject_id
-        WHERE {where_clause}
-        ORDER BY b.record_date DESC
-    """, conn, params=(phone_number,))
-    
-    # 查汇总数据（总资产/总负债/净资产）
-    df_sum = pd.read_sql(f"""
-        SELECT
-            COALESCE(SUM(CASE WHEN s.subject_type='资产' THEN b.current_balance ELSE 0 END), 0) AS 总资产,
-            COALESCE(SUM(CASE WHEN s.subject_type='负债' THEN b.current_balance ELSE 0 END), 0) AS 总负债,
-            COALESCE(SUM(CASE WHEN s.subject_type='资产' THEN b.current_balance ELSE 0 END) -
-            SUM(CASE WHEN s.subject_type='负债' THEN b.current_balance ELSE 0 END), 0) AS 净资产
-        FROM t_personal_balance b
-        LEFT JOIN t_personal_subject s ON b.subject_id = s.subject_id
-        WHERE {where_clause}
-    """, conn, params=(phone_number,))
-    
-    conn.close()
-    
-    # 确保数据完整性
-    if df_sum.empty:
-        # 如果没有数据，返回默认值
-        df_sum_default = pd.Series({'总资产': 0, '总负债': 0, '净资产': 0})
-        return df_detail, df_sum_default
+            df_detail = pd.read_sql(PERIOD_TOTALS_SQL, conn, params=(phone_number, period_start, period_end))
+    
+    return df_detail, summarize_detail(df_detail)
+
+#4:获取趋势数据（近n_periods个时间单位，单次查询）
+# 期间累计口径从月度汇总表分组；期末余额口径（as_of）取每个时间单位结束时各科目的最新余额
+@user_cache("get_trend_data", ttl=3600)  # 按用户缓存1小时
+def get_trend_data(time_period_type, current_start_date, phone_number=None, n_periods=3, as_of=False):
+    labels, window_start, window_end = trend_window(time_period_type, current_start_date, n_periods)
+    
+    local_store = get_local_store()
+    if local_store is not None:
+        # 启用本地快照缓存时在本地计算
+        df = local_trend(local_store.rows(phone_number), get_all_subjects(), time_period_type, current_start_date, n_periods, as_of)
     else:
-        # 处理可能的None值，确保数值类型正确
-        df_sum_filled = df_sum.iloc[0].fillna(0)
-        return df_detail, df_sum_filled
-
-#3:获取趋势数据（近3个时间单位）
-@st.cache_data(ttl=3600)  # 缓存1小时
-def get_trend_data(time_period_type, current_start_date, phone_number=None):
-    conn = get_db_conn()
-    trend_data = []
-    
-    # 根据时间粒度计算近3个时间单位的范围
-    if time_period_type == '年度':
-        current_year = int(current_start_date[:4])
-        # 计算近3年的年份（包括当前年）
-        years = [current_year - 2, current_year - 1, current_year]
-        for year in years:
-            where_clause = f"b.record_date LIKE '{year}%%' AND b.phone_number = %s"
-            df = pd.read_sql(f"""
-                SELECT
-                    '{year}' AS period,
-                    COALESCE(SUM(CASE WHEN s.subject_type='资产' THEN b.current_balance ELSE 0 END), 0) AS 总资产,
-                    COALESCE(SUM(CASE WHEN s.subject_type='负债' THEN b.current_balance ELSE 0 END), 0) AS 总负债
-                FROM t_personal_balance b
-                LEFT JOIN t_personal_subject s ON b.subject_id = s.subject_id
-                WHERE {where_clause}
-            """, conn, params=(phone_number,))
-            if not df.empty:
-                trend_data.append(df.iloc[0])
-    
-    elif time_period_type == '季度':
-        current_year = int(current_start_date[:4])
-        current_month = int(current_start_date[5:7])
-        current_quarter = (current_month - 1) // 3 + 1
-        
-        # 计算近3个季度的开始和结束日期
-        quarters = []
-        for i in range(2, -1, -1):
-            q_ago = current_quarter - i
-            if q_ago <= 0:
-                quarter_year = current_year - 1
-                quarter_num = q_ago + 4
+        # 一次查询返回所有时间单位，而不是每个时间单位查一次
+        with get_db_conn() as conn:
+            if as_of:
+                period_ends = trend_period_ends(time_period_type, current_start_date, n_periods)
+                params = [value for label, period_end in period_ends for value in (label, phone_number, period_end)]
+                df = pd.read_sql(asof_trend_sql(n_periods), conn, params=params)
             else:
-                quarter_year = current_year
-                quarter_num = q_ago
-            
-            if quarter_num == 1:
-                q_start = f"{quarter_year}-01-01"
-                q_end = f"{quarter_year}-03-31"
-                period_label = f"{quarter_year}Q{quarter_num}"
-            elif quarter_num == 2:
-                q_start = f"{quarter_year}-04-01"
-                q_end = f"{quarter_year}-06-30"
-                period_label = f"{quarter_year}Q{quarter_num}"
-            elif quarter_num == 3:
-                q_start = f"{quarter_year}-07-01"
-                q_end = f"{quarter_year}-09-30"
-                period_label = f"{quarter_year}Q{quarter_num}"
-            else:
-                q_start = f"{quarter_year}-10-01"
-                q_end = f"{quarter_year}-12-31"
-                period_label = f"{quarter_year}Q{quarter_num}"
-            
-            quarters.append((period_label, q_start, q_end))
-        
-        # 按时间顺序查询数据
-        for period_label, q_start, q_end in quarters:
-            where_clause = f"b.record_date BETWEEN '{q_start}' AND '{q_end}' AND b.phone_number = %s"
-            df = pd.read_sql(f"""
-                SELECT
-                    '{period_label}' AS period,
-                    COALESCE(SUM(CASE WHEN s.subject_type='资产' THEN b.current_balance ELSE 0 END), 0) AS 总资产,
-                    COALESCE(SUM(CASE WHEN s.subject_type='负债' THEN b.current_balance ELSE 0 END), 0) AS 总负债
-                FROM t_personal_balance b
-                LEFT JOIN t_personal_subject s ON b.subject_id = s.subject_id
-                WHERE {where_clause}
-            """, conn, params=(phone_number,))
-            if not df.empty:
-                trend_data.append(df.iloc[0])
-    
-    elif time_period_type == '月度':
-        current_year = int(current_start_date[:4])
-        current_month = int(current_start_date[5:7])
-        
-        # 计算近3个月的年月
-        months = []
-        for i in range(2, -1, -1):
-            m_ago = current_month - i
-            if m_ago <= 0:
-                month_year = current_year - 1
-                month_num = m_ago + 12
-            else:
-                month_year = current_year
-                month_num = m_ago
-            
-            month_str = f"{month_year}-{month_num:02d}"
-            period_label = month_str
-            months.append((period_label, month_str))
-        
-        # 按时间顺序查询数据
-        for period_label, month_str in months:
-            where_clause = f"b.record_date LIKE '{month_str}%%' AND b.phone_number = %s"
-            df = pd.read_sql(f"""
-                SELECT
-                    '{period_label}' AS period,
-                    COALESCE(SUM(CASE WHEN s.subject_type='资产' THEN b.current_balance ELSE 0 END), 0) AS 总资产,
-                    COALESCE(SUM(CASE WHEN s.subject_type='负债' THEN b.current_balance ELSE 0 END), 0) AS 总负债
-                FROM t_personal_balance b
-                LEFT JOIN t_personal_subject s ON b.subject_id = s.subject_id
-                WHERE {where_clause}
-            """, conn, params=(phone_number,))
-            if not df.empty:
-                trend_data.append(df.iloc[0])
-    
-    conn.close()
-    
-    # 转换为DataFrame
-    if trend_data:
-        trend_df = pd.DataFrame(trend_data)
-        return trend_df
-    else:
-        # 如果没有数据，返回空DataFrame
-        return pd.DataFrame(columns=['period', '总资产', '总负债'])
+                df = pd.read_sql(trend_sql(time_period_type), conn, params=(phone_number, window_start, window_end))
+    
+    # 在客户端补齐没有数据的时间单位（记为0），保证趋势图上每个时间点都存在
+    trend_df = (
+        df.set_index('period')
+        .reindex(labels, fill_value=0)
+        .rename_axis('period')
+        .reset_index()
+    )
+    trend_df[['总资产', '总负债']] = trend_df[['总资产', '总负债']].astype(float)
+    return trend_df
+
+#5:获取一页明细记录（键集分页，见queries.detail_page_sql），返回 (本页记录, 是否还有下一页)
+@user_cache("get_detail_page", ttl=3600)  # 按用户缓存1小时
+def get_detail_page(phone_number, period_start, period_end, sort, subject_type=None, subject_name=None, after=None):
+    sql, params = detail_page_sql(
+        phone_number, period_start, period_end, sort, subject_type, subject_name, after, DETAIL_PAGE_SIZE
+    )
+    with get_db_conn() as conn:
+        page = pd.read_sql(sql, conn, params=params)
+    return page.iloc[:DETAIL_PAGE_SIZE], len(page) > DETAIL_PAGE_SIZE
+
+#6:获取自定义范围（起止日期均含）的净资产历史：数据库按日/周/月聚合，再用LTTB降到固定点数
+# 返回 (聚合粒度, 降采样后的历史, 降采样前的点数)
+@user_cache("get_history_data", ttl=3600)  # 按用户缓存1小时
+def get_history_data(start_date, end_date, phone_number=None):
+    bucket = history_bucket(start_date, end_date, HISTORY_INFO['max_buckets'])
+    range_start, range_end = period_range('自定义', start_date, end_date)
+    params = (phone_number, range_start, range_end, bucket_start(range_start, bucket), phone_number, range_start)
+    with get_db_conn() as conn:
+        rows = pd.read_sql(history_sql(bucket), conn, params=params)
+    history = net_worth_series(rows)
+    return bucket, downsample_history(history, HISTORY_INFO['points']), len(history)
+
+#7:看板可选的年份（默认选最后一年）、默认的趋势期数和金额口径（口径名称 -> as_of参数）
+YEAR_OPTIONS = [2023, 2024, 2025, 2026]
+DEFAULT_TREND_PERIODS = 3
+VALUE_MODES = {"期末余额": True, "期间累计": False}
+DEFAULT_VALUE_MODE = "期末余额"
+
+#8:登录后首先会看到/切换到的视图 [(时间粒度, 开始日期, 结束日期), ...]：
+# 默认年份的年度、第1季度、1月（各选择框的默认值），以及今天所在的季度和月份（在可选年份内时）
+def default_views(today=None):
+    today = today or date.today()
+    year = YEAR_OPTIONS[-1]
+    views = [('年度', *period_dates('年度', year)), ('季度', *period_dates('季度', year, 1)), ('月度', *period_dates('月度', year, 1))]
+    if today.year in YEAR_OPTIONS:
+        views.append(('季度', *period_dates('季度', today.year, (today.month - 1) // 3 + 1)))
+        views.append(('月度', *period_dates('月度', today.year, today.month)))
+    return list(dict.fromkeys(views))
+
+#9:在后台预取默认视图的明细/汇总和趋势数据（写入查询缓存），参数与页面加载时完全一致以命中同一缓存键
+def prefetch_default_views(phone_number):
+    tasks = []
+    as_of = VALUE_MODES[DEFAULT_VALUE_MODE]
+    for time_period_type, start_date, end_date in default_views():
+        tasks.append(partial(get_data, time_period_type, start_date, end_date, phone_number, as_of))
+        tasks.append(partial(get_trend_data, time_period_type, start_date, phone_number, DEFAULT_TREND_PERIODS, as_of))
+    return get_prefetcher().start(phone_number, tasks)
 
 # ===================== 数据导入功能 =====================
 # 获取所有科目信息
-@st.cache_data(ttl=3600)
+@catalog_cache("get_all_subjects", ttl=3600)
 def get_all_subjects():
-    conn = get_db_conn()
-    df = pd.read_sql("SELECT subject_id, subject_name, subject_type FROM t_personal_subject ORDER BY subject_type, subject_id", conn)
-    conn.close()
-    return df
+    with get_db_conn() as conn:
+        return load_subjects(conn)
 
-# 生成Excel模板
-@st.cache_data(ttl=3600)
+# 生成Excel模板（只在点击下载时生成，openpyxl也在这时才加载）
+@catalog_cache("generate_excel_template", ttl=3600)
 def generate_excel_template():
+    from openpyxl import Workbook
+    from openpyxl.utils.dataframe import dataframe_to_rows
+    from openpyxl.worksheet.datavalidation import DataValidation
+    
     # 获取当前日期和月份
     current_date = datetime.now()
     current_month = current_date.strftime("%Y-%m")
@@ -226,8 +173,9 @@ def generate_excel_template():
         '日期': [default_date] * len(subjects_df),
         '科目名称': subjects_df['subject_name'].tolist(),
         '科目类型': subjects_df['subject_type'].tolist(),
-        '金额': [0.0] * len(subjects_df),
-        '备注': [''] * len(subjects_df)
+        '金额': [None] * len(subjects_df),     # 留空：未填写金额的行不导入，填0表示该科目余额变为0
+        '备注': [''] * len(subjects_df),
+        '科目序号': subjects_df['subject_seq'].tolist()
     }
     
     template_df = pd.DataFrame(template_data)
@@ -238,7 +186,7 @@ def generate_excel_template():
     ws.title = "资产负债数据"
     
     # 写入表头
-    headers = ['日期', '科目名称', '科目类型', '金额', '备注']
+    headers = ['日期', '科目名称', '科目类型', '金额', '备注', '科目序号']
     ws.append(headers)
     
     # 设置列宽
@@ -247,6 +195,7 @@ def generate_excel_template():
     ws.column_dimensions['C'].width = 15
     ws.column_dimensions['D'].width = 15
     ws.column_dimensions['E'].width = 30
+    ws.column_dimensions['F'].width = 10
     
     # 写入数据
     for row in dataframe_to_rows(template_df, index=False, header=False):
@@ -265,180 +214,102 @@ def generate_excel_template():
     for cell in ws[f"D2:D{len(subject_names)+1}"]:
         cell[0].number_format = "#,##0.00"
     
-    # 为科目类型列添加下拉选择（资产/负债）
-    from openpyxl.worksheet.datavalidation import DataValidation
-    
-    # 设置数据验证规则
+    # 为科目类型列添加下拉选择（资产/负债），设置数据验证规则
     dv = DataValidation(type="list", formula1='"资产,负债"', allow_blank=False)
     
     # 应用到科目类型列（C列）
     dv.sqref = "C2:C1000"  # 直接设置范围
     ws.add_data_validation(dv)
     
-    # 保存到内存
+    # 保存到内存（返回不可变的bytes，缓存结果可被多个会话安全共享）
     buffer = BytesIO()
     wb.save(buffer)
-    buffer.seek(0)
     
-    return buffer
-
-# 解析上传的Excel文件
-def parse_uploaded_file(uploaded_file):
-    try:
-        # 读取Excel文件
-        df = pd.read_excel(uploaded_file, sheet_name=0)
-        
-        # 验证必要的列是否存在
-        required_columns = ['日期', '科目名称', '科目类型', '金额']
-        if not all(col in df.columns for col in required_columns):
-            st.error(f"上传的文件缺少必要的列: {', '.join(required_columns)}")
-            return None, None, None
-        
-        # 处理缺失值
-        # 日期列不能为空
-        if df['日期'].isnull().any():
-            st.error("日期列不能包含空值")
-            return None, None, None
-        
-        # 验证日期格式
-        try:
-            df['日期'] = pd.to_datetime(df['日期']).dt.strftime('%Y-%m-%d')
-        except:
-            st.error("日期格式不正确，请使用YYYY-MM-DD格式")
-            return None, None, None
-        
-        # 科目名称列不能为空
-        if df['科目名称'].isnull().any():
-            st.error("科目名称列不能包含空值")
-            return None, None, None
-        
-        # 科目类型列不能为空
-        if df['科目类型'].isnull().any():
-            st.error("科目类型列不能包含空值")
-            return None, None, None
-        
-        # 验证科目类型值
-        valid_types = ['资产', '负债']
-        if not df['科目类型'].isin(valid_types).all():
-            st.error("科目类型必须为'资产'或'负债'")
-            return None, None, None
-        
-        # 金额列不能为空
-        if df['金额'].isnull().any():
-            st.error("金额列不能包含空值")
-            return None, None, None
-        
-        # 验证金额格式
-        try:
-            df['金额'] = pd.to_numeric(df['金额'])
-        except:
-            st.error("金额格式不正确，请输入数字")
-            return None, None, None
-        
-        # 处理备注列（如果不存在则添加）
-        if '备注' not in df.columns:
-            df['备注'] = ''
-        else:
-            # 将备注列的NaN值替换为空字符串
-            df['备注'] = df['备注'].fillna('')
-        
-        # 过滤掉金额为0的行
-        df = df[df['金额'] != 0].copy()
-        
-        # 获取科目映射（名称到ID列表）
-        subjects_df = get_all_subjects()
-        
-        # 创建科目名称到ID列表的映射
-        subject_map = {}
-        for _, row in subjects_df.iterrows():
-            name = row['subject_name']
-            if name not in subject_map:
-                subject_map[name] = []
-            subject_map[name].append(row['subject_id'])
-        
-        # 添加科目ID列，处理相同科目名称的情况
-        df['subject_id'] = None
-        
-        # 为每个相同科目名称的行分配不同的ID
-        for name, ids in subject_map.items():
-            # 找出所有使用这个科目名称的行
-            name_rows = df[df['科目名称'] == name]
-            if not name_rows.empty:
-                # 循环分配ID
-                for i, (idx, row) in enumerate(name_rows.iterrows()):
-                    df.at[idx, 'subject_id'] = ids[i % len(ids)]
-        
-        # 分离已知科目和未知科目
-        known_subjects_df = df[df['subject_id'].notnull()].copy()
-        unknown_subjects_df = df[df['subject_id'].isnull()].copy()
-        
-        # 获取未知科目列表
-        unknown_subjects = unknown_subjects_df['科目名称'].unique().tolist()
-        
-        # 如果有已知科目，转换数据类型
-        if not known_subjects_df.empty:
-            known_subjects_df['subject_id'] = known_subjects_df['subject_id'].astype(int)
-        
-        return known_subjects_df, unknown_subjects, df
-    except Exception as e:
-        st.error(f"文件解析失败: {e}")
-        return None, None, None
+    return buffer.getvalue()
+
+# 显示当前用户最近的导入任务：未结束的显示进度，已结束的显示结果
+# 任务刚结束时刷新整个页面（停止轮询，并重新加载已失效的看板数据）
+def render_import_jobs(phone_number):
+    jobs = get_import_jobs().jobs_for(phone_number)[:3]
+    finished = {job.job_id for job in jobs if job.done}
+    if 'finished_jobs' not in st.session_state:
+        st.session_state.finished_jobs = finished
+    elif finished - st.session_state.finished_jobs:
+        st.session_state.finished_jobs |= finished
+        st.rerun()
+    
+    for job in jobs:
+        if not job.done:
+            rows = f"{job.rows_done}/{job.total_rows}" if job.total_rows else f"已处理 {job.rows_done}"
+            st.progress(job.progress() or 0.0, text=f"{job.file_name}：{job.status}... {rows} 行")
+        elif job.status == SUCCEEDED:
+            (st.success if job.changed else st.info)(f"{job.file_name}：{job.message}")
+        elif job.status == FAILED:
+            st.error(f"{job.file_name}：{job.message}")
+            if job.issues is not None:
+                # 一次列出所有问题（行号/列/原因），可下载后对照修改
+                with st.expander("查看校验结果"):
+                    st.dataframe(job.issues, width='stretch', hide_index=True)
+                    st.download_button(
+                        label="📥 下载校验结果",
+                        data=issues_to_excel(job.issues),
+                        file_name="导入校验结果.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        key=f"issues_{job.job_id}"
+                    )
+
+# 有未结束的任务时每秒只刷新任务区域，否则不轮询
+def show_import_jobs(phone_number):
+    active = any(not job.done for job in get_import_jobs().jobs_for(phone_number))
+    st.fragment(render_import_jobs, run_every=1 if active else None)(phone_number)
+
+# 明细表：按页从数据库读取，排序/筛选/翻页只重新运行本区域；
+# 会话中保存各页的起点（上一页最后一行的键），排序、筛选或时间范围变化时回到第一页
+def render_detail_table(phone_number, period_start, period_end, subject_names):
+    col1, col2, col3 = st.columns(3)
+    sort = col1.selectbox("排序", list(DETAIL_SORTS), key="detail_sort")
+    subject_type = col2.selectbox("类型", ["全部", "资产", "负债"], key="detail_type")
+    subject_name = col3.selectbox("科目", ["全部"] + subject_names, key="detail_subject")
+    subject_type = None if subject_type == "全部" else subject_type
+    subject_name = None if subject_name == "全部" else subject_name
+    
+    view = (phone_number, period_start, period_end, sort, subject_type, subject_name)
+    if st.session_state.get('detail_view') != view:
+        st.session_state.detail_view = view
+        st.session_state.detail_cursors = [None]
+    cursors = st.session_state.detail_cursors
+    page, has_next = get_detail_page(*view, after=cursors[-1])
+    if page.empty:
+        st.info("当前时间范围内没有记录")
+        return
+    
+    # 只格式化当前页
+    df_show = pd.DataFrame({
+        "日期": pd.to_datetime(page["record_date"]).dt.strftime("%Y-%m-%d"),
+        "科目": page["subject_name"],
+        "类型": page["subject_type"],
+        "金额": "¥" + page["current_balance"].astype(float).map("{:,.2f}".format),
+        "备注": page["remark"],
+    })
+    st.dataframe(df_show, width='stretch', hide_index=True)
+    
+    # 下一页从本页最后一行之后开始：(排序列的值, 同值时的排序列的值)
+    column, tiebreak = (name.split('.')[-1] for name in DETAIL_SORTS[sort][:2])
+    last = page.iloc[-1]
+    sort_value = pd.Timestamp(last[column]).strftime("%Y-%m-%d") if column == 'record_date' else float(last[column])
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    prev_col.button("⬅️ 上一页", disabled=len(cursors) == 1, on_click=cursors.pop, key="detail_prev")
+    page_col.caption(f"第 {len(cursors)} 页，每页 {DETAIL_PAGE_SIZE} 条")
+    next_col.button(
+        "下一页 ➡️", disabled=not has_next, on_click=cursors.append, args=((sort_value, int(last[tiebreak])),), key="detail_next"
+    )
 
-# 将数据导入到数据库
-def import_data_to_db(df, phone_number):
-    try:
-        conn = get_db_conn()
-        cursor = conn.cursor()
-        
-        # 开始事务
-        conn.begin()
-        
-        # 先确保用户存在于t_user表中
-        check_user_sql = "SELECT phone_number FROM t_user WHERE phone_number = %s"
-        cursor.execute(check_user_sql, (phone_number,))
-        user_exists = cursor.fetchone()
-        
-        if not user_exists:
-            # 如果用户不存在，插入用户记录
-            insert_user_sql = "INSERT INTO t_user (phone_number) VALUES (%s)"
-            cursor.execute(insert_user_sql, (phone_number,))
-        
-        # 准备插入/更新语句
-        sql = """
-        INSERT INTO t_personal_balance (phone_number, subject_id, record_date, current_balance, remark)
-        VALUES (%s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-            current_balance = VALUES(current_balance),
-            remark = VALUES(remark)
-        """
-        
-        # 遍历数据框并执行插入/更新
-        for index, row in df.iterrows():
-            cursor.execute(sql, (
-                phone_number,
-                row['subject_id'],
-                row['日期'],
-                row['金额'],
-                row['备注']
-            ))
-        
-        # 提交事务
-        conn.commit()
-        
-        # 关闭连接
-        cursor.close()
-        conn.close()
-        
-        return True, f"成功导入 {len(df)} 条记录"
-    except Exception as e:
-        # 回滚事务
-        if conn:
-            try:
-                conn.rollback()
-                conn.close()
-            except:
-                pass
-        return False, f"导入失败: {str(e)}"
+# 导出用户的全部历史数据，返回指定格式的文件内容（bytes）
+def export_user_data(phone_number, file_format):
+    with get_db_conn() as conn:
+        df = pd.read_sql(EXPORT_SQL, conn, params=(phone_number,))
+    df['金额'] = df['金额'].astype(float)
+    return export_frame(df, file_format)
 
 # ===================== Streamlit可视化 =====================
 # 1. 网页基础设置
@@ -564,7 +435,7 @@ if 'phone_number' not in st.session_state:
     st.session_state.phone_number = ''
 
 # 只有在用户没有输入有效的手机号时，才显示输入界面
-if not (st.session_state.phone_number and len(st.session_state.phone_number) == 11):
+if not is_valid_phone(st.session_state.phone_number):
     # 创建一个简单的表单来确保所有元素被包裹在边框内
     with st.form("phone_form", border=True):
         # 显示标题
@@ -576,8 +447,10 @@ if not (st.session_state.phone_number and len(st.session_state.phone_number) ==
         
         # 检查手机号格式
         if phone_input:
-            if len(phone_input) == 11 and phone_input.isdigit() and phone_input.startswith('1'):
+            if is_valid_phone(phone_input):
                 st.session_state.phone_number = phone_input
+                # 手机号确定后立即在后台预取默认视图，页面刷新后的首次加载和切换时间粒度可直接命中缓存
+                prefetch_default_views(phone_input)
                 st.success(f"欢迎使用，手机号：{phone_input}")
                 # 刷新页面以隐藏输入界面
                 st.rerun()
@@ -593,96 +466,67 @@ if not (st.session_state.phone_number and len(st.session_state.phone_number) ==
     st.stop()
 
 # 只有在用户输入有效的手机号后，才显示后续内容
-if st.session_state.phone_number and len(st.session_state.phone_number) == 11:
+if is_valid_phone(st.session_state.phone_number):
+    # 侧边栏显示连接池计数，便于根据并发会话数调整POOL_HEADROOM
+    with st.sidebar.expander("连接池状态"):
+        st.json(get_pool().stats())
+    # 各缓存的命中/未命中/淘汰计数
+    with st.sidebar.expander("缓存状态"):
+        st.json(cache_stats())
+    # 后台导入任务的排队/运行/完成计数
+    with st.sidebar.expander("导入任务队列"):
+        st.json(get_import_jobs().stats())
+    # 登录后台预取的开始/取消/完成计数
+    with st.sidebar.expander("预取状态"):
+        st.json(get_prefetcher().stats())
+    # 本地快照缓存的同步计数（启用时）
+    if get_local_store() is not None:
+        with st.sidebar.expander("本地快照"):
+            st.json(get_local_store().stats())
+    # 调试面板：按语句汇总的耗时/行数、缓存事件和最近的慢查询（含参数，默认关闭）
+    if METRICS_INFO['debug_panel']:
+        with st.sidebar.expander("查询统计"):
+            st.dataframe(pd.DataFrame(query_stats()), hide_index=True)
+            st.json(cache_event_counts())
+            st.caption(f"慢查询（≥{METRICS_INFO['slow_ms']}ms）")
+            st.dataframe(pd.DataFrame(slow_queries()), hide_index=True)
+    
     # 数据导入功能
     st.markdown("<h2 style='font-size: 22px !important; color: #1a5276 !important;'>数据导入</h2>", unsafe_allow_html=True)
     
-    # 下载模板按钮
-    excel_template = generate_excel_template()
+    # 下载模板按钮：传入生成函数，点击时才查询科目并生成文件，页面刷新时不生成
     st.download_button(
         label="📥 下载Excel模板",
-        data=excel_template,
+        data=generate_excel_template,
         file_name="资产负债表导入模板.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
     
     # 文件上传组件
-    uploaded_file = st.file_uploader("📤 上传已填写的Excel文件", type=["xlsx"], key="file_uploader")
+    uploaded_file = st.file_uploader("📤 上传已填写的Excel/CSV/Parquet文件", type=list(IMPORT_READERS), key="file_uploader")
     
-    # 导入按钮
+    # 导入按钮：提交到后台任务队列，页面不等待导入完成
     if uploaded_file is not None:
         if st.button("🚀 开始导入数据", key="import_button"):
-            with st.spinner("正在解析文件..."):
-                # 解析上传的文件
-                known_subjects_df, unknown_subjects, full_df = parse_uploaded_file(uploaded_file)
-                
-                if known_subjects_df is not None:
-                    all_subjects_added = True
-                    new_subjects_map = {}
-                    
-                    # 处理所有数据，包括已知和未知科目
-                    with st.spinner("正在导入数据..."):
-                        # 连接数据库
-                        conn = get_db_conn()
-                        cursor = conn.cursor()
-                        conn.begin()
-                        
-                        try:
-                            # 处理未知科目，直接从Excel读取科目类型
-                            unknown_subjects_df = full_df[full_df['subject_id'].isnull()].copy()
-                            for index, row in unknown_subjects_df.iterrows():
-                                subject_name = row['科目名称']
-                                subject_type = row['科目类型']  # 从Excel读取科目类型
-                                
-                                # 插入新科目到数据库
-                                insert_subject_sql = "INSERT INTO t_personal_subject (subject_name, subject_type) VALUES (%s, %s)"
-                                cursor.execute(insert_subject_sql, (subject_name, subject_type))
-                            
-                            # 提交新科目的添加
-                            conn.commit()
-                            
-                            # 清除缓存，确保获取最新的科目数据
-                            st.cache_data.clear()
-                            
-                            # 重新获取所有科目映射，包括新添加的
-                            subjects_df = get_all_subjects()
-                            
-                            # 创建科目名称到ID列表的映射（处理重复科目名称）
-                            subject_map = {}
-                            for _, row in subjects_df.iterrows():
-                                name = row['subject_name']
-                                if name not in subject_map:
-                                    subject_map[name] = []
-                                subject_map[name].append(row['subject_id'])
-                            
-                            # 为每个相同科目名称的行分配不同的ID
-                            full_df['subject_id'] = None
-                            for name, ids in subject_map.items():
-                                # 找出所有使用这个科目名称的行
-                                name_rows = full_df[full_df['科目名称'] == name]
-                                if not name_rows.empty:
-                                    # 循环分配ID
-                                    for i, (idx, row) in enumerate(name_rows.iterrows()):
-                                        full_df.at[idx, 'subject_id'] = ids[i % len(ids)]
-                            
-                            # 转换为整数类型
-                            full_df['subject_id'] = full_df['subject_id'].astype(int)
-                            
-                            # 将数据导入到数据库
-                            success, message = import_data_to_db(full_df, st.session_state.phone_number)
-                            if success:
-                                st.success(message)
-                                # 清除缓存并重新加载数据
-                                st.cache_data.clear()
-                                st.rerun()
-                            else:
-                                st.error(message)
-                        except Exception as e:
-                            conn.rollback()
-                            st.error(f"数据导入失败: {e}")
-                        finally:
-                            cursor.close()
-                            conn.close()
+            # 数据即将变化，未完成的预取不再继续
+            get_prefetcher().cancel(st.session_state.phone_number)
+            get_import_jobs().submit(
+                st.session_state.phone_number, uploaded_file.name, uploaded_file.getvalue(), get_all_subjects()
+            )
+    show_import_jobs(st.session_state.phone_number)
+    
+    # 导出历史数据：传入生成函数，点击下载时才查询全部历史并生成文件，页面刷新时不查询
+    export_col1, export_col2 = st.columns([1, 3])
+    with export_col1:
+        export_format = st.selectbox("导出格式", list(EXPORT_MIME_TYPES), key="export_format")
+    with export_col2:
+        st.download_button(
+            label=f"📦 导出全部历史数据（.{export_format}）",
+            data=partial(export_user_data, st.session_state.phone_number, export_format),
+            file_name=f"资产负债数据_{st.session_state.phone_number}.{export_format}",
+            mime=EXPORT_MIME_TYPES[export_format],
+            key="export_button"
+        )
     
     # 添加分隔线
     st.markdown("---")
@@ -699,39 +543,23 @@ if st.session_state.phone_number and len(st.session_state.phone_number) == 11:
     end_date = None
 
     # 根据选择的时间粒度显示不同的控件
+    # 起止日期由period_dates计算（与后台预取一致）
     if time_period == "年度":
         with col2:
-            selected_year = st.selectbox("选择年份", [2023, 2024, 2025, 2026], index=3)  # 默认2026年
-        start_date = f"{selected_year}-01-01"
-        end_date = f"{selected_year}-12-31"
+            selected_year = st.selectbox("选择年份", YEAR_OPTIONS, index=len(YEAR_OPTIONS) - 1)  # 默认最后一年
+        start_date, end_date = period_dates(time_period, selected_year)
     elif time_period == "季度":
         with col2:
-            selected_year = st.selectbox("选择年份", [2023, 2024, 2025, 2026], index=3)  # 默认2026年
+            selected_year = st.selectbox("选择年份", YEAR_OPTIONS, index=len(YEAR_OPTIONS) - 1)  # 默认最后一年
         with col3:
             selected_quarter = st.selectbox("选择季度", [1, 2, 3, 4])
-        if selected_quarter == 1:
-            start_date = f"{selected_year}-01-01"
-            end_date = f"{selected_year}-03-31"
-        elif selected_quarter == 2:
-            start_date = f"{selected_year}-04-01"
-            end_date = f"{selected_year}-06-30"
-        elif selected_quarter == 3:
-            start_date = f"{selected_year}-07-01"
-            end_date = f"{selected_year}-09-30"
-        else:
-            start_date = f"{selected_year}-10-01"
-            end_date = f"{selected_year}-12-31"
+        start_date, end_date = period_dates(time_period, selected_year, selected_quarter)
     elif time_period == "月度":
         with col2:
-            selected_year = st.selectbox("选择年份", [2023, 2024, 2025, 2026], index=3)  # 默认2026年
+            selected_year = st.selectbox("选择年份", YEAR_OPTIONS, index=len(YEAR_OPTIONS) - 1)  # 默认最后一年
         with col3:
             selected_month = st.selectbox("选择月份", range(1, 13), index=0)  # 默认1月
-        start_date = f"{selected_year}-{selected_month:02d}-01"
-        if selected_month == 12:
-            end_date = f"{selected_year}-{selected_month}-31"
-        else:
-            next_month = selected_month + 1
-            end_date = f"{selected_year}-{next_month:02d}-01"  # 这里可以优化为获取当月最后一天
+        start_date, end_date = period_dates(time_period, selected_year, selected_month)
     else:  # 自定义
         # 设置默认结束日期为当天
         default_end_date = pd.to_datetime("today")
@@ -743,8 +571,31 @@ if st.session_state.phone_number and len(st.session_state.phone_number) == 11:
         with col3:
             end_date = st.date_input("结束日期", value=default_end_date).strftime("%Y-%m-%d")
 
-    # 3. 加载数据
-    df_detail, df_sum = get_data(time_period, start_date, end_date, st.session_state.phone_number)
+    # 金额口径：期末余额（每个科目取截至期末的最新一条）或期间累计（期间内所有记录相加）
+    value_mode = st.radio(
+        "金额口径", list(VALUE_MODES), index=list(VALUE_MODES).index(DEFAULT_VALUE_MODE), horizontal=True, key='value_mode'
+    )
+    as_of = VALUE_MODES[value_mode]
+
+    # 3. 加载数据：明细/汇总和趋势同时查询，各用一个连接池连接，全部完成后再渲染
+    # 趋势期数滑块在后面显示，这里先从会话状态读取它上一次的值
+    trend_periods = st.session_state.get('trend_periods', DEFAULT_TREND_PERIODS)
+    phone_number = st.session_state.phone_number
+    load_tasks = {'明细/汇总': lambda: get_data(time_period, start_date, end_date, phone_number, as_of)}
+    if time_period != "自定义":
+        load_tasks['趋势'] = lambda: get_trend_data(time_period, start_date, phone_number, trend_periods, as_of)
+    else:
+        load_tasks['净资产历史'] = lambda: get_history_data(start_date, end_date, phone_number)
+    # 加载线程池由所有会话共用，线程上不挂会话的脚本上下文：任务中的异常由load_concurrently在脚本线程中重新抛出
+    try:
+        loaded, load_timings = load_concurrently(load_tasks)
+    except DatabaseUnavailable as e:
+        st.error(str(e))
+        st.stop()
+    df_detail, df_sum = loaded['明细/汇总']
+    # 各查询耗时、顺序执行合计与并发墙钟时间（命中缓存时接近0）
+    with st.sidebar.expander("加载耗时（秒）"):
+        st.json(load_timings)
 
     # 4. 核心指标卡片
     c1, c2, c3 = st.columns(3)
@@ -781,11 +632,15 @@ if st.session_state.phone_number and len(st.session_state.phone_number) == 11:
     with c3:
         st.markdown(create_metric_card("净资产 💎", f"¥{net_assets:,.2f}", value_color="#0368C9"), unsafe_allow_html=True)  # 浅蓝色
 
-    # 5. 趋势折线图（近3个时间单位的总资产/负债变化）
+    # 5. 趋势折线图（近N个时间单位的总资产/负债变化）
+    # Plotly只在绘制图表时加载，未登录时的输入手机号页面不需要它
+    import plotly.express as px
     st.markdown("<h2 style='font-size: 22px !important; color: #1a5276 !important;'>总资产负债趋势</h2>", unsafe_allow_html=True)
     if time_period != "自定义":  # 自定义时间粒度不显示趋势图
-        # 获取趋势数据
-        trend_df = get_trend_data(time_period, start_date, st.session_state.phone_number)
+        # 趋势窗口长度（时间单位个数），无论多少期都只查询一次数据库
+        st.select_slider("趋势期数", options=[3, 6, 12, 24, 36], value=DEFAULT_TREND_PERIODS, key='trend_periods')
+        # 趋势数据已在上面与明细数据并发加载
+        trend_df = loaded['趋势']
         
         if not trend_df.empty:
             # 生成图表标题
@@ -821,7 +676,23 @@ if st.session_state.phone_number and len(st.session_state.phone_number) == 11:
         else:
             st.info("没有足够的历史数据生成趋势图")
     else:
-        st.info("自定义时间范围不支持趋势图展示")
+        # 自定义范围显示整个范围的净资产历史（按期末余额口径逐单位计算，点数已降采样）
+        bucket, history_df, n_points = loaded['净资产历史']
+        if not history_df.empty:
+            fig = px.line(history_df, x='时间', y=['总资产', '总负债', '净资产'],
+                         title=f"{start_date}～{end_date} 净资产历史（按{bucket}汇总，显示 {len(history_df)}/{n_points} 个点）",
+                         labels={'value': '金额（元）', 'variable': ''},
+                         color_discrete_map={'总资产': 'blue', '总负债': 'red', '净资产': 'green'})
+            fig.update_traces(line=dict(width=2))
+            fig.update_layout(
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                height=350,
+                margin=dict(l=10, r=10, t=30, b=10),
+                hovermode="x unified"
+            )
+            st.plotly_chart(fig, width='stretch', key="history_line")
+        else:
+            st.info("所选范围内没有数据")
 
     # 6. 饼图（资产+负债）
     c1, c2 = st.columns(2)
@@ -872,14 +743,9 @@ if st.session_state.phone_number and len(st.session_state.phone_number) == 11:
 
     # 7. 明细表格（一键显示，带格式化）
     st.subheader("资产负债明细")
-    if not df_detail.empty:
-        # 创建一个新的DataFrame来避免SettingWithCopyWarning
-        df_show = df_detail[["subject_name", "subject_type", "current_balance", "remark"]].copy()
-        df_show.columns = ["科目", "类型", "金额", "备注"]
-        # 金额格式化
-        df_show["金额"] = df_show["金额"].apply(lambda x: f"¥{x:,.2f}")
-        st.dataframe(df_show, width='stretch')  # 使用新参数width='stretch'替代use_container_width
-    else:
-        st.info("当前时间范围内没有数据")
+    # 期间内的记录分页显示（两种金额口径下都是期间内的原始记录）
+    period_start, period_end = period_range(time_period, start_date, end_date)
+    subject_names = sorted(df_detail['subject_name'].dropna().unique().tolist())
+    st.fragment(render_detail_table)(phone_number, period_start, period_end, subject_names)
 else:
     st.stop()
\ No newline at end of file
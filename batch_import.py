@@ -0,0 +1,165 @@
+import argparse
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+from db_config import IMPORT_CHUNK_SIZE
+from db_pool import get_pool
+from data_import import (
+    IMPORT_READERS, ISSUE_COLUMNS, ImportValidationError, check_import_frame, file_hash, import_in_transaction,
+    is_valid_phone, issues_to_excel, load_subjects, read_import_chunks
+)
+
+# ===================== 批量导入命令（不依赖Streamlit，可由cron调用） =====================
+# 导入目录下的所有Excel/CSV/Parquet文件，多个文件在进程池中并行处理：
+#   - 文件名（不含扩展名）是手机号时，整个文件导入到该手机号；
+#   - 否则文件中必须有"手机号"列，按该列拆分后分别导入。
+# 每个(文件, 手机号)在一个事务中导入，与网页导入使用同一套校验/科目解析/写入流程。
+# 结果写到输出目录（默认为数据目录下的"导入报告_时间"子目录，不会被下次运行当作数据文件）：
+# 每个(文件, 手机号)一行写入"导入报告.csv"，有校验问题的文件另存"<文件名>_校验结果.xlsx"。
+# 用法：python batch_import.py 目录                    导入
+#       python batch_import.py 目录 --dry-run          只校验，不连接数据库（--explain 同义）
+#       python batch_import.py 目录 --workers 4 --output 输出目录
+PHONE_COLUMN = '手机号'
+REPORT_COLUMNS = ['文件', '手机号', '状态', '行数', '新增', '更新', '未变化', '新科目', '错误数', '警告数', '信息', '耗时(秒)']
+
+
+def list_import_files(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if os.path.isfile(os.path.join(directory, name))
+        and name.rsplit('.', 1)[-1].lower() in IMPORT_READERS and not name.startswith('~$')
+    )
+
+
+# Excel中的手机号可能被读成数字，统一转换为字符串
+def normalize_phone(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip() if pd.notna(value) else ''
+
+
+# 按手机号列拆分数据块，返回 ({手机号: [数据块, ...]}, 手机号不正确的问题列表)；数据块保留原行号索引
+def split_by_phone(chunks):
+    groups = {}
+    issues = []
+    for chunk in chunks:
+        if PHONE_COLUMN not in chunk.columns:
+            issue = pd.DataFrame([[1, PHONE_COLUMN, '错误', '文件名不是手机号时，文件中必须有"手机号"列']], columns=ISSUE_COLUMNS)
+            return {}, issue
+        phones = chunk[PHONE_COLUMN].map(normalize_phone)
+        valid = phones.map(is_valid_phone).astype(bool)
+        if not valid.all():
+            issues.append(pd.DataFrame({'行号': chunk.index[~valid.to_numpy()], '列': PHONE_COLUMN, '级别': '错误', '原因': '手机号格式不正确'}))
+        for phone_number, rows in chunk[valid].groupby(phones[valid], sort=False):
+            groups.setdefault(phone_number, []).append(rows.drop(columns=PHONE_COLUMN))
+    return groups, pd.concat(issues, ignore_index=True) if issues else pd.DataFrame(columns=ISSUE_COLUMNS)
+
+
+# 只校验（不连接数据库），返回问题列表
+def validate_chunks(chunks):
+    seen = Counter()
+    issues = [check_import_frame(chunk, seen)[1] for chunk in chunks]
+    return pd.concat(issues, ignore_index=True) if issues else pd.DataFrame(columns=ISSUE_COLUMNS)
+
+
+def report_row(path, phone_number, status, message='', rows=0, result=None, issues=None, started=None):
+    result = result or {}
+    issues = issues if issues is not None else pd.DataFrame(columns=ISSUE_COLUMNS)
+    return {
+        '文件': os.path.basename(path), '手机号': phone_number, '状态': status,
+        '行数': result.get('rows', rows), '新增': result.get('inserted', 0), '更新': result.get('updated', 0),
+        '未变化': result.get('unchanged', 0), '新科目': result.get('new_subjects', 0),
+        '错误数': int((issues['级别'] == '错误').sum()), '警告数': int((issues['级别'] == '警告').sum()),
+        '信息': message, '耗时(秒)': round(time.perf_counter() - started, 2) if started else None,
+    }
+
+
+# 处理一个文件（在子进程中执行），返回 (报告行列表, 问题列表)
+def process_file(path, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE):
+    started = time.perf_counter()
+    name = os.path.basename(path)
+    phone_number = os.path.splitext(name)[0]
+    try:
+        with open(path, 'rb') as file:
+            upload_hash = file_hash(file)
+            total_rows, chunks = read_import_chunks(file, name, chunk_size)
+            if is_valid_phone(phone_number):
+                # 整个文件导入到一个手机号：数据块保持流式读取，总行数未知（CSV）时为None
+                groups, file_issues = {phone_number: chunks}, pd.DataFrame(columns=ISSUE_COLUMNS)
+                group_rows = {phone_number: total_rows}
+            else:
+                # 按手机号拆分需要先读完整个文件，各手机号的行数在拆分后得到
+                groups, file_issues = split_by_phone(chunks)
+                group_rows = {phone: sum(map(len, parts)) for phone, parts in groups.items()}
+
+            rows, all_issues = [], [file_issues]
+            if (file_issues['级别'] == '错误').any():
+                rows.append(report_row(path, '', '校验未通过', '手机号列有误，整个文件未导入', issues=file_issues, started=started))
+                return rows, file_issues
+
+            for phone_number, phone_chunks in groups.items():
+                phone_started = time.perf_counter()
+                if dry_run:
+                    phone_chunks = list(phone_chunks)
+                    issues = validate_chunks(phone_chunks)
+                    status = '校验未通过' if (issues['级别'] == '错误').any() else '校验通过'
+                    rows.append(report_row(path, phone_number, status, rows=sum(map(len, phone_chunks)), issues=issues, started=phone_started))
+                    all_issues.append(issues)
+                    continue
+                try:
+                    with get_pool().connection() as conn:
+                        result = import_in_transaction(
+                            conn, phone_chunks, phone_number, load_subjects(conn), chunk_size=chunk_size,
+                            file_hash=upload_hash, file_name=name, total_rows=group_rows[phone_number]
+                        )
+                except ImportValidationError as e:
+                    rows.append(report_row(path, phone_number, '校验未通过', str(e), issues=e.issues, started=phone_started))
+                    all_issues.append(e.issues)
+                    continue
+                except Exception as e:
+                    rows.append(report_row(path, phone_number, '失败', str(e), started=phone_started))
+                    continue
+                status, message = ('跳过', '与上一次导入的文件相同') if result['skipped'] else ('成功', '')
+                rows.append(report_row(path, phone_number, status, message, result=result, issues=result['issues'], started=phone_started))
+                all_issues.append(result['issues'])
+    except Exception as e:
+        return [report_row(path, '', '失败', str(e), started=started)], pd.DataFrame(columns=ISSUE_COLUMNS)
+    return rows, pd.concat(all_issues, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量导入目录下的资产负债数据文件（Excel/CSV/Parquet）")
+    parser.add_argument("directory", help="数据文件所在目录")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="并行处理的进程数")
+    parser.add_argument("--output", default=None, help="报告输出目录（默认为数据目录下的\"导入报告_时间\"）")
+    parser.add_argument("--dry-run", "--explain", dest="dry_run", action="store_true", help="只校验，不写数据库")
+    parser.add_argument("--chunk", type=int, default=IMPORT_CHUNK_SIZE, help="每块读取/写入的行数")
+    args = parser.parse_args()
+
+    paths = list_import_files(args.directory)
+    output = args.output or os.path.join(args.directory, f"导入报告_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    os.makedirs(output, exist_ok=True)
+    print(f"共 {len(paths)} 个文件，{args.workers} 个进程{'（只校验）' if args.dry_run else ''}")
+
+    report = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(process_file, path, args.dry_run, args.chunk): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            rows, issues = future.result()
+            report.extend(rows)
+            if not issues.empty:
+                issues_path = os.path.join(output, f"{os.path.splitext(os.path.basename(path))[0]}_校验结果.xlsx")
+                with open(issues_path, 'wb') as file:
+                    file.write(issues_to_excel(issues))
+            for row in rows:
+                print(f"{row['文件']} {row['手机号']}: {row['状态']} {row['行数']} 行 {row['信息']}")
+
+    report = pd.DataFrame(report, columns=REPORT_COLUMNS).sort_values(['文件', '手机号'])
+    report.to_csv(os.path.join(output, "导入报告.csv"), index=False, encoding='utf-8-sig')
+    print(f"\n报告已写入 {output}")
+    print(report['状态'].value_counts().to_string())
@@ -0,0 +1,83 @@
+import sys
+import time
+import pandas as pd
+import pymysql
+from conftest import bench_db_info
+from data_import import ensure_user, upsert_balances
+from period_utils import period_range, trend_period_ends
+from queries import ASOF_DETAIL_SQL, PERIOD_TOTALS_SQL, asof_trend_sql
+
+# 基准测试：多年每日记录的用户上，期末余额（松散索引扫描）查询与窗口函数写法、期间累计查询的耗时对比
+# 用法：python bench_asof.py [年数] [科目数] [重复次数]
+# 连接环境变量 BALANCE_TEST_MYSQL 指定的测试库（见conftest.py），不连接 db_config.MYSQL_INFO 中的库；
+# 测试数据在事务中写入并在结束时回滚，不会改动库中数据
+BENCH_PHONE = '19900000004'
+n_years = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+n_subjects = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+db_info = bench_db_info()
+
+# 对照：用窗口函数给每个科目的记录按日期倒序编号，取第1条（需要扫描结束日期之前的全部记录）
+WINDOW_SQL = """
+    SELECT s.subject_name, s.subject_type, COALESCE(r.current_balance, 0) AS current_balance, r.remark, r.record_date
+    FROM (
+        SELECT b.*, ROW_NUMBER() OVER (PARTITION BY b.subject_id ORDER BY b.record_date DESC) AS rn
+        FROM t_personal_balance b
+        WHERE b.phone_number = %s AND b.record_date < %s
+    ) r
+    LEFT JOIN t_personal_subject s ON r.subject_id = s.subject_id
+    WHERE r.rn = 1
+    ORDER BY r.record_date DESC
+"""
+
+
+def timed(conn, sql, params):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = pd.read_sql(sql, conn, params=params)
+        times.append(time.perf_counter() - start)
+    return sum(times) / repeat * 1000, len(df)
+
+
+try:
+    conn = pymysql.connect(**db_info)
+    cursor = conn.cursor()
+    cursor.execute("SELECT subject_id FROM t_personal_subject ORDER BY subject_id LIMIT %s", (n_subjects,))
+    subject_ids = [row[0] for row in cursor.fetchall()]
+    end_year = 2026
+    dates = pd.date_range(f"{end_year - n_years + 1}-01-01", f"{end_year}-12-31", freq="D").strftime("%Y-%m-%d")
+    df = pd.DataFrame([(d, sid) for d in dates for sid in subject_ids], columns=['日期', 'subject_id'])
+    df['金额'] = 1000.0
+    df['备注'] = ''
+
+    conn.begin()
+    ensure_user(cursor, BENCH_PHONE)
+    upsert_balances(cursor, df, BENCH_PHONE, 5000)
+    print(f"{n_years} 年 × {len(subject_ids)} 个科目 每日记录，共 {len(df)} 行")
+
+    cursor.execute("EXPLAIN " + ASOF_DETAIL_SQL, (BENCH_PHONE, f"{end_year + 1}-01-01"))
+    columns = [c[0] for c in cursor.description]
+    for row in cursor.fetchall():
+        row = dict(zip(columns, row))
+        print(f"  EXPLAIN {row['table']:<12} key={row['key']} rows={row['rows']} {row['Extra'] or ''}")
+
+    period_start, period_end = period_range('年度', f"{end_year}-01-01")
+    cases = {
+        '期间累计 年度': (PERIOD_TOTALS_SQL, (BENCH_PHONE, period_start, period_end)),
+        '期末余额 年度': (ASOF_DETAIL_SQL, (BENCH_PHONE, period_end)),
+        '窗口函数 年度': (WINDOW_SQL, (BENCH_PHONE, period_end)),
+    }
+    for n_periods in (12, 36):
+        period_ends = trend_period_ends('月度', f"{end_year}-12-01", n_periods)
+        params = [value for label, end in period_ends for value in (label, BENCH_PHONE, end)]
+        cases[f'期末余额 趋势{n_periods}期'] = (asof_trend_sql(n_periods), params)
+
+    for name, (sql, params) in cases.items():
+        ms, rows = timed(conn, sql, params)
+        print(f"{name:<16} 平均 {ms:8.1f} ms  返回 {rows} 行")
+    conn.rollback()
+    cursor.close()
+    conn.close()
+except Exception as e:
+    print(f"基准测试失败: {e}")
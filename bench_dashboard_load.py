@@ -0,0 +1,44 @@
+import sys
+import time
+import pandas as pd
+from db_pool import get_pool
+from parallel_load import load_concurrently
+from period_utils import period_range, trend_window
+from queries import PERIOD_TOTALS_SQL, trend_sql
+
+# 基准测试：看板明细查询与趋势查询顺序执行和并发执行的墙钟时间对比（不经过结果缓存）
+# 用法：python bench_dashboard_load.py 手机号 [时间粒度] [开始日期] [趋势期数] [重复次数]
+phone_number = sys.argv[1] if len(sys.argv) > 1 else '13800138000'
+time_period_type = sys.argv[2] if len(sys.argv) > 2 else '年度'
+start_date = sys.argv[3] if len(sys.argv) > 3 else '2026-01-01'
+n_periods = int(sys.argv[4]) if len(sys.argv) > 4 else 12
+repeat = int(sys.argv[5]) if len(sys.argv) > 5 else 5
+
+
+def query(sql, params):
+    def run():
+        with get_pool().connection() as conn:
+            return pd.read_sql(sql, conn, params=params)
+    return run
+
+
+_, window_start, window_end = trend_window(time_period_type, start_date, n_periods)
+tasks = {
+    '明细/汇总': query(PERIOD_TOTALS_SQL, (phone_number, *period_range(time_period_type, start_date))),
+    '趋势': query(trend_sql(time_period_type), (phone_number, window_start, window_end)),
+}
+
+try:
+    # 预先建立连接，避免把建连时间算进第一轮
+    load_concurrently(tasks)
+    sequential, concurrent = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for func in tasks.values():
+            func()
+        sequential.append(time.perf_counter() - start)
+        concurrent.append(load_concurrently(tasks)[1]['并发墙钟'])
+    print(f"顺序执行: 平均 {sum(sequential) / repeat * 1000:8.1f} ms")
+    print(f"并发执行: 平均 {sum(concurrent) / repeat * 1000:8.1f} ms  提速 {sum(sequential) / sum(concurrent):.2f}x")
+except Exception as e:
+    print(f"基准测试失败: {e}")
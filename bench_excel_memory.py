@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import openpyxl
+import pandas as pd
+from data_import import clean_import_frame, read_excel_chunks, resolve_subject_ids
+
+# 基准测试：整表 pd.read_excel 与只读流式分块解析的峰值内存对比（不连接数据库）
+# 用法：python bench_excel_memory.py [行数 ...]，默认 1000 10000 100000
+sizes = [int(n) for n in sys.argv[1:]] or [1000, 10000, 100000]
+
+subjects_df = pd.DataFrame({
+    'subject_id': range(1, 11),
+    'subject_name': ['现金', '银行卡存款', '支付宝/微信余额', '理财/基金', '房产', '车辆', '信用卡欠款', '花呗/借呗欠款', '房贷', '车贷'],
+    'subject_type': ['资产'] * 6 + ['负债'] * 4,
+    'subject_seq': 1,
+})
+
+
+# 用write_only模式生成测试文件：每天一组科目
+def make_file(path, n_rows):
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("资产负债数据")
+    ws.append(['日期', '科目名称', '科目类型', '金额', '备注'])
+    dates = pd.date_range("2000-01-01", periods=n_rows // len(subjects_df) + 1, freq="D")
+    written = 0
+    for day in dates:
+        for row in subjects_df.itertuples(index=False):
+            if written >= n_rows:
+                break
+            ws.append([day.to_pydatetime(), row.subject_name, row.subject_type, 1000.0 + written, '备注'])
+            written += 1
+    wb.save(path)
+
+
+def whole_sheet(path):
+    df = clean_import_frame(pd.read_excel(path, sheet_name=0))
+    resolve_subject_ids(df, subjects_df)
+    return len(df)
+
+
+def streamed(path):
+    rows = 0
+    _, chunks = read_excel_chunks(path)
+    for chunk in chunks:
+        resolve_subject_ids(clean_import_frame(chunk), subjects_df)
+        rows += len(chunk)
+    return rows
+
+
+def measure(func, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = func(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, elapsed, peak / 1024 / 1024
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    print(f"{'行数':>8} {'方式':<10} {'耗时(秒)':>10} {'峰值内存(MB)':>14}")
+    for n_rows in sizes:
+        path = os.path.join(tmp, f"bench_{n_rows}.xlsx")
+        make_file(path, n_rows)
+        for label, func in [('整表读取', whole_sheet), ('流式分块', streamed)]:
+            rows, elapsed, peak = measure(func, path)
+            assert rows == n_rows
+            print(f"{n_rows:>8} {label:<10} {elapsed:>10.2f} {peak:>14.1f}")
@@ -0,0 +1,42 @@
+import sys
+import time
+from collections import Counter
+from io import BytesIO
+import pandas as pd
+from data_import import check_import_frame, export_frame, read_import_chunks
+
+# 基准测试：Excel/CSV/Parquet三种格式的解析+校验吞吐对比（不连接数据库）
+# 用法：python bench_formats.py [行数]，默认 100000
+n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+subjects = [('现金', '资产'), ('银行卡存款', '资产'), ('理财/基金', '资产'), ('信用卡欠款', '负债'), ('房贷', '负债')]
+
+
+# 生成测试数据：每天一组科目
+def make_frame(n):
+    dates = pd.date_range("2000-01-01", periods=n // len(subjects) + 1, freq="D").strftime("%Y-%m-%d")
+    rows = [(d, name, subject_type, 1000.0, '') for d in dates for name, subject_type in subjects][:n]
+    return pd.DataFrame(rows, columns=['日期', '科目名称', '科目类型', '金额', '备注'])
+
+
+# 按块读取并校验整个文件，与导入时的流程一致
+def parse(content, file_format):
+    _, chunks = read_import_chunks(BytesIO(content), f"bench.{file_format}")
+    seen = Counter()
+    rows = 0
+    for chunk in chunks:
+        cleaned, _ = check_import_frame(chunk, seen)
+        rows += len(cleaned)
+    return rows
+
+
+df = make_frame(n_rows)
+print(f"测试数据: {len(df)} 行")
+print(f"{'格式':<10}{'文件大小':>12}{'耗时':>10}{'行/秒':>12}")
+for file_format in ['xlsx', 'csv', 'parquet']:
+    content = export_frame(df, file_format)
+    start = time.perf_counter()
+    rows = parse(content, file_format)
+    elapsed = time.perf_counter() - start
+    assert rows == len(df)
+    print(f"{file_format:<10}{len(content) / 1024 / 1024:>10.1f}MB{elapsed:>9.2f}s{rows / elapsed:>12.0f}")
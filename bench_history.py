@@ -0,0 +1,50 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+import plotly.express as px
+from db_config import HISTORY_INFO
+from history import downsample_history, net_worth_series
+from period_utils import history_bucket
+
+# 基准测试：多年每日记录的净资产历史，从数据库结果到图表的计算耗时和发给浏览器的图表大小（不连接数据库）
+# 对比"每天一个点直接画图"与"按范围长度聚合 + LTTB降采样"两种方式
+# 用法：python bench_history.py [年数] [科目数]
+n_years = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+n_subjects = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+start_date, end_date = f"{2026 - n_years + 1}-01-01", "2026-12-31"
+
+rng = np.random.default_rng(0)
+days = pd.date_range(start_date, end_date, freq="D")
+subject_ids = np.arange(1, n_subjects + 1)
+subject_types = np.where(subject_ids % 4 == 0, '负债', '资产')
+balances = 1000 + rng.normal(0, 10, (len(days), n_subjects)).cumsum(axis=0)
+
+
+# 模拟HISTORY_SQL的结果：每个科目在每个聚合单位内的最后一条记录
+def sql_rows(bucket):
+    frame = pd.DataFrame({
+        'record_date': np.repeat(days, n_subjects), 'subject_id': np.tile(subject_ids, len(days)),
+        'subject_type': np.tile(subject_types, len(days)), 'current_balance': balances.ravel(),
+    })
+    freq = {'日': None, '周': 'W-MON', '月': 'MS'}[bucket]
+    frame['bucket'] = frame['record_date'] if freq is None else frame['record_date'].dt.to_period(freq[0]).dt.start_time
+    return frame.sort_values('record_date').groupby(['bucket', 'subject_id'], as_index=False).last()
+
+
+def figure_bytes(history):
+    return len(px.line(history, x='时间', y=['总资产', '总负债', '净资产']).to_json())
+
+
+for name, bucket, points in [
+    ('逐日，不降采样', '日', None),
+    ('自适应聚合+LTTB', history_bucket(start_date, end_date, HISTORY_INFO['max_buckets']), HISTORY_INFO['points']),
+]:
+    rows = sql_rows(bucket)
+    start = time.perf_counter()
+    history = net_worth_series(rows)
+    if points:
+        history = downsample_history(history, points)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<16} 按{bucket}  数据库返回 {len(rows):7d} 行  计算 {elapsed * 1000:7.1f} ms  "
+          f"图表 {len(history):5d} 个点 {figure_bytes(history) / 1024:8.1f} KB")
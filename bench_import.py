@@ -0,0 +1,81 @@
+import sys
+import time
+import pandas as pd
+import pymysql
+from conftest import bench_db_info
+from data_import import (
+    UPSERT_BALANCE_SQL, balance_rows, create_staging_table, ensure_user, merge_staged_balances, stage_balances, upsert_balances
+)
+
+# 基准测试：逐行 cursor.execute、分批多行写入、经临时中转表合并三种方式的吞吐对比
+# 用法：python bench_import.py [行数] [每批行数]
+# 连接环境变量 BALANCE_TEST_MYSQL 指定的测试库（见conftest.py），不连接 db_config.MYSQL_INFO 中的库；
+# 所有写入都在事务中执行并在结束时回滚，不会改动库中数据
+BENCH_PHONE = '19900000001'
+db_info = bench_db_info()
+n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+chunk_sizes = [int(sys.argv[2])] if len(sys.argv) > 2 else [100, 500, 1000]
+
+
+# 生成测试数据：现有科目轮流使用，每个科目一天一条
+def make_frame(subject_ids, n):
+    dates = pd.date_range("2000-01-01", periods=n // len(subject_ids) + 1, freq="D").strftime("%Y-%m-%d")
+    df = pd.DataFrame(
+        [(d, sid) for d in dates for sid in subject_ids][:n],
+        columns=['日期', 'subject_id']
+    )
+    df['金额'] = 1000.0
+    df['备注'] = ''
+    return df
+
+
+def timed(conn, write):
+    cursor = conn.cursor()
+    conn.begin()
+    ensure_user(cursor, BENCH_PHONE)
+    start = time.perf_counter()
+    write(cursor)
+    elapsed = time.perf_counter() - start
+    conn.rollback()
+    cursor.close()
+    return elapsed
+
+
+def per_row(df):
+    def write(cursor):
+        for row in balance_rows(df, BENCH_PHONE):
+            cursor.execute(UPSERT_BALANCE_SQL, row)
+    return write
+
+
+def batched(df, chunk_size):
+    def write(cursor):
+        upsert_balances(cursor, df, BENCH_PHONE, chunk_size)
+    return write
+
+
+def staged(df):
+    def write(cursor):
+        create_staging_table(cursor)
+        stage_balances(cursor, df)
+        merge_staged_balances(cursor, BENCH_PHONE)
+    return write
+
+
+try:
+    conn = pymysql.connect(**db_info)
+    subject_ids = pd.read_sql("SELECT subject_id FROM t_personal_subject", conn)['subject_id'].tolist()
+    df = make_frame(subject_ids, n_rows)
+    print(f"测试数据: {len(df)} 行")
+
+    elapsed = timed(conn, per_row(df))
+    print(f"逐行写入:           {elapsed:8.3f}s  {len(df) / elapsed:10.0f} 行/秒")
+    for chunk_size in chunk_sizes:
+        elapsed_batch = timed(conn, batched(df, chunk_size))
+        print(f"分批写入(每批{chunk_size:>5}): {elapsed_batch:8.3f}s  {len(df) / elapsed_batch:10.0f} 行/秒  提速 {elapsed / elapsed_batch:.1f}x")
+    elapsed_staged = timed(conn, staged(df))
+    print(f"中转表合并:         {elapsed_staged:8.3f}s  {len(df) / elapsed_staged:10.0f} 行/秒  提速 {elapsed / elapsed_staged:.1f}x")
+
+    conn.close()
+except Exception as e:
+    print(f"基准测试失败: {e}")
@@ -0,0 +1,75 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# 基准测试：app.py 的启动耗时（不连接数据库）
+# 每次在新进程中用 python -X importtime 执行一次 Streamlit AppTest，测量首屏（未登录时的输入手机号页面）的脚本耗时，
+# 并列出导入耗时最多的顶层模块；检查首屏没有加载只在图表/Excel/本地快照中用到的重型模块。
+# 首屏耗时的中位数超过预算或加载了重型模块时以非0状态退出，可作为回归检查。
+# 用法：python bench_startup.py [次数] [首屏预算秒数]
+n_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+budget = float(sys.argv[2]) if len(sys.argv) > 2 else 1.2
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+LAZY_MODULES = ['plotly.express', 'openpyxl', 'pyarrow.parquet']
+TOP_N = 10
+
+RUNNER = f"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file({os.path.join(APP_DIR, 'app.py')!r}, default_timeout=60).run()
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'first_paint': elapsed,
+    'exceptions': [e.value for e in at.exception],
+    'form': [w.label for w in at.text_input],
+    'loaded': [m for m in {LAZY_MODULES!r} if m in sys.modules],
+}}))
+"""
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+# 解析 -X importtime 的输出，返回 {顶层模块: 累计微秒}（同一顶层包只取最外层的那次导入）
+def top_level_imports(stderr):
+    totals = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            name = match.group(4).split('.')[0]
+            totals[name] = totals.get(name, 0) + int(match.group(2))
+    return totals
+
+
+def run_once():
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [APP_DIR, os.environ.get('PYTHONPATH')])))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUNNER], capture_output=True, text=True, env=env, cwd=APP_DIR
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1]), top_level_imports(proc.stderr)
+
+
+results = [run_once() for _ in range(n_runs)]
+first_paint = statistics.median(result['first_paint'] for result, _ in results)
+result, imports = results[-1]
+
+print(f"首屏耗时（{n_runs} 次中位数）: {first_paint:.3f}s，预算 {budget:.3f}s")
+print(f"首屏输入框: {result['form']}")
+print(f"\n导入耗时最多的 {TOP_N} 个顶层模块（最后一次运行）:")
+for name, micros in sorted(imports.items(), key=lambda item: item[1], reverse=True)[:TOP_N]:
+    print(f"  {name:<24}{micros / 1000:>10.1f} ms")
+
+failures = []
+if result['exceptions']:
+    failures.append(f"首屏出现异常: {result['exceptions']}")
+if result['loaded']:
+    failures.append(f"首屏加载了应延迟导入的模块: {result['loaded']}")
+if first_paint > budget:
+    failures.append(f"首屏耗时 {first_paint:.3f}s 超过预算 {budget:.3f}s")
+for failure in failures:
+    print(f"\n未通过: {failure}")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,32 @@
+import sys
+import time
+from collections import Counter
+import pandas as pd
+from data_import import check_import_frame
+
+# 基准测试：向量化校验整张表的耗时（不需要数据库）
+# 用法：python bench_validate.py [行数]
+# 测试数据中每100行混入一处错误，校验结果会列出全部问题
+n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+
+def make_frame(n):
+    df = pd.DataFrame({
+        '日期': pd.date_range("2000-01-01", periods=n, freq="D").strftime("%Y-%m-%d"),
+        '科目名称': [f"科目{i % 50}" for i in range(n)],
+        '科目类型': ['资产', '负债'] * (n // 2) + ['资产'] * (n % 2),
+        '金额': [1000.0] * n,
+        '备注': [''] * n,
+    }, index=range(2, n + 2))
+    df = df.astype({'金额': object})
+    df.loc[df.index[::100], '金额'] = 'abc'
+    df.loc[df.index[50::100], '科目类型'] = '收入'
+    return df
+
+
+df = make_frame(n_rows)
+start = time.perf_counter()
+_, issues = check_import_frame(df, Counter())
+elapsed = time.perf_counter() - start
+print(f"校验 {len(df)} 行: {elapsed:.3f}s，发现 {len(issues)} 处问题")
+print(issues['原因'].value_counts().to_string())
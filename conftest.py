@@ -0,0 +1,75 @@
+import os
+import sys
+from urllib.parse import unquote, urlparse
+
+import pymysql
+import pytest
+from db_config import MYSQL_INFO
+
+# ===================== 测试数据库 =====================
+# 需要数据库的测试只连接环境变量 BALANCE_TEST_MYSQL 指定的测试库（mysql://用户:密码@主机:端口/库名，
+# 需先执行 mysql_create_table.sql 建表），未设置时跳过，从不连接 db_config.MYSQL_INFO 中的库。
+# 每个测试模块在一个事务中写入测试数据，模块结束后回滚。写入数据的基准测试脚本（bench_import.py等）使用同一个测试库。
+TEST_DB_ENV = 'BALANCE_TEST_MYSQL'
+
+
+# 解析测试库地址，未设置时返回None
+def mysql_test_info():
+    url = os.environ.get(TEST_DB_ENV)
+    if not url:
+        return None
+    parsed = urlparse(url)
+    return {
+        "host": parsed.hostname,
+        "user": unquote(parsed.username or ''),
+        "password": unquote(parsed.password or ''),
+        "database": parsed.path.lstrip('/'),
+        "port": parsed.port or 3306,
+    }
+
+
+# 是否指向 db_config.MYSQL_INFO 中的库（测试和基准测试拒绝使用）
+def is_production_db(info):
+    return (info['host'], info['database']) == (MYSQL_INFO['host'], MYSQL_INFO['database'])
+
+
+# 基准测试脚本：返回测试库的连接参数，未设置或指向MYSQL_INFO中的库时退出
+def bench_db_info():
+    info = mysql_test_info()
+    if info is None:
+        sys.exit(f"未设置 {TEST_DB_ENV}，请指定单独的测试库（mysql://用户:密码@主机:端口/库名）")
+    if is_production_db(info):
+        sys.exit(f"{TEST_DB_ENV} 指向了 db_config.MYSQL_INFO 中的库，基准测试只能使用单独的测试库")
+    return info
+
+
+@pytest.fixture(scope="module")
+def test_db():
+    info = mysql_test_info()
+    if info is None:
+        pytest.skip(f"未设置 {TEST_DB_ENV}，跳过需要测试数据库的测试")
+    if is_production_db(info):
+        pytest.fail(f"{TEST_DB_ENV} 指向了 db_config.MYSQL_INFO 中的库，测试只能使用单独的测试库")
+    try:
+        conn = pymysql.connect(**info)
+    except Exception as e:
+        pytest.skip(f"测试数据库不可用: {e}")
+    conn.begin()
+    yield conn
+    conn.rollback()
+    conn.close()
+
+
+# 在本模块的测试事务中写入测试用户和余额记录：seed_balances(手机号, [(subject_id, 日期, 金额), ...])
+@pytest.fixture(scope="module")
+def seed_balances(test_db):
+    def seed(phone_number, rows):
+        with test_db.cursor() as cursor:
+            cursor.execute("INSERT IGNORE INTO t_user (phone_number) VALUES (%s)", (phone_number,))
+            cursor.executemany(
+                "INSERT IGNORE INTO t_personal_balance (phone_number, subject_id, record_date, current_balance, remark) "
+                "VALUES (%s, %s, %s, %s, '')",
+                [(phone_number, *row) for row in rows]
+            )
+    return seed
+
@@ -0,0 +1,640 @@
+import hashlib
+import math
+from collections import Counter
+from io import BytesIO
+
+import pandas as pd
+from db_config import BULK_IMPORT_INFO, IMPORT_CHUNK_SIZE
+from period_utils import period_range
+from queries import ROLLUP_REFRESH_SQL
+
+# ===================== 数据导入（不依赖Streamlit，可被脚本/基准测试复用） =====================
+REQUIRED_COLUMNS = ['日期', '科目名称', '科目类型', '金额']
+VALID_TYPES = ['资产', '负债']
+# 同名科目序号的上限（t_personal_subject.subject_seq 为TINYINT）
+MAX_SUBJECT_SEQ = 127
+# 校验问题列表的列
+ISSUE_COLUMNS = ['行号', '列', '级别', '原因']
+
+
+# 校验失败：issues 为完整的问题列表（行号/列/级别/原因）
+class ImportValidationError(ValueError):
+    def __init__(self, issues):
+        self.issues = issues
+        errors = issues[issues['级别'] == '错误']
+        preview = '；'.join(f"第{row['行号']}行 {row['列']}: {row['原因']}" for _, row in errors.head(3).iterrows())
+        more = f" 等共 {len(errors)} 处错误" if len(errors) > 3 else ''
+        super().__init__(f"{preview}{more}")
+
+
+# 以只读模式流式读取Excel第一个工作表，每chunk_size行生成一个DataFrame，内存占用与文件大小无关
+# DataFrame的索引为Excel中的行号（表头为第1行），便于在校验报告中定位
+# 返回 (数据总行数（来自工作表尺寸信息，可能为None）, DataFrame生成器)
+def read_excel_chunks(file, chunk_size=IMPORT_CHUNK_SIZE):
+    import openpyxl
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    ws = wb.worksheets[0]
+    total_rows = ws.max_row - 1 if ws.max_row else None
+
+    def chunks():
+        try:
+            rows = ws.iter_rows(values_only=True)
+            header = [str(value).strip() if value is not None else '' for value in next(rows, ())]
+            batch, row_numbers = [], []
+            for row_number, row in enumerate(rows, start=2):
+                # 跳过整行为空的行
+                if all(value is None for value in row):
+                    continue
+                batch.append(tuple(row[:len(header)]) + (None,) * (len(header) - len(row)))
+                row_numbers.append(row_number)
+                if len(batch) >= chunk_size:
+                    yield pd.DataFrame(batch, columns=header, index=row_numbers)
+                    batch, row_numbers = [], []
+            if batch or not header:
+                yield pd.DataFrame(batch, columns=header, index=row_numbers)
+        finally:
+            wb.close()
+
+    return total_rows, chunks()
+
+
+# 流式读取CSV文件（UTF-8，可带BOM），列与Excel模板相同
+# 空行保留在计数中再丢弃，使索引与文件中的行号一致（表头为第1行）；总行数未知，返回None
+def read_csv_chunks(file, chunk_size=IMPORT_CHUNK_SIZE, encoding='utf-8-sig'):
+    reader = pd.read_csv(
+        file, chunksize=chunk_size, encoding=encoding, skip_blank_lines=False,
+        dtype={'日期': str, '科目名称': str, '科目类型': str, '备注': str}
+    )
+
+    def chunks():
+        with reader:
+            for chunk in reader:
+                chunk.index = chunk.index + 2
+                yield chunk.dropna(how='all')
+
+    return None, chunks()
+
+
+# 按行组批量读取Parquet文件，总行数取自文件元数据；索引为数据行序号（从1开始）
+def read_parquet_chunks(file, chunk_size=IMPORT_CHUNK_SIZE):
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(file)
+
+    def chunks():
+        row_number = 1
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            chunk = batch.to_pandas()
+            chunk.index = range(row_number, row_number + len(chunk))
+            row_number += len(chunk)
+            yield chunk.dropna(how='all')
+
+    return parquet_file.metadata.num_rows, chunks()
+
+
+# 支持的导入格式：文件扩展名 -> 分块读取函数
+IMPORT_READERS = {
+    'xlsx': read_excel_chunks,
+    'csv': read_csv_chunks,
+    'parquet': read_parquet_chunks,
+}
+
+
+# 按文件扩展名选择读取方式，返回 (数据总行数（可能为None）, DataFrame生成器)
+def read_import_chunks(file, file_name, chunk_size=IMPORT_CHUNK_SIZE):
+    extension = file_name.rsplit('.', 1)[-1].lower()
+    if extension not in IMPORT_READERS:
+        raise ValueError(f"不支持的文件格式: .{extension}，请上传 {'/'.join(IMPORT_READERS)} 文件")
+    return IMPORT_READERS[extension](file, chunk_size)
+
+
+# 科目名称的比较键：与库中utf8mb4排序规则的比较结果一致（忽略大小写、全角/半角和重音），
+# 只差这些的名称在科目表的唯一键上是同一个科目；names为已去掉首尾空格的科目名称
+def subject_name_key(names):
+    folded = names.astype(str).str.normalize('NFKD').str.replace('[\u0300-\u036f]', '', regex=True)
+    return folded.str.casefold()
+
+
+# 一次向量化检查一块数据的所有规则，返回 (规范化后的数据, 问题列表)
+# 规范化：日期转为YYYY-MM-DD字符串，科目名称去掉首尾空格，金额转为数字（为空的行保留为空值，导入时跳过），备注空值转为空字符串
+# 问题列表的"行号"取自df的索引；级别为"错误"的问题会阻止导入，"警告"仅提示
+# 规范化后的"科目序号"列为同名科目的序号：文件中有"科目序号"列（导出的文件带有此列）时使用填写的值，
+# 未填写的行按同一科目在同一天第i次出现取i（与merge_subjects的编号规则一致）
+# seen 记录之前各块中每个(科目名称, 科目类型, 日期)出现的次数，使序号跨块连续，调用方在各块之间传入同一个Counter
+def check_import_frame(df, seen=None):
+    # 验证必要的列是否存在
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        issue = pd.DataFrame([[1, ', '.join(missing), '错误', '上传的文件缺少必要的列']], columns=ISSUE_COLUMNS)
+        return df, issue
+    
+    issues = []
+    def add(mask, column, reason, level='错误'):
+        if mask.any():
+            issues.append(pd.DataFrame({'行号': df.index[mask.to_numpy()], '列': column, '级别': level, '原因': reason}))
+    
+    # 日期：不能为空，且能解析为日期
+    parsed_dates = pd.to_datetime(df['日期'], errors='coerce')
+    add(df['日期'].isnull(), '日期', '日期不能为空')
+    add(df['日期'].notnull() & parsed_dates.isnull(), '日期', '日期格式不正确，请使用YYYY-MM-DD格式')
+    
+    # 科目名称、科目类型：不能为空，类型只能是资产/负债
+    names = df['科目名称'].astype(str).str.strip()
+    blank_names = df['科目名称'].isnull() | (names == '')
+    add(blank_names, '科目名称', '科目名称不能为空')
+    add(df['科目类型'].isnull(), '科目类型', '科目类型不能为空')
+    add(df['科目类型'].notnull() & ~df['科目类型'].isin(VALID_TYPES), '科目类型', "科目类型必须为'资产'或'负债'")
+    
+    # 金额：为空的行不导入（模板中未填写的科目），填写了则必须为数字
+    amounts = pd.to_numeric(df['金额'], errors='coerce')
+    blank_amounts = df['金额'].isnull()
+    add(blank_amounts & ~blank_names, '金额', '金额为空，该行不导入', level='警告')
+    add(df['金额'].notnull() & amounts.isnull(), '金额', '金额格式不正确，请输入数字')
+    
+    # 填写的科目序号：必须为1~MAX_SUBJECT_SEQ的整数
+    has_seq_column = '科目序号' in df.columns
+    given = pd.Series(float('nan'), index=df.index)
+    bad_seq = pd.Series(False, index=df.index)
+    if has_seq_column:
+        given = pd.to_numeric(df['科目序号'], errors='coerce')
+        bad_seq = df['科目序号'].notnull() & ~(given.between(1, MAX_SUBJECT_SEQ) & (given % 1 == 0))
+        add(bad_seq, '科目序号', f'科目序号必须为1~{MAX_SUBJECT_SEQ}的整数')
+    
+    # 未填写序号的行：同一科目在同一天的第几次出现，决定记到第几个同名科目上（不存在时自动创建）
+    dates = parsed_dates.dt.strftime('%Y-%m-%d')
+    has_key = ~blank_names & parsed_dates.notnull() & ~bad_seq & ~blank_amounts
+    keys = (subject_name_key(names[has_key]) + '|' + df['科目类型'].astype(str) + '|' + dates)[has_key]
+    # 逐行累加计数，耗时只与本块行数有关
+    counts = seen if seen is not None else Counter()
+    seq, repeated_day = [], []
+    for key, value in zip(keys.tolist(), given[has_key].tolist()):
+        implicit = math.isnan(value)
+        if implicit:
+            counts[key] += 1
+            value = counts[key]
+        seq.append(int(value))
+        repeated_day.append(implicit and value > 1)
+    repeated_day = pd.Series(repeated_day, index=keys.index, dtype=bool).reindex(df.index, fill_value=False)
+    key_seq = pd.Series(seq, index=keys.index, dtype='int64')
+    seq = key_seq.reindex(df.index)
+    add(repeated_day & seq.le(MAX_SUBJECT_SEQ), '科目名称', '同一科目在同一天出现多次，第i次出现的行记录到第i个同名科目上（不存在时自动创建）', level='警告')
+    add(seq.gt(MAX_SUBJECT_SEQ), '科目名称', f'同一科目在同一天出现超过{MAX_SUBJECT_SEQ}次，无法分别记录')
+    
+    # 填写了序号时，同一(科目, 序号)在同一天只能有一行，否则多行会写到同一个科目上
+    if has_seq_column:
+        slots = keys + '#' + key_seq.astype(str)
+        repeated = slots.duplicated() | slots.map(counts.__contains__).astype(bool)
+        counts.update(slots.tolist())
+        add(repeated.reindex(df.index, fill_value=False), '科目序号', '同一科目（科目序号相同）在同一天出现多次，请填写不同的科目序号')
+    
+    cleaned = df.copy()
+    cleaned['日期'] = dates
+    cleaned['科目名称'] = names.where(df['科目名称'].notnull(), None)
+    cleaned['金额'] = amounts
+    cleaned['科目序号'] = pd.array(seq, dtype='Int64')
+    # 处理备注列（如果不存在则添加），NaN值替换为空字符串
+    cleaned['备注'] = df['备注'].fillna('').astype(str) if '备注' in df.columns else ''
+    
+    issues = pd.concat(issues, ignore_index=True) if issues else pd.DataFrame(columns=ISSUE_COLUMNS)
+    return cleaned, issues
+
+
+# 校验并规范化一块导入数据，有错误时抛出ImportValidationError（包含全部问题）
+def clean_import_frame(df):
+    cleaned, issues = check_import_frame(df)
+    if (issues['级别'] == '错误').any():
+        raise ImportValidationError(issues)
+    return cleaned
+
+
+# 把问题列表导出为Excel文件（bytes），供下载
+def issues_to_excel(issues):
+    buffer = BytesIO()
+    issues.sort_values(['行号', '列']).to_excel(buffer, index=False, sheet_name="校验结果")
+    return buffer.getvalue()
+
+
+# 导出格式：扩展名 -> MIME类型
+EXPORT_MIME_TYPES = {
+    'xlsx': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    'csv': "text/csv",
+    'parquet': "application/vnd.apache.parquet",
+}
+
+
+# 把导出数据（列与导入模板相同）转换为指定格式的文件内容（bytes），导出的文件可直接重新导入（科目序号列区分同名科目）
+# CSV使用带BOM的UTF-8，Excel打开时中文不会乱码
+def export_frame(df, file_format):
+    if file_format == 'csv':
+        return df.to_csv(index=False).encode('utf-8-sig')
+    buffer = BytesIO()
+    if file_format == 'parquet':
+        df.to_parquet(buffer, index=False)
+    elif file_format == 'xlsx':
+        df.to_excel(buffer, index=False, sheet_name="资产负债数据")
+    else:
+        raise ValueError(f"不支持的导出格式: {file_format}")
+    return buffer.getvalue()
+
+
+# 把科目解析为科目ID，返回 (已解析的行, 未解析的行)，两者都带subject_id列
+# 按(科目名称, 科目类型, 科目序号)匹配科目表的(subject_name, subject_type, subject_seq)，名称按subject_name_key比较；
+# df为check_import_frame规范化后的数据
+def resolve_subject_ids(df, subjects_df):
+    df = df.copy()
+    ids = subjects_df[['subject_name', 'subject_type', 'subject_seq', 'subject_id']].astype({'subject_seq': 'int64'})
+    ids = ids.assign(subject_name=subject_name_key(ids['subject_name'].str.strip()))
+    keys = pd.DataFrame({
+        'subject_name': subject_name_key(df['科目名称']).to_numpy(),
+        'subject_type': df['科目类型'].to_numpy(),
+        'subject_seq': df['科目序号'].astype('int64').to_numpy(),
+    })
+    
+    # 左连接保持原有行顺序（科目表中的键唯一），未知科目得到空值
+    matched = keys.merge(ids, on=['subject_name', 'subject_type', 'subject_seq'], how='left')
+    df['subject_id'] = pd.array(matched['subject_id'].to_numpy(), dtype='Int64')
+    
+    known = df['subject_id'].notna().to_numpy()
+    return df[known].copy(), df[~known].copy()
+
+
+# 同一个科目名称在同一天出现多次时需要多个科目ID（如两张同名银行卡），
+# 用subject_seq区分，(subject_name, subject_type, subject_seq) 唯一
+# 需要的科目 = 各行的(科目名称, 科目类型, 科目序号)去重，即每个(名称, 类型)在同一天出现的最大次数个
+# 名称按subject_name_key去重，只差大小写等的名称取第一次出现的写法
+def subjects_needed(df):
+    needed = df[['科目名称', '科目类型', '科目序号']]
+    needed = needed[~needed.assign(科目名称=subject_name_key(needed['科目名称'])).duplicated()]
+    needed = needed.sort_values(['科目名称', '科目类型', '科目序号'], kind='stable')
+    needed.columns = ['subject_name', 'subject_type', 'subject_seq']
+    return needed.astype({'subject_seq': 'int64'}).reset_index(drop=True)
+
+
+# 读取全部科目
+SUBJECTS_SQL = """
+    SELECT subject_id, subject_name, subject_type, subject_seq FROM t_personal_subject
+    ORDER BY subject_type, subject_id
+"""
+
+
+def load_subjects(conn):
+    return pd.read_sql(SUBJECTS_SQL, conn)
+
+
+# 为未知科目批量创建科目：一条多行INSERT IGNORE（已存在的直接跳过），再用一次SELECT取回ID
+# 返回这些科目名称对应的全部科目 (subject_id, subject_name, subject_type, subject_seq)，
+# 名称为库中的写法（IN按库的排序规则比较，可能与文件中只差大小写），调用方用resolve_subject_ids按比较键匹配
+def create_subjects(cursor, unknown_df):
+    new_subjects = subjects_needed(unknown_df)
+    if new_subjects.empty:
+        return pd.DataFrame(columns=['subject_id', 'subject_name', 'subject_type', 'subject_seq'])
+    
+    cursor.executemany(
+        "INSERT IGNORE INTO t_personal_subject (subject_name, subject_type, subject_seq) VALUES (%s, %s, %s)",
+        list(new_subjects.itertuples(index=False, name=None))
+    )
+    
+    names = new_subjects['subject_name'].unique().tolist()
+    cursor.execute(
+        f"SELECT subject_id, subject_name, subject_type, subject_seq FROM t_personal_subject "
+        f"WHERE subject_name IN ({', '.join(['%s'] * len(names))}) ORDER BY subject_type, subject_id",
+        names
+    )
+    return pd.DataFrame(list(cursor.fetchall()), columns=['subject_id', 'subject_name', 'subject_type', 'subject_seq'])
+
+
+# 手机号：11位数字且以1开头（与登录页的规则一致）
+def is_valid_phone(phone_number):
+    return isinstance(phone_number, str) and len(phone_number) == 11 and phone_number.isdigit() and phone_number.startswith('1')
+
+
+# 确保用户存在于t_user表中
+def ensure_user(cursor, phone_number):
+    cursor.execute("SELECT phone_number FROM t_user WHERE phone_number = %s", (phone_number,))
+    if not cursor.fetchone():
+        cursor.execute("INSERT INTO t_user (phone_number) VALUES (%s)", (phone_number,))
+
+
+# 插入/更新语句：pymysql的executemany会把同一批参数改写成一条多行VALUES语句发送
+UPSERT_BALANCE_SQL = """
+    INSERT INTO t_personal_balance (phone_number, subject_id, record_date, current_balance, remark)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        current_balance = VALUES(current_balance),
+        remark = VALUES(remark)
+"""
+
+
+# 把待导入的DataFrame转换成UPSERT_BALANCE_SQL的参数列表（Python原生类型）
+def balance_rows(df, phone_number):
+    return list(zip(
+        [phone_number] * len(df),
+        df['subject_id'].astype(int).tolist(),
+        df['日期'].astype(str).tolist(),
+        df['金额'].astype(float).tolist(),
+        df['备注'].astype(str).tolist()
+    ))
+
+
+# 每行内容的哈希：(科目ID, 日期, 金额（保留两位小数，与DECIMAL(15,2)一致）, 备注)
+def row_hashes(df):
+    content = pd.DataFrame({
+        'subject_id': df['subject_id'].astype('int64').to_numpy(),
+        '日期': df['日期'].astype(str).to_numpy(),
+        '金额': df['金额'].astype(float).round(2).to_numpy(),
+        '备注': df['备注'].fillna('').astype(str).to_numpy(),
+    })
+    return pd.util.hash_pandas_object(content, index=False).to_numpy()
+
+
+# 查出待导入数据日期区间内已有的记录，一次按日期区间查询完成（走idx_user_date），列与待导入数据一致
+def existing_rows(cursor, df, phone_number):
+    columns = ['subject_id', '日期', '金额', '备注']
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+    cursor.execute(
+        "SELECT subject_id, record_date, current_balance, remark FROM t_personal_balance "
+        "WHERE phone_number = %s AND record_date >= %s AND record_date <= %s",
+        (phone_number, df['日期'].min(), df['日期'].max())
+    )
+    existing = pd.DataFrame(list(cursor.fetchall()), columns=columns)
+    existing['日期'] = existing['日期'].astype(str)
+    return existing
+
+
+# 与已有记录按(科目ID, 日期)比对行哈希，返回 (需要写入的行, 新增条数, 更新条数, 未变化条数)
+# 文件内重复的键以最后一行为准，与逐条写入的结果一致
+def diff_balances(df, existing):
+    keys = ['subject_id', '日期']
+    df = df.drop_duplicates(keys, keep='last')
+
+    def key_frame(frame):
+        return pd.DataFrame({
+            'subject_id': frame['subject_id'].astype('int64').to_numpy(),
+            '日期': frame['日期'].astype(str).to_numpy(),
+            '_hash': row_hashes(frame),
+        })
+
+    incoming, current = key_frame(df), key_frame(existing)
+    found = incoming.merge(current[keys], on=keys, how='left', indicator=True)['_merge'].eq('both').to_numpy()
+    same = incoming.merge(current, on=keys + ['_hash'], how='left', indicator=True)['_merge'].eq('both').to_numpy()
+    return df[~same], int((~found).sum()), int((found & ~same).sum()), int(same.sum())
+
+
+# 分批写入资产负债数据，每批一条多行INSERT；调用方负责开启/提交事务
+def write_balances(cursor, df, phone_number, chunk_size=IMPORT_CHUNK_SIZE):
+    rows = balance_rows(df, phone_number)
+    for i in range(0, len(rows), chunk_size):
+        cursor.executemany(UPSERT_BALANCE_SQL, rows[i:i + chunk_size])
+
+
+# 只写入新增或内容有变化的行，返回 (新增条数, 更新条数, 未变化条数)
+def upsert_balances(cursor, df, phone_number, chunk_size=IMPORT_CHUNK_SIZE):
+    changed, inserted, updated, unchanged = diff_balances(df, existing_rows(cursor, df, phone_number))
+    write_balances(cursor, changed, phone_number, chunk_size)
+    return inserted, updated, unchanged
+
+
+# ===================== 大批量导入：临时中转表 =====================
+# 已解析科目ID的数据先分批写入本连接的临时表（同一键以最后一行为准），
+# 再用集合操作统计新增/更新/未变化条数，并用一条INSERT ... SELECT只合并有变化的行
+# 临时表随连接存在，连接会被连接池复用，因此创建前和用完后都要删除
+STAGING_TABLE = "tmp_import_balance"
+
+STAGING_CREATE_SQL = f"""
+    CREATE TEMPORARY TABLE {STAGING_TABLE} (
+      subject_id INT(11) NOT NULL,
+      record_date DATE NOT NULL,
+      current_balance DECIMAL(15,2) NOT NULL,
+      remark VARCHAR(100) NOT NULL DEFAULT '',
+      PRIMARY KEY (subject_id, record_date)
+    )
+"""
+
+STAGING_INSERT_SQL = f"""
+    INSERT INTO {STAGING_TABLE} (subject_id, record_date, current_balance, remark)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE current_balance = VALUES(current_balance), remark = VALUES(remark)
+"""
+
+# 中转表中与明细表不同（新增或金额/备注有变化）的行
+STAGING_CHANGED = "(b.pb_id IS NULL OR b.current_balance <> st.current_balance OR COALESCE(b.remark, '') <> st.remark)"
+
+STAGING_JOIN = f"""
+    FROM {STAGING_TABLE} st
+    LEFT JOIN t_personal_balance b
+      ON b.phone_number = %s AND b.subject_id = st.subject_id AND b.record_date = st.record_date
+"""
+
+# 参数：(phone_number)
+STAGING_DIFF_SQL = f"""
+    SELECT
+        COUNT(*) AS total,
+        COALESCE(SUM(b.pb_id IS NULL), 0) AS inserted,
+        COALESCE(SUM(NOT {STAGING_CHANGED}), 0) AS unchanged,
+        MIN(CASE WHEN {STAGING_CHANGED} THEN st.record_date END) AS first_date,
+        MAX(CASE WHEN {STAGING_CHANGED} THEN st.record_date END) AS last_date
+    {STAGING_JOIN}
+"""
+
+# 参数：(phone_number, phone_number)；通过派生表取新值，避免ON DUPLICATE KEY UPDATE中列名与b冲突
+STAGING_MERGE_SQL = f"""
+    INSERT INTO t_personal_balance (phone_number, subject_id, record_date, current_balance, remark)
+    SELECT * FROM (
+        SELECT %s AS new_phone, st.subject_id AS new_subject_id, st.record_date AS new_date,
+               st.current_balance AS new_balance, st.remark AS new_remark
+        {STAGING_JOIN}
+        WHERE {STAGING_CHANGED}
+    ) AS changed
+    ON DUPLICATE KEY UPDATE current_balance = changed.new_balance, remark = changed.new_remark
+"""
+
+
+def create_staging_table(cursor):
+    drop_staging_table(cursor)
+    cursor.execute(STAGING_CREATE_SQL)
+
+
+def drop_staging_table(cursor):
+    cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {STAGING_TABLE}")
+
+
+# 把已解析科目ID的数据分批写入中转表
+def stage_balances(cursor, df, batch_size=BULK_IMPORT_INFO['batch_size']):
+    rows = list(zip(
+        df['subject_id'].astype(int).tolist(),
+        df['日期'].astype(str).tolist(),
+        df['金额'].astype(float).tolist(),
+        df['备注'].astype(str).tolist()
+    ))
+    for i in range(0, len(rows), batch_size):
+        cursor.executemany(STAGING_INSERT_SQL, rows[i:i + batch_size])
+
+
+# 统计中转表与明细表的差异并合并有变化的行
+# 返回 (新增条数, 更新条数, 未变化条数, 写入的最早日期, 写入的最晚日期)，没有写入时日期为None
+def merge_staged_balances(cursor, phone_number):
+    cursor.execute(STAGING_DIFF_SQL, (phone_number,))
+    total, inserted, unchanged, first_date, last_date = cursor.fetchone()
+    total, inserted, unchanged = int(total), int(inserted), int(unchanged)
+    if unchanged < total:
+        cursor.execute(STAGING_MERGE_SQL, (phone_number, phone_number))
+    first_date = str(first_date) if first_date is not None else None
+    last_date = str(last_date) if last_date is not None else None
+    return inserted, total - inserted - unchanged, unchanged, first_date, last_date
+
+
+# 计算上传文件内容的SHA-256，读取后把文件指针移回开头
+def file_hash(file):
+    digest = hashlib.sha256()
+    file.seek(0)
+    for block in iter(lambda: file.read(1 << 20), b''):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+# 该用户最近一次成功导入的文件哈希，没有导入记录时返回None
+def last_import_hash(cursor, phone_number):
+    cursor.execute(
+        "SELECT file_hash FROM t_import_log WHERE phone_number = %s ORDER BY log_id DESC LIMIT 1",
+        (phone_number,)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+# 记录一次成功的导入，与数据写入在同一事务中
+def record_import(cursor, phone_number, file_hash, file_name, result):
+    cursor.execute(
+        "INSERT INTO t_import_log (phone_number, file_hash, file_name, total_rows, inserted, updated, unchanged) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        (phone_number, file_hash, file_name[:255], result['rows'], result['inserted'], result['updated'], result['unchanged'])
+    )
+
+
+# 用户已有记录的科目ID（走idx_user_subject_date）
+def held_subject_ids(cursor, phone_number):
+    cursor.execute("SELECT DISTINCT subject_id FROM t_personal_balance WHERE phone_number = %s", (phone_number,))
+    return {row[0] for row in cursor.fetchall()}
+
+
+# 导入后刷新月度汇总表：重新计算本次导入涉及的整月（最早月份到最晚月份），与明细写入在同一事务中
+def refresh_monthly_rollup(cursor, phone_number, first_date, last_date):
+    start, _ = period_range('月度', first_date)
+    _, end = period_range('月度', last_date)
+    cursor.execute(ROLLUP_REFRESH_SQL, (phone_number, start, end))
+
+
+# 逐块导入：每块依次校验、解析科目、批量创建未知科目、只写入有变化的行，最后刷新月度汇总
+# chunks 为未校验的原始数据块；所有写入在调用方的同一事务中完成；on_progress(已处理行数) 在每块完成后调用
+# 发现错误后不再写入，但会继续校验剩余数据，最后抛出包含全部问题的ImportValidationError（调用方回滚事务）
+# 传入file_hash时：与该用户上一次导入的文件完全相同则直接跳过（skipped为True），导入成功后记录到t_import_log
+# bulk为None时按total_rows自动选择：达到BULK_IMPORT_INFO['threshold']行时经临时中转表合并，否则逐块比对写入
+# 返回 {'rows': 有效行数, 'inserted': 新增条数, 'updated': 更新条数, 'unchanged': 未变化条数,
+#       'new_subjects': 新建科目数, 'skipped': 是否跳过, 'bulk': 是否经中转表, 'issues': 问题列表}
+def import_chunks(cursor, chunks, phone_number, subjects_df, chunk_size=IMPORT_CHUNK_SIZE, on_progress=None,
+                  file_hash=None, file_name='', total_rows=None, bulk=None):
+    if bulk is None:
+        bulk = total_rows is not None and total_rows >= BULK_IMPORT_INFO['threshold']
+    ensure_user(cursor, phone_number)
+    result = {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'new_subjects': 0, 'skipped': False, 'bulk': bulk}
+    if file_hash is not None and last_import_hash(cursor, phone_number) == file_hash:
+        result['skipped'] = True
+        result['issues'] = pd.DataFrame(columns=ISSUE_COLUMNS)
+        return result
+    if bulk:
+        create_staging_table(cursor)
+    
+    seen = Counter()        # 之前各块中每个(科目名称, 科目类型, 日期)出现的次数，保证科目序号跨块连续
+    held = held_subject_ids(cursor, phone_number)   # 用户记录过非0金额的科目（含本文件中之前的行）
+    issues = []
+    has_errors = False
+    rows_read = 0
+    first_date = last_date = None
+    
+    for chunk in chunks:
+        rows_read += len(chunk)
+        chunk, chunk_issues = check_import_frame(chunk, seen)
+        issues.append(chunk_issues)
+        has_errors = has_errors or (chunk_issues['级别'] == '错误').any()
+        if has_errors:
+            if on_progress:
+                on_progress(rows_read)
+            continue
+        
+        chunk = chunk[chunk['金额'].notna()]
+        if not chunk.empty:
+            # 科目序号已按整个文件计算，本块需要而科目表中还没有的(名称, 类型, 序号)在这里创建；
+            # 只为金额不为0的行创建科目
+            resolved, unresolved = resolve_subject_ids(chunk, subjects_df)
+            unresolved = unresolved[unresolved['金额'] != 0]
+            if not unresolved.empty:
+                known = len(subjects_df)
+                subjects_df = pd.concat([subjects_df, create_subjects(cursor, unresolved)], ignore_index=True)
+                subjects_df = subjects_df.drop_duplicates('subject_id', keep='last')
+                result['new_subjects'] += len(subjects_df) - known
+                created, unresolved = resolve_subject_ids(unresolved, subjects_df)
+                if not unresolved.empty:
+                    raise ValueError(f"以下科目未能创建: {', '.join(unresolved['科目名称'].unique())}")
+                resolved = pd.concat([resolved, created]).sort_index()
+            
+            # 金额为0的行：已有记录的科目照常写入（如贷款还清，期末余额口径下该科目从此为0）；
+            # 从未记录过的科目记0不影响任何汇总，不导入
+            held.update(resolved.loc[resolved['金额'] != 0, 'subject_id'].astype(int).tolist())
+            resolved = resolved[(resolved['金额'] != 0) | resolved['subject_id'].isin(held)]
+            result['rows'] += len(resolved)
+            if bulk:
+                # 先写入中转表，全部数据到齐后统一合并
+                stage_balances(cursor, resolved)
+            else:
+                changed, inserted, updated, unchanged = diff_balances(resolved, existing_rows(cursor, resolved, phone_number))
+                write_balances(cursor, changed, phone_number, chunk_size)
+                result['inserted'] += inserted
+                result['updated'] += updated
+                result['unchanged'] += unchanged
+                # 只有写入过的日期需要刷新月度汇总
+                if not changed.empty:
+                    first_date = min(first_date or changed['日期'].min(), changed['日期'].min())
+                    last_date = max(last_date or changed['日期'].max(), changed['日期'].max())
+        
+        if on_progress:
+            on_progress(rows_read)
+    
+    result['issues'] = pd.concat(issues, ignore_index=True) if issues else pd.DataFrame(columns=ISSUE_COLUMNS)
+    if has_errors:
+        raise ImportValidationError(result['issues'])
+    
+    if bulk:
+        result['inserted'], result['updated'], result['unchanged'], first_date, last_date = merge_staged_balances(cursor, phone_number)
+        drop_staging_table(cursor)
+    if first_date is not None:
+        refresh_monthly_rollup(cursor, phone_number, first_date, last_date)
+    if file_hash is not None:
+        record_import(cursor, phone_number, file_hash, file_name, result)
+    return result
+
+
+# 在一个事务中导入一组数据块（import_chunks的参数原样传入），出错时回滚后重新抛出异常
+def import_in_transaction(conn, chunks, phone_number, subjects_df, **options):
+    with conn.cursor() as cursor:
+        conn.begin()
+        try:
+            result = import_chunks(cursor, chunks, phone_number, subjects_df, **options)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return result
+
+
+# 导入一个文件（文件对象，按file_name的扩展名选择格式）：计算哈希、按块解析，在一个事务中校验并写入
+# on_progress(已处理行数, 总行数) 在每块完成后调用；返回import_chunks的结果，校验未通过时抛出ImportValidationError
+def import_file(conn, file, file_name, phone_number, subjects_df, on_progress=None, chunk_size=IMPORT_CHUNK_SIZE):
+    # 文件哈希需在解析前计算（解析器会从当前位置继续读取）
+    upload_hash = file_hash(file)
+    total_rows, chunks = read_import_chunks(file, file_name, chunk_size)
+    return import_in_transaction(
+        conn, chunks, phone_number, subjects_df, chunk_size=chunk_size,
+        on_progress=(lambda rows_done: on_progress(rows_done, total_rows)) if on_progress else None,
+        file_hash=upload_hash, file_name=file_name, total_rows=total_rows
+    )
@@ -8,3 +8,75 @@ MYSQL_INFO = {
 
 
 TITLE = "个人资产负债表"
+
+# 导入时每批写入的行数（一条多行INSERT语句）
+IMPORT_CHUNK_SIZE = 500
+
+# 看板明细表每页的行数（按页从数据库读取）
+DETAIL_PAGE_SIZE = 50
+
+# 大批量导入：文件行数达到阈值时改为先写入临时中转表，再用一条INSERT ... SELECT合并到明细表
+BULK_IMPORT_INFO = {
+    "threshold": 20000,     # 自动切换的行数阈值
+    "batch_size": 5000      # 写入中转表时每条多行INSERT的行数
+}
+
+# 后台导入任务配置
+JOB_INFO = {
+    "workers": 2,            # 工作线程数（同时运行的导入数），每个导入占用一个连接池连接
+    "keep_finished": 200     # 服务端最多保留的已结束任务数
+}
+
+# 看板数据并发加载的线程数（每个加载任务占用一个连接池连接）
+LOADER_INFO = {
+    "workers": 4
+}
+
+# 看板查询结果缓存配置（每个缓存单独计算）
+CACHE_INFO = {
+    "max_entries": 256,              # 最大缓存条目数
+    "max_bytes": 64 * 1024 * 1024    # 内存预算（字节），按DataFrame的memory_usage(deep=True)估算
+}
+
+# 登录后在后台预取默认视图的数据，预取单独使用少量线程，不与页面加载争用
+PREFETCH_INFO = {
+    "workers": 1,           # 预取线程数（同时占用的连接池连接数）
+    "max_pending": 20       # 最多同时排队/进行的用户预取数，超出时不再预取
+}
+
+# 会话中直接执行的查询（明细分页、科目列表、导出等，在页面脚本线程中执行）可同时占用的连接数
+POOL_HEADROOM = 4
+
+# 数据库连接池配置
+# 大小按后台线程数计算：看板加载、后台导入、预取的线程各自最多同时占用一个连接，全部占满时仍留有POOL_HEADROOM个给页面查询；
+# 调整上面的线程数时连接池随之调整
+POOL_INFO = {
+    "size": LOADER_INFO['workers'] + JOB_INFO['workers'] + PREFETCH_INFO['workers'] + POOL_HEADROOM,   # 最大连接数
+    "recycle": 3600,     # 连接最长存活秒数，超时后重建
+    "timeout": 10,       # 借出连接的最长等待秒数
+    "pre_ping": True     # 借出前ping检测失效连接
+}
+
+# 查询埋点：慢查询阈值、指标文件（None表示不写文件）及格式、侧边栏调试面板
+METRICS_INFO = {
+    "slow_ms": 500,             # 耗时达到该毫秒数的语句连同参数写入日志
+    "file": None,               # 指标文件路径，如 "query_metrics.jsonl" 或 "query_metrics.prom"
+    "format": "jsonl",          # "jsonl"：每个查询/缓存事件追加一行；"prometheus"：定期重写为Prometheus文本格式
+    "flush_seconds": 10,        # prometheus格式的最短重写间隔（秒）
+    "keep_slow": 200,           # 内存中保留的最近慢查询数（调试面板显示）
+    "max_fingerprints": 500,    # 按 指纹+调用函数 汇总的最多条目数，超出后新语句计入一个"其他语句"条目
+    "debug_panel": False        # 是否在侧边栏显示"查询统计"面板（含所有用户的慢查询参数，仅供调试）
+}
+
+# 自定义范围的净资产历史图：数据库聚合后的最多时间点数（决定按日/周/月聚合）和传给图表的点数上限（LTTB降采样）
+HISTORY_INFO = {
+    "max_buckets": 2000,
+    "points": 500
+}
+
+# 本地快照缓存：把每个用户的明细保存为本地Parquet文件并增量同步，看板的汇总/趋势改为在本地计算（需执行迁移006）
+LOCAL_CACHE_INFO = {
+    "enabled": False,           # 是否启用
+    "directory": "local_cache", # 快照文件目录（每个用户一个 <手机号>.parquet）
+    "sync_seconds": 60          # 同一用户两次增量同步的最短间隔（秒）；本进程内导入后立即同步
+}
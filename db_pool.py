@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+from db_config import MYSQL_INFO, POOL_INFO
+from query_metrics import InstrumentedCursor
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+# ===================== 进程级数据库连接池 =====================
+# Streamlit每次rerun都会重新执行app.py，但被import的模块只加载一次，
+# 所以连接池放在独立模块中，所有会话共享同一个池
+class ConnectionPool:
+    def __init__(self, conn_info, size=5, recycle=3600, timeout=10, pre_ping=True, connect=None):
+        self.conn_info = dict(conn_info)
+        self.connect = connect or pymysql.connect   # 建立连接的函数，参数同pymysql.connect
+        self.size = size            # 最大连接数
+        self.recycle = recycle      # 连接存活超过该秒数后重建，<=0表示不回收
+        self.timeout = timeout      # 借出连接时最长等待秒数
+        self.pre_ping = pre_ping    # 借出前先ping一次，剔除失效连接
+
+        self._idle = deque()        # 空闲连接: (conn, 创建时间)
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,         # 借出次数
+            'waits': 0,             # 因连接池已满而等待的次数
+            'timeouts': 0,          # 等待超时次数
+            'new_connections': 0,   # 新建连接次数
+            'recycled': 0,          # 因超龄被回收的连接数
+            'ping_failures': 0,     # pre-ping失败的连接数
+            'discarded': 0,         # 归还时因异常被丢弃的连接数
+        }
+
+    def _connect(self):
+        # 使用autocommit，只读查询结束后不会残留事务快照；写操作显式调用conn.begin()
+        # 默认游标记录每条语句的耗时/行数（见query_metrics）
+        conn = self.connect(autocommit=True, **{'cursorclass': InstrumentedCursor, **self.conn_info})
+        with self._cond:
+            self._stats['new_connections'] += 1
+        return conn, time.monotonic()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            waited = False
+            while not self._idle and self._in_use >= self.size:
+                if not waited:
+                    self._stats['waits'] += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"等待数据库连接超时（{self.timeout}秒，连接池大小{self.size}）")
+                self._cond.wait(remaining)
+            self._in_use += 1
+            self._stats['checkouts'] += 1
+            item = self._idle.pop() if self._idle else None
+
+        # 建连/ping等网络操作放在锁外执行
+        try:
+            return self._prepare(item)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def _prepare(self, item):
+        if item is None:
+            return self._register(self._connect())
+
+        conn, created_at = item
+        if self.recycle > 0 and time.monotonic() - created_at > self.recycle:
+            self._close_quietly(conn)
+            with self._cond:
+                self._stats['recycled'] += 1
+            return self._register(self._connect())
+
+        if self.pre_ping:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                self._close_quietly(conn)
+                with self._cond:
+                    self._stats['ping_failures'] += 1
+                return self._register(self._connect())
+
+        return self._register(item)
+
+    def _register(self, item):
+        conn, created_at = item
+        conn._pool_created_at = created_at
+        return conn
+
+    def release(self, conn, failed=False):
+        keep = conn.open
+        if keep and (failed or conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS):
+            # 出错或事务未结束时先回滚，回滚失败则直接丢弃该连接
+            try:
+                conn.rollback()
+            except Exception:
+                keep = False
+
+        with self._cond:
+            self._in_use -= 1
+            if keep:
+                self._idle.append((conn, getattr(conn, '_pool_created_at', time.monotonic())))
+            else:
+                self._stats['discarded'] += 1
+            self._cond.notify()
+
+        if not keep:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, failed=True)
+            raise
+        else:
+            self.release(conn)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self.size
+            stats['in_use'] = self._in_use
+            stats['idle'] = len(self._idle)
+        return stats
+
+    def close(self):
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# 获取进程级共享连接池（首次调用时创建）
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(MYSQL_INFO, **POOL_INFO)
+    return _pool
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# ===================== 净资产历史：逐单位汇总与降采样（不依赖数据库/Streamlit） =====================
+# 数据库按聚合单位返回每个科目的最后一条余额（queries.HISTORY_SQL），这里把各科目的余额向后填充
+# （某个单位没有记录的科目沿用之前的余额），按科目类型相加得到每个单位的总资产/总负债/净资产，
+# 再用LTTB（Largest-Triangle-Three-Buckets）把点数降到固定上限后交给Plotly，保留曲线的峰谷形状。
+HISTORY_COLUMNS = ['时间', '总资产', '总负债', '净资产']
+
+
+# 由HISTORY_SQL的结果（bucket, record_date, subject_id, subject_type, current_balance）计算每个单位的余额
+def net_worth_series(rows):
+    if rows.empty:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    rows = rows.assign(bucket=pd.to_datetime(rows['bucket']), record_date=pd.to_datetime(rows['record_date']))
+    # 期初余额与第一个单位内的记录同属一个单位，取日期最后的一条
+    last = rows.sort_values('record_date').drop_duplicates(['bucket', 'subject_id'], keep='last')
+    balances = last.pivot(index='bucket', columns='subject_id', values='current_balance').sort_index().ffill().fillna(0)
+    balances = balances.astype(float)
+    types = last.drop_duplicates('subject_id').set_index('subject_id')['subject_type']
+    assets = balances.loc[:, types.index[types == '资产']].sum(axis=1)
+    liabilities = balances.loc[:, types.index[types == '负债']].sum(axis=1)
+    return pd.DataFrame({
+        '时间': balances.index, '总资产': assets.to_numpy(), '总负债': liabilities.to_numpy(),
+        '净资产': (assets - liabilities).to_numpy(),
+    })
+
+
+# LTTB降采样：从(x, y)中选出n_out个点的下标（含首尾两点），点数不超过n_out时全部保留
+# 除首尾外的点均分为n_out-2个桶，每个桶选出与上一个选中点、下一个桶均值点所成三角形面积最大的点
+def lttb(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        areas = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(areas.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+# 按净资产曲线选点，总资产/总负债取相同的时间点
+def downsample_history(history, points):
+    if len(history) <= points:
+        return history
+    x = history['时间'].to_numpy().astype('datetime64[ns]').astype(np.int64)
+    return history.iloc[lttb(x, history['净资产'].to_numpy(), points)].reset_index(drop=True)
@@ -0,0 +1,188 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from io import BytesIO
+
+from db_config import IMPORT_CHUNK_SIZE, JOB_INFO
+from db_pool import get_pool
+from data_import import ImportValidationError, import_file
+from result_cache import invalidate_catalog, invalidate_user
+
+# ===================== 后台导入任务 =====================
+# 导入作为任务提交到进程级的工作线程池，页面只轮询任务状态，不会阻塞会话的脚本线程；
+# 任务状态保存在服务端，浏览器刷新后仍可按手机号查到。
+# 工作线程数固定且小于连接池大小；排队的任务按用户轮流执行，同一用户同一时间只运行一个任务，
+# 多个用户同时导入时不会占满数据库连接，也不会有人一直排在别人的大批量任务后面。
+PENDING, RUNNING, SUCCEEDED, FAILED = '排队中', '导入中', '成功', '失败'
+
+
+class ImportJob:
+    def __init__(self, job_id, phone_number, file_name, content, subjects_df):
+        self.job_id = job_id
+        self.phone_number = phone_number
+        self.file_name = file_name
+        self.status = PENDING
+        self.rows_done = 0              # 已处理行数
+        self.total_rows = None          # 文件总行数（CSV为None）
+        self.message = ''
+        self.issues = None              # 校验问题列表（校验未通过时）
+        self.changed = False            # 数据是否有变化
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.content = content          # 上传的文件内容，任务结束后释放
+        self.subjects_df = subjects_df  # 提交时的科目信息，导入中遇到未知科目会自动创建
+
+    @property
+    def done(self):
+        return self.status in (SUCCEEDED, FAILED)
+
+    # 进度（0~1），总行数未知时返回None
+    def progress(self):
+        if self.done:
+            return 1.0
+        if not self.total_rows:
+            return None
+        return min(self.rows_done / self.total_rows, 1.0)
+
+
+# 执行一个导入任务：解析文件并在一个事务中校验、写入，结束后更新任务的状态和提示信息
+def run_import_job(job, chunk_size=IMPORT_CHUNK_SIZE):
+    def on_progress(rows_done, total_rows):
+        job.rows_done, job.total_rows = rows_done, total_rows
+
+    try:
+        with get_pool().connection() as conn:
+            result = import_file(
+                conn, BytesIO(job.content), job.file_name, job.phone_number, job.subjects_df, on_progress, chunk_size
+            )
+    except ImportValidationError as e:
+        errors = (e.issues['级别'] == '错误').sum()
+        job.status, job.message, job.issues = FAILED, f"文件校验未通过，共 {errors} 处错误，请修改后重新上传", e.issues
+        return
+    except Exception as e:
+        job.status, job.message = FAILED, f"导入失败: {str(e)}"
+        return
+
+    if result['skipped']:
+        job.status, job.message = SUCCEEDED, "文件与上一次导入的完全相同，无需重复导入"
+        return
+    # 科目有变化时才清除科目/模板缓存；数据有变化时只使该用户的缓存失效
+    if result['new_subjects']:
+        invalidate_catalog()
+    job.changed = result['inserted'] + result['updated'] > 0
+    if job.changed:
+        invalidate_user(job.phone_number)
+    job.status = SUCCEEDED
+    job.message = (
+        f"成功导入 {result['rows']} 条记录（新增 {result['inserted']} 条，"
+        f"更新 {result['updated']} 条，未变化 {result['unchanged']} 条）"
+    )
+
+
+class ImportJobQueue:
+    def __init__(self, workers=2, keep_finished=200, runner=run_import_job):
+        self.workers = workers              # 工作线程数
+        self.keep_finished = keep_finished  # 最多保留的已结束任务数，超出时丢弃最早的
+        self.runner = runner
+        self._jobs = OrderedDict()          # job_id -> ImportJob，按提交顺序排列
+        self._pending = OrderedDict()       # 手机号 -> 排队中的任务，按轮到的先后排列
+        self._running = set()               # 正在运行任务的手机号
+        self._ids = itertools.count(1)
+        self._threads = []
+        self._cond = threading.Condition()
+        self._stats = {'submitted': 0, 'succeeded': 0, 'failed': 0}
+
+    def submit(self, phone_number, file_name, content, subjects_df=None):
+        with self._cond:
+            job = ImportJob(next(self._ids), phone_number, file_name, content, subjects_df)
+            self._jobs[job.job_id] = job
+            self._pending.setdefault(phone_number, deque()).append(job)
+            self._stats['submitted'] += 1
+            # 工作线程在第一次提交时启动
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"import-worker-{len(self._threads) + 1}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._cond.notify()
+        return job
+
+    # 取下一个可运行的任务：跳过已有任务在运行的用户，取出后该用户排到队尾（调用方持有锁）
+    def _next_job(self):
+        for phone_number, queue in self._pending.items():
+            if phone_number in self._running:
+                continue
+            job = queue.popleft()
+            del self._pending[phone_number]
+            if queue:
+                self._pending[phone_number] = queue
+            self._running.add(phone_number)
+            job.status = RUNNING
+            job.started_at = time.time()
+            return job
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+            try:
+                self.runner(job)
+            except Exception as e:
+                job.status, job.message = FAILED, f"导入失败: {str(e)}"
+            finally:
+                with self._cond:
+                    if not job.done:
+                        job.status = FAILED
+                    job.finished_at = time.time()
+                    job.content = job.subjects_df = None
+                    self._stats['succeeded' if job.status == SUCCEEDED else 'failed'] += 1
+                    self._running.discard(job.phone_number)
+                    # 运行期间又提交的任务排在其他等待中的用户之后
+                    if job.phone_number in self._pending:
+                        self._pending.move_to_end(job.phone_number)
+                    self._prune()
+                    # 该用户的下一个任务可以运行了
+                    self._cond.notify_all()
+
+    # 已结束的任务超过keep_finished个时，从最早提交的开始丢弃（调用方持有锁）
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    # 某用户的任务，最新提交的在前
+    def jobs_for(self, phone_number):
+        with self._cond:
+            return [job for job in reversed(self._jobs.values()) if job.phone_number == phone_number]
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['workers'] = self.workers
+            stats['pending'] = sum(len(queue) for queue in self._pending.values())
+            stats['running'] = len(self._running)
+            stats['kept'] = len(self._jobs)
+        return stats
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+# 获取进程级共享的导入任务队列（首次调用时创建）
+def get_import_jobs():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = ImportJobQueue(**JOB_INFO)
+    return _queue
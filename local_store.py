@@ -0,0 +1,197 @@
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+from db_config import LOCAL_CACHE_INFO
+from db_pool import get_pool
+from period_utils import PERIOD_MONTHS, period_label, trend_period_ends, trend_window
+from result_cache import user_version
+
+# ===================== 本地快照缓存（可选） =====================
+# 每个用户的全部明细保存为本地Parquet文件（<目录>/<手机号>.parquet），看板的汇总和趋势直接用pandas在本地计算，
+# 缓存失效或进程重启后不必再通过网络拉取全部历史。
+# 同步是增量的：只拉取 updated_at 不早于本地最新updated_at的行（新增和修改的行，需要迁移006），
+# 再核对本地与库中的行集合（行数、pb_id的最大值与总和），不一致时重新全量同步。只核对行数不够：
+# 有行被删除（合并科目、手工修改等）的同时，又有updated_at早于本地最新updated_at的行提交（并发导入的事务较晚提交），
+# 两者的行数相互抵消。
+# 同一用户两次同步之间至少间隔sync_seconds秒；本进程内导入数据后（用户数据版本号变化）立即同步。
+# 同步失败（如数据库连接慢或断开）时使用已有的本地快照。
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SQL = """
+    SELECT pb_id, subject_id, record_date, current_balance, remark, updated_at
+    FROM t_personal_balance
+    WHERE phone_number = %s
+"""
+# 增量：走 idx_user_updated (phone_number, updated_at)
+DELTA_SQL = SNAPSHOT_SQL + " AND updated_at >= %s"
+# 行集合的摘要：走 idx_user_updated（二级索引自带主键pb_id），不读取数据行
+COUNT_SQL = """
+    SELECT COUNT(*) AS n, MAX(pb_id) AS max_id, SUM(pb_id) AS sum_id
+    FROM t_personal_balance
+    WHERE phone_number = %s
+"""
+DETAIL_COLUMNS = ['subject_name', 'subject_type', 'current_balance', 'remark', 'record_date']
+
+
+# (行数, pb_id最大值, pb_id总和)，没有行时为 (0, None, None)
+def _rowset(n, max_id, sum_id):
+    return (int(n), None, None) if not n else (int(n), int(max_id), int(sum_id))
+
+
+# 统一快照的列类型（日期为datetime64，金额为float）
+def _normalize(df):
+    return df.assign(
+        record_date=pd.to_datetime(df['record_date']),
+        current_balance=df['current_balance'].astype(float),
+        remark=df['remark'].fillna(''),
+        updated_at=pd.to_datetime(df['updated_at']),
+    )
+
+
+class LocalStore:
+    def __init__(self, directory, sync_seconds=60, connection=None):
+        self.directory = directory
+        self.sync_seconds = sync_seconds
+        self.connection = connection or (lambda: get_pool().connection())
+        self._synced = {}           # 手机号 -> (同步时间, 同步时的用户数据版本号)
+        self._user_locks = {}
+        self._lock = threading.Lock()
+        self._stats = {'full_syncs': 0, 'delta_syncs': 0, 'delta_rows': 0, 'fresh_reads': 0, 'stale_reads': 0}
+
+    def path(self, phone_number):
+        return os.path.join(self.directory, f"{phone_number}.parquet")
+
+    def _user_lock(self, phone_number):
+        with self._lock:
+            return self._user_locks.setdefault(phone_number, threading.Lock())
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _read(self, phone_number):
+        path = self.path(phone_number)
+        if not os.path.exists(path):
+            return None
+        import pyarrow.parquet as pq
+        return pq.read_table(path).to_pandas()
+
+    # 先写临时文件再替换，读取方不会读到写了一半的文件
+    def _write(self, phone_number, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self.path(phone_number)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp)
+        os.replace(tmp, self.path(phone_number))
+
+    # 某用户的全部明细（pb_id, subject_id, record_date, current_balance, remark, updated_at），需要时先同步
+    def rows(self, phone_number):
+        with self._user_lock(phone_number):
+            local = self._read(phone_number)
+            # 版本号在同步前读取：同步期间有新的导入时，下次读取会再同步一次
+            version = user_version(phone_number)
+            synced = self._synced.get(phone_number)
+            if (local is not None and synced and synced[1] == version
+                    and time.monotonic() - synced[0] < self.sync_seconds):
+                self._count('fresh_reads')
+                return local
+            try:
+                local = self._sync(phone_number, local)
+            except Exception as e:
+                if local is None:
+                    raise
+                logger.warning("同步本地快照失败，使用已有快照（%s）: %s", phone_number, e)
+                self._count('stale_reads')
+                return local
+            self._synced[phone_number] = (time.monotonic(), version)
+            return local
+
+    def _sync(self, phone_number, local):
+        with self.connection() as conn:
+            if local is not None and not local.empty:
+                watermark = local['updated_at'].max().to_pydatetime()
+                delta = _normalize(pd.read_sql(DELTA_SQL, conn, params=(phone_number, watermark)))
+                merged = local if delta.empty else pd.concat([local, delta]).drop_duplicates('pb_id', keep='last')
+                remote = pd.read_sql(COUNT_SQL, conn, params=(phone_number,)).iloc[0]
+                if (_rowset(len(merged), merged['pb_id'].max(), merged['pb_id'].sum())
+                        == _rowset(remote['n'], remote['max_id'], remote['sum_id'])):
+                    if not delta.empty:
+                        merged = merged.reset_index(drop=True)
+                        self._write(phone_number, merged)
+                    self._count('delta_syncs')
+                    self._count('delta_rows', len(delta))
+                    return merged
+            full = _normalize(pd.read_sql(SNAPSHOT_SQL, conn, params=(phone_number,)))
+        self._write(phone_number, full)
+        self._count('full_syncs')
+        return full
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['users'] = len(self._synced)
+        return stats
+
+
+# 每个科目在period_end（不含）之前的最后一条记录
+def latest_per_subject(rows, period_end):
+    before = rows[rows['record_date'] < pd.Timestamp(period_end)]
+    return before.sort_values(['record_date', 'pb_id']).drop_duplicates('subject_id', keep='last')
+
+
+# 在本地计算看板明细（每个科目一行），与 PERIOD_TOTALS_SQL / ASOF_DETAIL_SQL 的结果一致
+def local_detail(rows, subjects_df, period_start, period_end, as_of=False):
+    if as_of:
+        picked = latest_per_subject(rows, period_end)
+    else:
+        in_period = rows[(rows['record_date'] >= pd.Timestamp(period_start)) & (rows['record_date'] < pd.Timestamp(period_end))]
+        picked = in_period.groupby('subject_id', as_index=False).agg(
+            current_balance=('current_balance', 'sum'), record_date=('record_date', 'max')
+        ).assign(remark='')
+    detail = picked.merge(subjects_df[['subject_id', 'subject_name', 'subject_type']], on='subject_id', how='left')
+    return detail.sort_values('record_date', ascending=False)[DETAIL_COLUMNS].reset_index(drop=True)
+
+
+def _type_totals(rows):
+    totals = rows.groupby('subject_type')['current_balance'].sum()
+    return float(totals.get('资产', 0)), float(totals.get('负债', 0))
+
+
+# 在本地计算趋势数据 (period, 总资产, 总负债)，只包含有数据的时间单位（与趋势SQL一致，由调用方补齐）
+def local_trend(rows, subjects_df, time_period_type, current_start_date, n_periods=3, as_of=False):
+    typed = rows.merge(subjects_df[['subject_id', 'subject_type']], on='subject_id')
+    records = []
+    if as_of:
+        for label, period_end in trend_period_ends(time_period_type, current_start_date, n_periods):
+            latest = latest_per_subject(typed, period_end)
+            if not latest.empty:
+                records.append((label, *_type_totals(latest)))
+    else:
+        _, window_start, window_end = trend_window(time_period_type, current_start_date, n_periods)
+        in_window = typed[(typed['record_date'] >= pd.Timestamp(window_start)) & (typed['record_date'] < pd.Timestamp(window_end))]
+        step = PERIOD_MONTHS[time_period_type]
+        dates = in_window['record_date'].dt
+        index = dates.year * 12 + (dates.month - 1) // step * step
+        for period_index, group in in_window.groupby(index):
+            records.append((period_label(time_period_type, period_index), *_type_totals(group)))
+    return pd.DataFrame(records, columns=['period', '总资产', '总负债'])
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+# 获取进程级共享的本地快照缓存；未启用时返回None
+def get_local_store():
+    global _store
+    if not LOCAL_CACHE_INFO['enabled']:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = LocalStore(LOCAL_CACHE_INFO['directory'], LOCAL_CACHE_INFO['sync_seconds'])
+    return _store
@@ -0,0 +1,109 @@
+import argparse
+import pandas as pd
+import pymysql
+from db_config import IMPORT_CHUNK_SIZE, MYSQL_INFO
+
+# ===================== 维护命令：合并重复科目 =====================
+# 旧版导入对每一行未知科目都插入一条科目记录，同一名称会产生大量重复科目。
+# 每组(科目名称, 类型)只保留"同一用户同一天最多出现的次数"个科目（如两张同名银行卡需要2个），
+# t_personal_balance中的记录按日期内的顺序重新映射到保留的科目上，其余科目删除。
+# 用法：python merge_subjects.py            只打印合并计划
+#       python merge_subjects.py --apply    在一个事务中执行合并
+
+
+# 计算合并计划，返回 (需要改科目的余额记录, 保留科目及其序号, 需要删除的科目ID列表)
+def plan_subject_merge(subjects_df, balances_df):
+    subjects = subjects_df.sort_values('subject_id')
+    group_of = subjects.set_index('subject_id')[['subject_name', 'subject_type']]
+    rows = balances_df.join(group_of, on='subject_id')
+
+    # 每组需要保留的科目个数：同一用户同一天在该组内的最大记录数，至少为1
+    per_date = rows.groupby(['subject_name', 'subject_type', 'phone_number', 'record_date']).size()
+    needed = per_date.groupby(level=[0, 1]).max()
+
+    subjects = subjects.join(needed.rename('needed'), on=['subject_name', 'subject_type'])
+    subjects['needed'] = subjects['needed'].fillna(1).astype(int)
+    subjects['rank'] = subjects.groupby(['subject_name', 'subject_type']).cumcount()
+    kept = subjects[subjects['rank'] < subjects['needed']].copy()
+    kept['subject_seq'] = kept['rank'] + 1
+    removed = subjects.loc[subjects['rank'] >= subjects['needed'], 'subject_id'].tolist()
+
+    # 同一用户同一天的记录依次对应该组第1、2…个保留科目
+    rows = rows.sort_values(['subject_id', 'pb_id'])
+    rows['rank'] = rows.groupby(['subject_name', 'subject_type', 'phone_number', 'record_date']).cumcount()
+    targets = kept.set_index(['subject_name', 'subject_type', 'rank'])['subject_id'].rename('new_subject_id')
+    rows = rows.join(targets, on=['subject_name', 'subject_type', 'rank'])
+    remapped = rows[rows['new_subject_id'] != rows['subject_id']]
+
+    return remapped, kept[['subject_id', 'subject_name', 'subject_type', 'subject_seq']], removed
+
+
+def chunks(items, size=IMPORT_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# 在一个事务中执行合并计划：先删除再按原pb_id重新插入被改动的记录，避免中间状态违反唯一索引
+def apply_subject_merge(conn, remapped, kept, removed):
+    cursor = conn.cursor()
+    conn.begin()
+    try:
+        pb_ids = remapped['pb_id'].astype(int).tolist()
+        for part in chunks(pb_ids):
+            cursor.execute(f"DELETE FROM t_personal_balance WHERE pb_id IN ({', '.join(['%s'] * len(part))})", part)
+
+        rows = list(zip(
+            pb_ids,
+            remapped['phone_number'].tolist(),
+            remapped['new_subject_id'].astype(int).tolist(),
+            remapped['record_date'].astype(str).tolist(),
+            remapped['current_balance'].astype(float).tolist(),
+            remapped['remark'].fillna('').tolist()
+        ))
+        for part in chunks(rows):
+            cursor.executemany(
+                "INSERT INTO t_personal_balance (pb_id, phone_number, subject_id, record_date, current_balance, remark) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                part
+            )
+
+        for part in chunks(removed):
+            cursor.execute(f"DELETE FROM t_personal_subject WHERE subject_id IN ({', '.join(['%s'] * len(part))})", part)
+
+        cursor.executemany(
+            "UPDATE t_personal_subject SET subject_seq = %s WHERE subject_id = %s",
+            list(zip(kept['subject_seq'].astype(int).tolist(), kept['subject_id'].astype(int).tolist()))
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="合并重复科目并重新映射资产负债记录")
+    parser.add_argument("--apply", action="store_true", help="执行合并（默认只打印计划）")
+    args = parser.parse_args()
+
+    conn = pymysql.connect(**MYSQL_INFO)
+    subjects_df = pd.read_sql("SELECT subject_id, subject_name, subject_type FROM t_personal_subject", conn)
+    balances_df = pd.read_sql(
+        "SELECT pb_id, phone_number, subject_id, record_date, current_balance, remark FROM t_personal_balance",
+        conn
+    )
+
+    remapped, kept, removed = plan_subject_merge(subjects_df, balances_df)
+    print(f"科目总数: {len(subjects_df)}，保留: {len(kept)}，删除: {len(removed)}")
+    print(f"需要重新映射的资产负债记录: {len(remapped)}")
+    if removed:
+        print("\n将被删除的科目:")
+        print(subjects_df[subjects_df['subject_id'].isin(removed)].to_string(index=False))
+
+    if args.apply:
+        apply_subject_merge(conn, remapped, kept, removed)
+        print("\n✅ 合并完成")
+    else:
+        print("\n未执行任何修改，加 --apply 执行合并")
+    conn.close()
@@ -10,7 +10,9 @@ CREATE TABLE IF NOT EXISTS t_personal_subject (
   subject_id INT(11) NOT NULL AUTO_INCREMENT COMMENT '科目ID',
   subject_name VARCHAR(50) NOT NULL COMMENT '科目名称（如现金、房贷）',
   subject_type VARCHAR(10) NOT NULL COMMENT '资产/负债',
-  PRIMARY KEY (subject_id)
+  subject_seq TINYINT NOT NULL DEFAULT 1 COMMENT '同名科目序号（如两张同名银行卡）',
+  PRIMARY KEY (subject_id),
+  UNIQUE KEY uk_subject_name_type (subject_name, subject_type, subject_seq)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='个人资产负债科目表';
 
 -- 插入常用科目（不用分级，低代码简化）
@@ -34,12 +36,40 @@ CREATE TABLE IF NOT EXISTS t_personal_balance (
   record_date DATE NOT NULL COMMENT '记录日期',
   current_balance DECIMAL(15,2) NOT NULL COMMENT '金额',
   remark VARCHAR(100) DEFAULT '' COMMENT '备注',
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '最后修改时间',
   PRIMARY KEY (pb_id),
   UNIQUE KEY idx_user_subject_date (phone_number, subject_id, record_date),
+  KEY idx_user_date (phone_number, record_date, subject_id, current_balance),
+  KEY idx_user_updated (phone_number, updated_at),
   FOREIGN KEY (subject_id) REFERENCES t_personal_subject(subject_id),
   FOREIGN KEY (phone_number) REFERENCES t_user(phone_number)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='个人资产负债数据表';
 
+-- 4. 月度汇总表（每个用户每月每种科目类型一行，导入时同步刷新，供看板汇总/趋势查询）
+CREATE TABLE IF NOT EXISTS t_balance_monthly (
+  phone_number VARCHAR(11) NOT NULL COMMENT '关联用户手机号',
+  period_month DATE NOT NULL COMMENT '月份（当月1日）',
+  subject_type VARCHAR(10) NOT NULL COMMENT '资产/负债',
+  total_balance DECIMAL(17,2) NOT NULL COMMENT '当月该类型金额合计',
+  PRIMARY KEY (phone_number, period_month, subject_type)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='月度资产负债汇总表';
+
+-- 5. 导入记录表（每次成功导入一行，重复上传同一文件时跳过）
+CREATE TABLE IF NOT EXISTS t_import_log (
+  log_id INT(11) NOT NULL AUTO_INCREMENT COMMENT '主键',
+  phone_number VARCHAR(11) NOT NULL COMMENT '关联用户手机号',
+  file_hash CHAR(64) NOT NULL COMMENT '文件内容SHA-256',
+  file_name VARCHAR(255) DEFAULT '' COMMENT '上传的文件名',
+  total_rows INT(11) NOT NULL DEFAULT 0 COMMENT '有效行数',
+  inserted INT(11) NOT NULL DEFAULT 0 COMMENT '新增条数',
+  updated INT(11) NOT NULL DEFAULT 0 COMMENT '更新条数',
+  unchanged INT(11) NOT NULL DEFAULT 0 COMMENT '未变化条数',
+  imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '导入时间',
+  PRIMARY KEY (log_id),
+  KEY idx_user_log (phone_number, log_id),
+  FOREIGN KEY (phone_number) REFERENCES t_user(phone_number)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='数据导入记录表';
+
 -- 插入示例用户
 INSERT INTO t_user (phone_number) VALUES ('13800138000');
 
@@ -54,4 +84,11 @@ INSERT INTO t_personal_balance (phone_number, subject_id, record_date, current_b
 ('13800138000', 7, '2025-12-31', 2000.00, '还款1000'),
 ('13800138000', 8, '2025-12-31', 0.00, '花呗已还清'),
 ('13800138000', 9, '2025-12-31', 795000.00, '房贷月供5000'),
-('13800138000', 10, '2025-12-31', 48000.00, '车贷还款2000');
\ No newline at end of file
+('13800138000', 10, '2025-12-31', 48000.00, '车贷还款2000');
+
+-- 生成示例数据的月度汇总
+INSERT INTO t_balance_monthly (phone_number, period_month, subject_type, total_balance)
+SELECT b.phone_number, DATE_FORMAT(b.record_date, '%Y-%m-01') AS period_month, s.subject_type, SUM(b.current_balance)
+FROM t_personal_balance b
+JOIN t_personal_subject s ON b.subject_id = s.subject_id
+GROUP BY b.phone_number, period_month, s.subject_type;
@@ -0,0 +1,7 @@
+-- 迁移001：为按用户+日期范围的查询增加覆盖索引
+-- 原有唯一索引 idx_user_subject_date (phone_number, subject_id, record_date) 中间隔着subject_id，
+-- 看板按日期区间过滤时无法做范围扫描；新索引以(phone_number, record_date)开头，
+-- 并带上subject_id、current_balance，使汇总/趋势查询只读索引即可完成（Using index）
+-- 已执行过 mysql_create_table.sql 新版本的库无需再执行
+ALTER TABLE t_personal_balance
+  ADD KEY idx_user_date (phone_number, record_date, subject_id, current_balance);
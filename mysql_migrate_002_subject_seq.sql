@@ -0,0 +1,7 @@
+-- 迁移002：科目表增加同名序号，为(科目名称, 类型)唯一约束做准备
+-- 执行顺序：
+--   1. 执行本文件
+--   2. python merge_subjects.py --apply   合并导入时产生的重复科目，并为保留的同名科目编号
+--   3. 执行 mysql_migrate_003_subject_unique.sql
+ALTER TABLE t_personal_subject
+  ADD COLUMN subject_seq TINYINT NOT NULL DEFAULT 1 COMMENT '同名科目序号（如两张同名银行卡）';
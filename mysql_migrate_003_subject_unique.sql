@@ -0,0 +1,4 @@
+-- 迁移003：(科目名称, 类型, 同名序号) 唯一，导入时用 INSERT IGNORE 去重创建科目
+-- 需先执行 mysql_migrate_002_subject_seq.sql 和 python merge_subjects.py --apply
+ALTER TABLE t_personal_subject
+  ADD UNIQUE KEY uk_subject_name_type (subject_name, subject_type, subject_seq);
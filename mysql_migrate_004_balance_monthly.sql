@@ -0,0 +1,17 @@
+-- 迁移004：月度汇总表，看板的趋势查询改为读取该表
+-- 建表后的初始数据可由本文件最后的INSERT生成；数据量大时也可以执行
+--   python rollup_monthly.py --rebuild   按用户分批重建
+CREATE TABLE IF NOT EXISTS t_balance_monthly (
+  phone_number VARCHAR(11) NOT NULL COMMENT '关联用户手机号',
+  period_month DATE NOT NULL COMMENT '月份（当月1日）',
+  subject_type VARCHAR(10) NOT NULL COMMENT '资产/负债',
+  total_balance DECIMAL(17,2) NOT NULL COMMENT '当月该类型金额合计',
+  PRIMARY KEY (phone_number, period_month, subject_type)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='月度资产负债汇总表';
+
+INSERT INTO t_balance_monthly (phone_number, period_month, subject_type, total_balance)
+SELECT b.phone_number, DATE_FORMAT(b.record_date, '%Y-%m-01') AS period_month, s.subject_type, SUM(b.current_balance)
+FROM t_personal_balance b
+JOIN t_personal_subject s ON b.subject_id = s.subject_id
+GROUP BY b.phone_number, period_month, s.subject_type
+ON DUPLICATE KEY UPDATE total_balance = VALUES(total_balance);
@@ -0,0 +1,16 @@
+-- 迁移005：导入记录表，记录每次成功导入的文件哈希和新增/更新/未变化条数
+-- 重新上传与上一次导入完全相同的文件时直接跳过，不再写数据库
+CREATE TABLE IF NOT EXISTS t_import_log (
+  log_id INT(11) NOT NULL AUTO_INCREMENT COMMENT '主键',
+  phone_number VARCHAR(11) NOT NULL COMMENT '关联用户手机号',
+  file_hash CHAR(64) NOT NULL COMMENT '文件内容SHA-256',
+  file_name VARCHAR(255) DEFAULT '' COMMENT '上传的文件名',
+  total_rows INT(11) NOT NULL DEFAULT 0 COMMENT '有效行数',
+  inserted INT(11) NOT NULL DEFAULT 0 COMMENT '新增条数',
+  updated INT(11) NOT NULL DEFAULT 0 COMMENT '更新条数',
+  unchanged INT(11) NOT NULL DEFAULT 0 COMMENT '未变化条数',
+  imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '导入时间',
+  PRIMARY KEY (log_id),
+  KEY idx_user_log (phone_number, log_id),
+  FOREIGN KEY (phone_number) REFERENCES t_user(phone_number)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='数据导入记录表';
@@ -0,0 +1,7 @@
+-- 迁移006：明细表增加最后修改时间，供本地快照缓存（local_store.py）增量同步
+-- 插入和更新时由MySQL自动维护；同步时只拉取 updated_at 不早于上次同步到的时间的行，
+-- (phone_number, updated_at) 索引使增量查询只读取变化的行
+-- 已执行过 mysql_create_table.sql 新版本的库无需再执行
+ALTER TABLE t_personal_balance
+  ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '最后修改时间',
+  ADD KEY idx_user_updated (phone_number, updated_at);
@@ -0,0 +1,48 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from db_config import LOADER_INFO
+
+# ===================== 并发加载看板数据 =====================
+# 看板的明细/汇总查询和趋势查询互不依赖，放到进程级线程池中同时执行，
+# 每个任务各自从连接池借出连接，页面的冷加载耗时从各查询之和变为其中最慢的一个。
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=LOADER_INFO['workers'], thread_name_prefix="dashboard-loader")
+    return _executor
+
+
+# 并发执行多个无参数的加载函数 {名称: 函数}，全部完成后返回 (结果{名称: 返回值}, 耗时{名称: 秒数})
+# 耗时中另有 '顺序合计'（各任务耗时之和，即顺序执行时的耗时）和 '并发墙钟'（实际等待时间）
+# wrap(函数) 可在工作线程中为任务准备上下文；任一任务抛出异常时原样抛出
+def load_concurrently(tasks, wrap=None):
+    def timed(func):
+        def run():
+            start = time.perf_counter()
+            result = func()
+            return result, time.perf_counter() - start
+        return wrap(run) if wrap else run
+
+    start = time.perf_counter()
+    if len(tasks) == 1:
+        # 只有一个任务时直接在当前线程执行
+        (name, func), = tasks.items()
+        outcomes = {name: timed(func)()}
+    else:
+        futures = {name: get_executor().submit(timed(func)) for name, func in tasks.items()}
+        outcomes = {name: future.result() for name, future in futures.items()}
+    wall = time.perf_counter() - start
+
+    results = {name: result for name, (result, _) in outcomes.items()}
+    timings = {name: round(elapsed, 4) for name, (_, elapsed) in outcomes.items()}
+    timings['顺序合计'] = round(sum(elapsed for _, elapsed in outcomes.values()), 4)
+    timings['并发墙钟'] = round(wall, 4)
+    return results, timings
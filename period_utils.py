@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+
+# ===================== 时间粒度工具函数（不依赖数据库/Streamlit） =====================
+# 每种时间粒度对应的月数
+PERIOD_MONTHS = {'年度': 12, '季度': 3, '月度': 1}
+
+
+# 把日期字符串（YYYY-MM-DD）对齐到所在年/季/月的第一天，返回"月序号"（年*12+月-1）
+def _period_index(time_period_type, date_str):
+    year = int(date_str[:4])
+    month = int(date_str[5:7])
+    step = PERIOD_MONTHS[time_period_type]
+    return year * 12 + (month - 1) // step * step
+
+
+def _index_to_date(index):
+    return date(index // 12, index % 12 + 1, 1)
+
+
+# 生成时间单位的标签：年度'2026'，季度'2026Q1'，月度'2026-01'（与趋势图的period列一致）
+def period_label(time_period_type, index):
+    year, month = index // 12, index % 12 + 1
+    if time_period_type == '年度':
+        return f"{year}"
+    elif time_period_type == '季度':
+        return f"{year}Q{(month - 1) // 3 + 1}"
+    else:
+        return f"{year}-{month:02d}"
+
+
+# 计算截止到当前时间单位（含）的近n_periods个时间单位
+# 返回：按时间顺序排列的标签列表、窗口开始日期（含）、窗口结束日期（不含）
+def trend_window(time_period_type, current_start_date, n_periods=3):
+    step = PERIOD_MONTHS[time_period_type]
+    current = _period_index(time_period_type, current_start_date)
+    indexes = [current - step * i for i in range(n_periods - 1, -1, -1)]
+    labels = [period_label(time_period_type, i) for i in indexes]
+    window_start = _index_to_date(indexes[0]).strftime("%Y-%m-%d")
+    window_end = _index_to_date(current + step).strftime("%Y-%m-%d")
+    return labels, window_start, window_end
+
+
+# 趋势窗口中每个时间单位的 (标签, 结束日期（不含）)，按时间顺序排列，用于期末余额口径的趋势
+def trend_period_ends(time_period_type, current_start_date, n_periods=3):
+    step = PERIOD_MONTHS[time_period_type]
+    current = _period_index(time_period_type, current_start_date)
+    indexes = [current - step * i for i in range(n_periods - 1, -1, -1)]
+    return [(period_label(time_period_type, i), _index_to_date(i + step).strftime("%Y-%m-%d")) for i in indexes]
+
+
+# 计算时间粒度对应的半开区间 [开始日期, 结束日期)，用于 record_date >= %s AND record_date < %s
+# 直接比较DATE列可以走(phone_number, record_date)索引的范围扫描，LIKE '2026%'则会把日期转成字符串导致索引失效
+def period_range(time_period_type, start_date, end_date=None):
+    if time_period_type in PERIOD_MONTHS:
+        step = PERIOD_MONTHS[time_period_type]
+        index = _period_index(time_period_type, start_date)
+        return _index_to_date(index).strftime("%Y-%m-%d"), _index_to_date(index + step).strftime("%Y-%m-%d")
+    # 自定义：结束日期包含在内，因此区间右端取结束日期的下一天
+    end = date.fromisoformat(end_date[:10]) + timedelta(days=1)
+    return start_date[:10], end.strftime("%Y-%m-%d")
+
+
+# 年/季/月选择对应的起止日期（均含），与看板的时间选择控件一致：季度number为1~4，月度number为1~12
+# 页面和后台预取都用它计算日期，保证两边的缓存键相同
+def period_dates(time_period_type, year, number=1):
+    step = PERIOD_MONTHS[time_period_type]
+    index = year * 12 + (number - 1) * step
+    end = _index_to_date(index + step) - timedelta(days=1)
+    return _index_to_date(index).strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+# 净资产历史的聚合粒度（每个粒度的大致天数）
+HISTORY_BUCKET_DAYS = {'日': 1, '周': 7, '月': 31}
+
+
+# 按日期范围（均含）选择聚合粒度：时间点不超过max_buckets个时取最细的粒度（日 -> 周 -> 月）
+def history_bucket(start_date, end_date, max_buckets=2000):
+    days = (date.fromisoformat(end_date[:10]) - date.fromisoformat(start_date[:10])).days + 1
+    for bucket, bucket_days in HISTORY_BUCKET_DAYS.items():
+        if days / bucket_days <= max_buckets:
+            return bucket
+    return '月'
+
+
+# 日期所在聚合单位的第一天（周从周一开始），与queries.HISTORY_BUCKETS的SQL表达式一致
+def bucket_start(date_str, bucket):
+    day = date.fromisoformat(date_str[:10])
+    if bucket == '周':
+        day -= timedelta(days=day.weekday())
+    elif bucket == '月':
+        day = day.replace(day=1)
+    return day.strftime("%Y-%m-%d")
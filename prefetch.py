@@ -0,0 +1,81 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from db_config import PREFETCH_INFO
+
+# ===================== 后台预取 =====================
+# 用户登录后，把默认视图及相邻时间粒度的查询提前放到后台执行，结果写入查询缓存，
+# 之后的首次渲染和切换时间粒度直接命中缓存。
+# 预取只用少量线程（各用户的预取任务依次执行），排队的用户数有上限，不会占满数据库连接；
+# 同一用户重新登录或开始导入时取消其未执行完的预取（正在执行的查询会执行完，之后的任务不再执行）。
+class Prefetcher:
+    def __init__(self, workers=1, max_pending=20):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._active = {}           # 用户 -> 取消标志（threading.Event）
+        self._lock = threading.Lock()
+        self._stats = {'started': 0, 'rejected': 0, 'cancelled': 0, 'tasks': 0, 'failed': 0}
+
+    # 为某用户开始预取，tasks为无参数的加载函数列表，按顺序执行；超出上限时不预取，返回False
+    def start(self, key, tasks):
+        with self._lock:
+            self._cancel(key)
+            if len(self._active) >= self.max_pending:
+                self._stats['rejected'] += 1
+                return False
+            cancel = self._active[key] = threading.Event()
+            self._stats['started'] += 1
+        self._executor.submit(self._run, key, list(tasks), cancel)
+        return True
+
+    def _run(self, key, tasks, cancel):
+        try:
+            for task in tasks:
+                if cancel.is_set():
+                    break
+                try:
+                    task()
+                except Exception:
+                    # 预取失败不影响页面，页面加载时会重新查询并显示错误
+                    with self._lock:
+                        self._stats['failed'] += 1
+                    continue
+                with self._lock:
+                    self._stats['tasks'] += 1
+        finally:
+            with self._lock:
+                if self._active.get(key) is cancel:
+                    del self._active[key]
+
+    # 取消某用户的预取（调用方持有锁）
+    def _cancel(self, key):
+        cancel = self._active.pop(key, None)
+        if cancel is not None:
+            cancel.set()
+            self._stats['cancelled'] += 1
+
+    def cancel(self, key):
+        with self._lock:
+            self._cancel(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['workers'] = self.workers
+            stats['active'] = len(self._active)
+        return stats
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+# 获取进程级共享的预取器（首次调用时创建）
+def get_prefetcher():
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = Prefetcher(**PREFETCH_INFO)
+    return _prefetcher
@@ -0,0 +1,221 @@
+import pandas as pd
+
+# ===================== 看板查询SQL =====================
+# 所有时间过滤统一使用参数化的半开区间：record_date >= %s AND record_date < %s
+# 参数顺序固定为 (phone_number, 开始日期, 结束日期)，可被 idx_user_date (phone_number, record_date, ...) 范围扫描
+PERIOD_WHERE = "b.phone_number = %s AND b.record_date >= %s AND b.record_date < %s"
+
+# 期间内的全部明细记录：看板已改为按科目汇总（PERIOD_TOTALS_SQL）+ 分页显示明细（detail_page_sql），
+# 此SQL作为对照保留在测试中使用
+DETAIL_SQL = f"""
+    SELECT s.subject_name, s.subject_type, COALESCE(b.current_balance, 0) AS current_balance, b.remark, b.record_date
+    FROM t_personal_balance b
+    LEFT JOIN t_personal_subject s ON b.subject_id = s.subject_id
+    WHERE {PERIOD_WHERE}
+    ORDER BY b.record_date DESC
+"""
+
+# ===================== 期末余额（as-of）口径 =====================
+# 按期间累计时，同一科目在期间内的每条记录都会被加总（每月记一次房产，季度/年度就算了3次/12次）。
+# 期末余额口径对每个科目只取结束日期之前（不含）的最后一条记录，与期间内记了几次无关。
+# 子查询按 (phone_number, subject_id) 分组取MAX(record_date)，走 idx_user_subject_date
+# (phone_number, subject_id, record_date) 的松散索引扫描（Using index for group-by），
+# 每个科目只做一次索引查找，再按唯一键关联回明细行；耗时取决于科目数，而不是历史记录的条数。
+LATEST_SQL = """
+    SELECT l.phone_number, l.subject_id, MAX(l.record_date) AS record_date
+    FROM t_personal_balance l
+    WHERE l.phone_number = %s AND l.record_date < %s
+    GROUP BY l.phone_number, l.subject_id
+"""
+
+# 期末余额明细：每个科目一行，参数 (phone_number, 结束日期（不含）)，列与DETAIL_SQL一致，可直接用summarize_detail汇总
+ASOF_DETAIL_SQL = f"""
+    SELECT s.subject_name, s.subject_type, COALESCE(b.current_balance, 0) AS current_balance, b.remark, b.record_date
+    FROM ({LATEST_SQL}) latest
+    JOIN t_personal_balance b
+      ON b.phone_number = latest.phone_number AND b.subject_id = latest.subject_id AND b.record_date = latest.record_date
+    LEFT JOIN t_personal_subject s ON b.subject_id = s.subject_id
+    ORDER BY b.record_date DESC
+"""
+
+# 期末余额趋势：每个时间单位各做一次LATEST_SQL（UNION ALL），一次查询返回所有时间单位的总资产/总负债
+ASOF_TREND_SQL = """
+    SELECT latest.period,
+        COALESCE(SUM(CASE WHEN s.subject_type='资产' THEN b.current_balance ELSE 0 END), 0) AS 总资产,
+        COALESCE(SUM(CASE WHEN s.subject_type='负债' THEN b.current_balance ELSE 0 END), 0) AS 总负债
+    FROM ({latest}) latest
+    JOIN t_personal_balance b
+      ON b.phone_number = latest.phone_number AND b.subject_id = latest.subject_id AND b.record_date = latest.record_date
+    JOIN t_personal_subject s ON b.subject_id = s.subject_id
+    GROUP BY latest.period
+"""
+
+
+# 参数：每个时间单位依次为 (标签, phone_number, 结束日期（不含）)
+def asof_trend_sql(n_periods):
+    latest = " UNION ALL ".join(
+        [f"SELECT %s AS period, latest_one.* FROM ({LATEST_SQL}) latest_one"] * n_periods
+    )
+    return ASOF_TREND_SQL.format(latest=latest)
+
+
+# ===================== 净资产历史（自定义范围） =====================
+# 各聚合粒度在SQL中的分组键（该单位的第一天），与period_utils.bucket_start一致
+HISTORY_BUCKETS = {
+    '日': "l.record_date",
+    '周': "DATE_SUB(l.record_date, INTERVAL WEEKDAY(l.record_date) DAY)",
+    '月': "DATE_FORMAT(l.record_date, '%%Y-%%m-01')",
+}
+
+# 每个科目在每个聚合单位内的最后一条余额，另加范围开始前的最后一条（期初余额，记在第一个单位上）；
+# 在 idx_user_date 上范围扫描分组，结果行数为 科目数×单位数，而不是原始记录数
+# 参数：(phone_number, 开始日期, 结束日期（不含）, 第一个单位, phone_number, 开始日期)
+HISTORY_SQL = """
+    SELECT latest.bucket, latest.record_date, b.subject_id, s.subject_type, b.current_balance
+    FROM (
+        SELECT l.phone_number, l.subject_id, {bucket} AS bucket, MAX(l.record_date) AS record_date
+        FROM t_personal_balance l
+        WHERE l.phone_number = %s AND l.record_date >= %s AND l.record_date < %s
+        GROUP BY l.phone_number, l.subject_id, bucket
+        UNION ALL
+        SELECT l.phone_number, l.subject_id, %s AS bucket, MAX(l.record_date) AS record_date
+        FROM t_personal_balance l
+        WHERE l.phone_number = %s AND l.record_date < %s
+        GROUP BY l.phone_number, l.subject_id
+    ) latest
+    JOIN t_personal_balance b
+      ON b.phone_number = latest.phone_number AND b.subject_id = latest.subject_id AND b.record_date = latest.record_date
+    JOIN t_personal_subject s ON b.subject_id = s.subject_id
+"""
+
+
+def history_sql(bucket):
+    return HISTORY_SQL.format(bucket=HISTORY_BUCKETS[bucket])
+
+
+# 期间累计口径下各科目的合计（每个科目一行），列与DETAIL_SQL一致，可直接用summarize_detail汇总和画饼图；
+# 明细记录不再整体传给页面，而是由detail_page_sql按页查询
+PERIOD_TOTALS_SQL = f"""
+    SELECT s.subject_name, s.subject_type, COALESCE(SUM(b.current_balance), 0) AS current_balance,
+           '' AS remark, MAX(b.record_date) AS record_date
+    FROM t_personal_balance b
+    LEFT JOIN t_personal_subject s ON b.subject_id = s.subject_id
+    WHERE {PERIOD_WHERE}
+    GROUP BY b.subject_id, s.subject_name, s.subject_type
+    ORDER BY record_date DESC
+"""
+
+# ===================== 明细分页（键集分页） =====================
+# 排序方式 -> (排序列, 同值时的排序列, 方向)；(排序列, 同值时的排序列) 唯一确定一行的位置。
+# 下一页的条件是"排在上一页最后一行之后"，而不是OFFSET，翻到后面的页也只读取一页的行；
+# 按日期排序时同一天按subject_id排序（同一用户同一天同一科目只有一行），顺序与 idx_user_date
+# (phone_number, record_date, subject_id, ...) 一致，沿索引读取不需要排序；按金额排序时需要对期间内的记录排序
+DETAIL_SORTS = {
+    '日期（新→旧）': ('b.record_date', 'b.subject_id', 'DESC'),
+    '日期（旧→新）': ('b.record_date', 'b.subject_id', 'ASC'),
+    '金额（高→低）': ('b.current_balance', 'b.pb_id', 'DESC'),
+    '金额（低→高）': ('b.current_balance', 'b.pb_id', 'ASC'),
+}
+
+DETAIL_PAGE_SQL = """
+    SELECT b.pb_id, b.subject_id, b.record_date, s.subject_name, s.subject_type, b.current_balance, b.remark
+    FROM t_personal_balance b
+    LEFT JOIN t_personal_subject s ON b.subject_id = s.subject_id
+    WHERE {where}
+    ORDER BY {column} {direction}, {tiebreak} {direction}
+    LIMIT %s
+"""
+
+
+# 生成一页明细的SQL和参数：after为上一页最后一行的 (排序列的值, 同值时的排序列的值)，第一页为None；
+# 多取一行用于判断是否还有下一页
+def detail_page_sql(phone_number, period_start, period_end, sort, subject_type=None, subject_name=None,
+                    after=None, page_size=50):
+    column, tiebreak, direction = DETAIL_SORTS[sort]
+    where, params = [PERIOD_WHERE], [phone_number, period_start, period_end]
+    if subject_type:
+        where.append("s.subject_type = %s")
+        params.append(subject_type)
+    if subject_name:
+        where.append("s.subject_name = %s")
+        params.append(subject_name)
+    if after is not None:
+        # 展开为OR形式，优化器可以把它转换为索引上的范围
+        op = '<' if direction == 'DESC' else '>'
+        where.append(f"({column} {op} %s OR ({column} = %s AND {tiebreak} {op} %s))")
+        params += [after[0], after[0], after[1]]
+    params.append(page_size + 1)
+    sql = DETAIL_PAGE_SQL.format(where=" AND ".join(where), column=column, tiebreak=tiebreak, direction=direction)
+    return sql, tuple(params)
+
+
+# 导出某用户的全部历史数据，列名与导入模板一致（科目序号区分同名科目），导出的文件可直接重新导入
+EXPORT_SQL = """
+    SELECT DATE_FORMAT(b.record_date, '%%Y-%%m-%%d') AS 日期, s.subject_name AS 科目名称, s.subject_type AS 科目类型,
+           b.current_balance AS 金额, b.remark AS 备注, s.subject_seq AS 科目序号
+    FROM t_personal_balance b
+    JOIN t_personal_subject s ON b.subject_id = s.subject_id
+    WHERE b.phone_number = %s
+    ORDER BY b.record_date, b.subject_id
+"""
+
+# 汇总数据（总资产/总负债/净资产）：看板已改为由明细数据计算（summarize_detail），此SQL作为对照保留在测试中使用
+SUMMARY_SQL = f"""
+    SELECT
+        COALESCE(SUM(CASE WHEN s.subject_type='资产' THEN b.current_balance ELSE 0 END), 0) AS 总资产,
+        COALESCE(SUM(CASE WHEN s.subject_type='负债' THEN b.current_balance ELSE 0 END), 0) AS 总负债,
+        COALESCE(SUM(CASE WHEN s.subject_type='资产' THEN b.current_balance ELSE 0 END) -
+        SUM(CASE WHEN s.subject_type='负债' THEN b.current_balance ELSE 0 END), 0) AS 净资产
+    FROM t_personal_balance b
+    LEFT JOIN t_personal_subject s ON b.subject_id = s.subject_id
+    WHERE {PERIOD_WHERE}
+"""
+
+
+# 由明细数据计算总资产/总负债/净资产，结果与SUMMARY_SQL一致，省去一次数据库往返
+# 没有数据时各项为0；科目类型为空（科目已不存在）的行不计入
+def summarize_detail(df_detail):
+    totals = df_detail.groupby('subject_type')['current_balance'].sum()
+    total_assets = float(totals.get('资产', 0))
+    total_liabilities = float(totals.get('负债', 0))
+    return pd.Series({'总资产': total_assets, '总负债': total_liabilities, '净资产': total_assets - total_liabilities})
+
+
+# ===================== 月度汇总表 t_balance_monthly =====================
+# 每个用户每月每种科目类型一行，导入时在同一事务内刷新；趋势图的年度/季度由月份再汇总得到
+ROLLUP_WHERE = "m.phone_number = %s AND m.period_month >= %s AND m.period_month < %s"
+
+# 各时间粒度在SQL中的分组键，格式与period_utils.period_label一致
+TREND_BUCKETS = {
+    '年度': "CAST(YEAR(m.period_month) AS CHAR)",
+    '季度': "CONCAT(YEAR(m.period_month), 'Q', QUARTER(m.period_month))",
+    '月度': "DATE_FORMAT(m.period_month, '%%Y-%%m')",
+}
+
+# 趋势数据：一次查询把窗口内的月度汇总按年/季/月再分组
+TREND_SQL = """
+    SELECT
+        {bucket} AS period,
+        COALESCE(SUM(CASE WHEN m.subject_type='资产' THEN m.total_balance ELSE 0 END), 0) AS 总资产,
+        COALESCE(SUM(CASE WHEN m.subject_type='负债' THEN m.total_balance ELSE 0 END), 0) AS 总负债
+    FROM t_balance_monthly m
+    WHERE {where}
+    GROUP BY period
+"""
+
+
+def trend_sql(time_period_type):
+    return TREND_SQL.format(bucket=TREND_BUCKETS[time_period_type], where=ROLLUP_WHERE)
+
+
+# 从明细数据重新计算某用户一段时间内（整月）的月度汇总，写入或覆盖汇总表
+# 参数：(phone_number, 开始日期, 结束日期)
+ROLLUP_REFRESH_SQL = """
+    INSERT INTO t_balance_monthly (phone_number, period_month, subject_type, total_balance)
+    SELECT b.phone_number, DATE_FORMAT(b.record_date, '%%Y-%%m-01') AS period_month, s.subject_type, SUM(b.current_balance)
+    FROM t_personal_balance b
+    JOIN t_personal_subject s ON b.subject_id = s.subject_id
+    WHERE b.phone_number = %s AND b.record_date >= %s AND b.record_date < %s
+    GROUP BY b.phone_number, period_month, s.subject_type
+    ON DUPLICATE KEY UPDATE total_balance = VALUES(total_balance)
+"""
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+import pymysql
+from db_config import METRICS_INFO
+
+# ===================== 查询埋点 =====================
+# 连接池创建的连接使用InstrumentedCursor，pd.read_sql和导入的游标语句都会经过这里，
+# 记录每条语句的指纹（去掉字面量、合并空白后的SQL）、耗时、返回/影响行数和调用函数；
+# 查询缓存的命中/未命中也记录在这里。
+# 统计保存在进程内（按 指纹+调用函数 汇总，另保留最近的慢查询），
+# 配置了METRICS_INFO['file']时同时写出：jsonl格式每个事件追加一行，prometheus格式定期整体重写。
+# 耗时超过METRICS_INFO['slow_ms']的语句连同参数写入日志。
+logger = logging.getLogger(__name__)
+
+_THIS_FILE = os.path.abspath(__file__)
+_PACKAGE_DIR = os.path.dirname(_THIS_FILE)
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_VALUE_LISTS = re.compile(r"(VALUES\s*\(\?(?:,\s*\?)*\))(?:\s*,\s*\(\?(?:,\s*\?)*\))+", re.I)
+_IN_LISTS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+# 汇总条目达到上限后，新出现的语句都计入这一条
+OVERFLOW_KEY = ('(其他语句)', '?')
+
+_lock = threading.Lock()
+_queries = {}       # (指纹, 调用函数) -> 汇总，最多METRICS_INFO['max_fingerprints']条
+_cache_events = {}  # (缓存名, 事件) -> 次数
+_slow = deque(maxlen=METRICS_INFO['keep_slow'])
+_export = {'file': None, 'flushed_at': 0.0}
+
+
+# 语句指纹：字面量替换为?，多行VALUES合并为一组，IN列表合并为 IN (...)，空白合并为一个空格
+# IN列表的长度随导入的科目数/行数变化，不合并时每种长度都会成为一条新语句
+def fingerprint(sql):
+    if isinstance(sql, (bytes, bytearray)):
+        sql = bytes(sql).decode('utf-8', errors='replace')
+    sql = _WHITESPACE.sub(' ', _LITERALS.sub('?', sql.replace('%s', '?'))).strip()
+    return _IN_LISTS.sub('IN (...)', _VALUE_LISTS.sub(r'\1', sql))
+
+
+def fingerprint_id(text):
+    return hashlib.md5(text.encode('utf-8')).hexdigest()[:8]
+
+
+# 调用栈中第一个属于本项目（且不是本模块）的函数，如 'app.get_data'
+def calling_function():
+    frame = sys._getframe(1)
+    while frame is not None:
+        path = os.path.abspath(frame.f_code.co_filename)
+        if os.path.dirname(path) == _PACKAGE_DIR and path != _THIS_FILE:
+            return f"{os.path.splitext(os.path.basename(path))[0]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return '?'
+
+
+# 慢查询日志中的参数：executemany只记录行数和第一行
+def _params_for_log(params, many):
+    if many and params:
+        return f"{len(params)} 行，首行 {params[0]!r}"
+    return repr(params)
+
+
+def record_query(sql, params, elapsed, rows, caller, many=False):
+    text = fingerprint(sql)
+    slow = elapsed * 1000 >= METRICS_INFO['slow_ms']
+    event = {
+        'ts': round(time.time(), 3), 'kind': 'query', 'fingerprint': fingerprint_id(text), 'sql': text,
+        'caller': caller, 'ms': round(elapsed * 1000, 2), 'rows': rows, 'slow': slow,
+    }
+    with _lock:
+        key = (text, caller)
+        if key not in _queries and len(_queries) >= METRICS_INFO['max_fingerprints']:
+            key = OVERFLOW_KEY
+        stats = _queries.get(key)
+        if stats is None:
+            stats = _queries[key] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'slow': 0}
+        stats['count'] += 1
+        stats['total_ms'] += event['ms']
+        stats['max_ms'] = max(stats['max_ms'], event['ms'])
+        stats['rows'] += max(rows or 0, 0)
+        stats['slow'] += slow
+        if slow:
+            _slow.append(dict(event, params=_params_for_log(params, many)))
+    if slow:
+        logger.warning("慢查询 %.1fms %s 调用方=%s 参数=%s", event['ms'], text, caller, _params_for_log(params, many))
+    _write(event)
+
+
+# 查询缓存事件：hit（命中）、miss（未命中）、joined（等待其他线程的同一查询）
+def record_cache(name, event):
+    with _lock:
+        _cache_events[(name, event)] = _cache_events.get((name, event), 0) + 1
+    if METRICS_INFO['file'] and METRICS_INFO['format'] == 'jsonl':
+        _write({'ts': round(time.time(), 3), 'kind': 'cache', 'cache': name, 'event': event})
+
+
+# 按语句汇总的统计（平均耗时最长的在前），供侧边栏调试面板显示
+def query_stats():
+    with _lock:
+        items = [(text, caller, dict(stats)) for (text, caller), stats in _queries.items()]
+    rows = [{
+        '指纹': fingerprint_id(text), '调用函数': caller, '次数': stats['count'],
+        '平均ms': round(stats['total_ms'] / stats['count'], 2), '最大ms': round(stats['max_ms'], 2),
+        '行数': stats['rows'], '慢查询': stats['slow'], 'SQL': text,
+    } for text, caller, stats in items]
+    return sorted(rows, key=lambda row: row['平均ms'], reverse=True)
+
+
+def slow_queries():
+    with _lock:
+        return list(_slow)
+
+
+def cache_event_counts():
+    with _lock:
+        return {f"{name}.{event}": count for (name, event), count in sorted(_cache_events.items())}
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+# Prometheus文本格式的当前统计
+def prometheus_text():
+    with _lock:
+        queries = [(text, caller, dict(stats)) for (text, caller), stats in _queries.items()]
+        cache_events = dict(_cache_events)
+    lines = []
+    metrics = [
+        ('balance_query_total', 'counter', 'count', 1),
+        ('balance_query_seconds_sum', 'counter', 'total_ms', 1000),
+        ('balance_query_seconds_max', 'gauge', 'max_ms', 1000),
+        ('balance_query_rows_total', 'counter', 'rows', 1),
+        ('balance_query_slow_total', 'counter', 'slow', 1),
+    ]
+    for name, kind, field, scale in metrics:
+        lines.append(f"# TYPE {name} {kind}")
+        for text, caller, stats in queries:
+            labels = f'fingerprint="{fingerprint_id(text)}",caller="{_label(caller)}"'
+            lines.append(f"{name}{{{labels}}} {stats[field] / scale:g}")
+    lines.append("# TYPE balance_cache_events_total counter")
+    for (cache, event), count in sorted(cache_events.items()):
+        lines.append(f'balance_cache_events_total{{cache="{_label(cache)}",event="{event}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+# 写出到指标文件：jsonl逐行追加；prometheus最多每flush_seconds秒整体重写一次（先写临时文件再替换）
+def _write(event):
+    path = METRICS_INFO['file']
+    if not path:
+        return
+    try:
+        if METRICS_INFO['format'] == 'jsonl':
+            with _lock:
+                if _export['file'] is None:
+                    _export['file'] = open(path, 'a', encoding='utf-8', buffering=1)
+                _export['file'].write(json.dumps(event, ensure_ascii=False) + "\n")
+            return
+        now = time.monotonic()
+        with _lock:
+            if now - _export['flushed_at'] < METRICS_INFO['flush_seconds']:
+                return
+            _export['flushed_at'] = now
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as file:
+            file.write(prometheus_text())
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("写入查询指标文件失败: %s", e)
+
+
+# 记录execute/executemany的游标；pymysql的executemany内部会调用execute，只记录外层这一次
+class InstrumentedCursor(pymysql.cursors.Cursor):
+    _recording = False
+
+    def _timed(self, method, query, args, many):
+        if self._recording:
+            return method(query, args)
+        self._recording = True
+        start = time.perf_counter()
+        try:
+            return method(query, args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._recording = False
+            record_query(query, args, elapsed, self.rowcount, calling_function(), many)
+
+    def execute(self, query, args=None):
+        return self._timed(super().execute, query, args, False)
+
+    def executemany(self, query, args):
+        return self._timed(super().executemany, query, args, True)
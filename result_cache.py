@@ -0,0 +1,220 @@
+import functools
+import inspect
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+import pandas as pd
+from db_config import CACHE_INFO
+from query_metrics import record_cache
+
+# ===================== 进程级查询结果缓存 =====================
+# 替代 st.cache_data：按手机号区分用户，每个用户有自己的数据版本号，
+# 导入数据后只使该用户的缓存失效；科目/模板缓存只在科目变化时失效。
+# 缓存的DataFrame等对象在会话间共享，调用方不要原地修改返回值。
+# 每个缓存有最大条目数和内存预算（字节），超出时按最近最少使用（LRU）淘汰。
+# 同一个键正在被其他线程计算时（如后台预取与页面同时请求），等待其结果而不是重复查询。
+
+_lock = threading.RLock()
+_caches = {}                        # 缓存名 -> ResultCache
+_user_versions = defaultdict(int)   # 手机号 -> 数据版本号
+_catalog_version = 0                # 科目版本号
+_inflight = {}                      # (缓存名, key) -> 正在进行的计算
+
+
+# 估算缓存值占用的内存，DataFrame/Series按 memory_usage(deep=True) 计算
+def value_nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(value_nbytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    def __init__(self, name, ttl, max_entries=None, max_bytes=None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries      # 最大条目数，None表示不限制
+        self.max_bytes = max_bytes          # 内存预算（字节），None表示不限制
+        self._entries = OrderedDict()       # key -> (过期时间, 值, 字节数)，按最近使用顺序排列
+        self._bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'lru_evictions': 0, 'oversized': 0, 'joined': 0}
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key)[2]
+
+    def get(self, key):
+        with _lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return True, entry[1]
+            if entry is not None:
+                # 已过期
+                self._remove(key)
+                self._stats['evictions'] += 1
+            self._stats['misses'] += 1
+            return False, None
+
+    def set(self, key, value):
+        nbytes = value_nbytes(value)
+        with _lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                # 单个结果超过整个预算，不缓存
+                self._stats['oversized'] += 1
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value, nbytes)
+            self._bytes += nbytes
+            self._evict_lru()
+
+    # 超出条目数或内存预算时，从最久未使用的一端开始淘汰
+    def _evict_lru(self):
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._entries)))
+            self._stats['evictions'] += 1
+            self._stats['lru_evictions'] += 1
+
+    # 删除满足条件的缓存项，返回删除的个数
+    def invalidate(self, predicate=None):
+        with _lock:
+            keys = [key for key in self._entries if predicate is None or predicate(key)]
+            for key in keys:
+                self._remove(key)
+            self._stats['evictions'] += len(keys)
+            return len(keys)
+
+    def stats(self):
+        with _lock:
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_entries=self.max_entries,
+                max_bytes=self.max_bytes
+            )
+
+
+def get_cache(name, ttl, max_entries=None, max_bytes=None):
+    with _lock:
+        if name not in _caches:
+            _caches[name] = ResultCache(name, ttl, max_entries, max_bytes)
+        cache = _caches[name]
+        cache.ttl = ttl
+        cache.max_entries = max_entries
+        cache.max_bytes = max_bytes
+        return cache
+
+
+def user_version(phone_number):
+    with _lock:
+        return _user_versions[phone_number]
+
+
+# 用户数据发生变化（如导入成功）后调用：版本号加一并丢弃该用户的缓存项
+def invalidate_user(phone_number):
+    with _lock:
+        _user_versions[phone_number] += 1
+        for cache in _caches.values():
+            cache.invalidate(lambda key: key[0] == ('user', phone_number))
+
+
+# 科目表发生变化后调用：丢弃科目/模板等共享缓存
+def invalidate_catalog():
+    global _catalog_version
+    with _lock:
+        _catalog_version += 1
+        for cache in _caches.values():
+            cache.invalidate(lambda key: key[0] == ('catalog',))
+
+
+# 一次正在进行的计算：完成后设置done，成功时value为结果，失败时failed为True
+class _Inflight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.failed = False
+
+
+def _cached(name, ttl, scope_of, version_of, max_entries=None, max_bytes=None):
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            scope = scope_of(bound.arguments)
+            # 版本号在查询前读取：查询期间数据被导入时，旧结果会存到旧版本下，不会被读到
+            key = (scope, version_of(scope), tuple(bound.arguments.items()))
+            cache = get_cache(name, ttl, max_entries, max_bytes)
+            hit, value = cache.get(key)
+            record_cache(name, 'hit' if hit else 'miss')
+            if hit:
+                return value
+            
+            with _lock:
+                inflight = _inflight.get((name, key))
+                owner = inflight is None
+                if owner:
+                    inflight = _inflight[(name, key)] = _Inflight()
+            if not owner:
+                # 其他线程正在计算同一个键：等它完成；它失败时再自己计算
+                inflight.done.wait()
+                if not inflight.failed:
+                    with _lock:
+                        cache._stats['joined'] += 1
+                    record_cache(name, 'joined')
+                    return inflight.value
+                return func(*args, **kwargs)
+            
+            try:
+                value = func(*args, **kwargs)
+                inflight.value = value
+                if version_of(scope) == key[1]:
+                    cache.set(key, value)
+                return value
+            except BaseException:
+                inflight.failed = True
+                raise
+            finally:
+                with _lock:
+                    _inflight.pop((name, key), None)
+                inflight.done.set()
+        return wrapper
+    return decorator
+
+
+# 按用户缓存：被装饰函数必须有phone_number参数；默认使用CACHE_INFO中的条目数和内存预算
+def user_cache(name, ttl=3600, max_entries=CACHE_INFO['max_entries'], max_bytes=CACHE_INFO['max_bytes']):
+    return _cached(
+        name, ttl,
+        scope_of=lambda arguments: ('user', arguments['phone_number']),
+        version_of=lambda scope: user_version(scope[1]),
+        max_entries=max_entries,
+        max_bytes=max_bytes
+    )
+
+
+# 所有用户共享、只依赖科目表的缓存
+def catalog_cache(name, ttl=3600):
+    return _cached(
+        name, ttl,
+        scope_of=lambda arguments: ('catalog',),
+        version_of=lambda scope: _catalog_version
+    )
+
+
+# 各缓存的命中/未命中/淘汰计数及内存占用
+def cache_stats():
+    with _lock:
+        return {name: cache.stats() for name, cache in _caches.items()}
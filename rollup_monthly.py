@@ -0,0 +1,95 @@
+import argparse
+import pandas as pd
+import pymysql
+from db_config import MYSQL_INFO
+
+# ===================== 维护命令：校验/重建月度汇总表 =====================
+# 按用户分批，从 t_personal_balance 明细重新计算月度汇总，与 t_balance_monthly 比对并报告差异
+# 用法：python rollup_monthly.py                 只校验
+#       python rollup_monthly.py --rebuild       校验后按批重建（每批一个事务）
+#       python rollup_monthly.py --chunk 500     每批用户数
+
+EXPECTED_SQL = """
+    SELECT b.phone_number, DATE_FORMAT(b.record_date, '%%Y-%%m-01') AS period_month, s.subject_type,
+           SUM(b.current_balance) AS total_balance
+    FROM t_personal_balance b
+    JOIN t_personal_subject s ON b.subject_id = s.subject_id
+    WHERE b.phone_number IN ({phones})
+    GROUP BY b.phone_number, period_month, s.subject_type
+"""
+
+ACTUAL_SQL = """
+    SELECT phone_number, DATE_FORMAT(period_month, '%%Y-%%m-01') AS period_month, subject_type, total_balance
+    FROM t_balance_monthly
+    WHERE phone_number IN ({phones})
+"""
+
+REBUILD_SQL = """
+    INSERT INTO t_balance_monthly (phone_number, period_month, subject_type, total_balance)
+    SELECT b.phone_number, DATE_FORMAT(b.record_date, '%%Y-%%m-01') AS period_month, s.subject_type, SUM(b.current_balance)
+    FROM t_personal_balance b
+    JOIN t_personal_subject s ON b.subject_id = s.subject_id
+    WHERE b.phone_number IN ({phones})
+    GROUP BY b.phone_number, period_month, s.subject_type
+"""
+
+
+# 比对明细汇总（expected）与汇总表（actual），返回所有不一致的行
+def find_mismatches(expected, actual):
+    keys = ['phone_number', 'period_month', 'subject_type']
+    merged = expected.merge(actual, on=keys, how='outer', suffixes=('_expected', '_actual'), indicator=True)
+    differs = merged['_merge'] != 'both'
+    both = ~differs
+    differs[both] = (
+        merged.loc[both, 'total_balance_expected'].astype(float).round(2)
+        != merged.loc[both, 'total_balance_actual'].astype(float).round(2)
+    )
+    return merged[differs].drop(columns='_merge')
+
+
+def process_chunk(conn, phones, rebuild):
+    placeholders = ', '.join(['%s'] * len(phones))
+    expected = pd.read_sql(EXPECTED_SQL.format(phones=placeholders), conn, params=phones)
+    actual = pd.read_sql(ACTUAL_SQL.format(phones=placeholders), conn, params=phones)
+    mismatches = find_mismatches(expected, actual)
+
+    if rebuild:
+        cursor = conn.cursor()
+        conn.begin()
+        try:
+            cursor.execute(f"DELETE FROM t_balance_monthly WHERE phone_number IN ({placeholders})", phones)
+            cursor.execute(REBUILD_SQL.format(phones=placeholders), phones)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="校验/重建月度汇总表 t_balance_monthly")
+    parser.add_argument("--rebuild", action="store_true", help="按批从明细重建汇总表")
+    parser.add_argument("--chunk", type=int, default=200, help="每批处理的用户数")
+    args = parser.parse_args()
+
+    conn = pymysql.connect(**MYSQL_INFO)
+    phones = pd.read_sql("SELECT phone_number FROM t_user ORDER BY phone_number", conn)['phone_number'].tolist()
+
+    all_mismatches = []
+    for i in range(0, len(phones), args.chunk):
+        chunk = phones[i:i + args.chunk]
+        mismatches = process_chunk(conn, chunk, args.rebuild)
+        all_mismatches.append(mismatches)
+        print(f"已处理 {min(i + args.chunk, len(phones))}/{len(phones)} 个用户，本批差异 {len(mismatches)} 行")
+
+    mismatches = pd.concat(all_mismatches, ignore_index=True) if all_mismatches else pd.DataFrame()
+    if mismatches.empty:
+        print("\n✅ 月度汇总表与明细一致")
+    else:
+        print(f"\n❌ 共 {len(mismatches)} 行不一致:")
+        print(mismatches.to_string(index=False))
+        if args.rebuild:
+            print("\n以上差异已按明细重建")
+    conn.close()
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+from period_utils import period_range, trend_period_ends, trend_window
+from queries import ASOF_DETAIL_SQL, asof_trend_sql, summarize_detail
+
+# 期末余额口径：每个科目取结束日期之前的最后一条记录，与期间内记了几次无关
+# 数据库结果与在pandas中按科目取最后一条的结果对照
+TEST_PHONE = '19900000003'
+
+
+def test_trend_period_ends_match_window():
+    period_ends = trend_period_ends('季度', '2026-04-01', 3)
+    assert period_ends == [('2025Q4', '2026-01-01'), ('2026Q1', '2026-04-01'), ('2026Q2', '2026-07-01')]
+    labels, _, window_end = trend_window('季度', '2026-04-01', 3)
+    assert [label for label, _ in period_ends] == labels
+    assert period_ends[-1][1] == window_end
+
+
+def test_asof_trend_sql_placeholders():
+    # 每个时间单位 (标签, 手机号, 结束日期) 三个参数
+    assert asof_trend_sql(12).count('%s') == 36
+
+
+# 测试数据写入测试库（见conftest.py），模块结束后回滚
+@pytest.fixture(scope="module")
+def conn(test_db, seed_balances):
+    conn = test_db
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT subject_id FROM t_personal_subject ORDER BY subject_id LIMIT 6")
+        subject_ids = [row[0] for row in cursor.fetchall()]
+    # 每个科目每月末记一次；最后一个科目只在2024年记录过，之后仍按最后一次余额计入
+    seed_balances(TEST_PHONE, [
+        (subject_id, f"{year}-{month:02d}-28", 1000.0 * month + subject_id)
+        for year in (2024, 2025)
+        for month in range(1, 13)
+        for subject_id in subject_ids
+        if year == 2024 or subject_id != subject_ids[-1]
+    ])
+    history = pd.read_sql(
+        "SELECT b.subject_id, s.subject_type, b.record_date, b.current_balance FROM t_personal_balance b "
+        "JOIN t_personal_subject s ON b.subject_id = s.subject_id WHERE b.phone_number = %s", conn, params=(TEST_PHONE,)
+    )
+    history['record_date'] = history['record_date'].astype(str)
+    return conn, history
+
+
+def expected_totals(history, period_end):
+    latest = history[history['record_date'] < period_end].sort_values('record_date').groupby('subject_id').tail(1)
+    return summarize_detail(latest)
+
+
+@pytest.mark.parametrize("time_period_type, start_date, end_date", [
+    ('年度', '2025-01-01', '2025-12-31'),
+    ('季度', '2025-04-01', '2025-06-30'),
+    ('月度', '2025-06-01', '2025-06-30'),
+    ('自定义', '2024-03-15', '2024-08-20'),
+    ('年度', '2030-01-01', '2030-12-31'),
+])
+def test_asof_detail_takes_latest_per_subject(conn, time_period_type, start_date, end_date):
+    conn, history = conn
+    _, period_end = period_range(time_period_type, start_date, end_date)
+    df_detail = pd.read_sql(ASOF_DETAIL_SQL, conn, params=(TEST_PHONE, period_end))
+    assert df_detail['subject_name'].is_unique
+    pd.testing.assert_series_equal(summarize_detail(df_detail), expected_totals(history, period_end), check_exact=False)
+
+
+@pytest.mark.parametrize("time_period_type", ['年度', '季度', '月度'])
+def test_asof_trend_matches_detail(conn, time_period_type):
+    conn, history = conn
+    period_ends = trend_period_ends(time_period_type, '2025-06-01', 6)
+    params = [value for label, period_end in period_ends for value in (label, TEST_PHONE, period_end)]
+    df = pd.read_sql(asof_trend_sql(len(period_ends)), conn, params=params).set_index('period')
+    for label, period_end in period_ends:
+        expected = expected_totals(history, period_end)
+        actual = df.loc[label] if label in df.index else pd.Series({'总资产': 0.0, '总负债': 0.0})
+        assert float(actual['总资产']) == pytest.approx(expected['总资产'])
+        assert float(actual['总负债']) == pytest.approx(expected['总负债'])
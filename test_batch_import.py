@@ -0,0 +1,88 @@
+from contextlib import contextmanager
+
+import pandas as pd
+import batch_import
+from batch_import import list_import_files, process_file, split_by_phone
+from data_import import export_frame
+from test_import import FakeImportCursor, subjects_df
+
+# 测试数据：一个文件中包含多个用户（手机号列），其中一行手机号不正确
+rows = pd.DataFrame({
+    '手机号': [13800138002, '13800138003', 13800138002.0, '123'],
+    '日期': ['2026-01-07'] * 4,
+    '科目名称': ['现金', '现金', '房贷', '现金'],
+    '科目类型': ['资产', '资产', '负债', '资产'],
+    '金额': [1.0, 2.0, 3.0, 4.0],
+    '备注': [''] * 4,
+}, index=range(2, 6))
+
+
+def test_split_by_phone_keeps_row_numbers():
+    groups, issues = split_by_phone([rows.iloc[:2], rows.iloc[2:]])
+    assert sorted(groups) == ['13800138002', '13800138003']
+    assert [chunk.index.tolist() for chunk in groups['13800138002']] == [[2], [4]]
+    assert '手机号' not in groups['13800138003'][0].columns
+    assert issues[['行号', '列']].values.tolist() == [[5, '手机号']]
+
+
+def test_split_by_phone_requires_column():
+    groups, issues = split_by_phone([rows.drop(columns='手机号')])
+    assert groups == {} and issues['级别'].tolist() == ['错误']
+
+
+def test_dry_run_reports_each_file(tmp_path):
+    data = rows.drop(columns='手机号')
+    (tmp_path / '13800138000.xlsx').write_bytes(export_frame(data, 'xlsx'))
+    (tmp_path / '13800138001.csv').write_bytes(export_frame(data.assign(科目类型='收入'), 'csv'))
+    (tmp_path / 'notes.txt').write_text('ignored')
+    paths = list_import_files(tmp_path)
+    assert [p.rsplit('/', 1)[-1] for p in paths] == ['13800138000.xlsx', '13800138001.csv']
+
+    report, issues = process_file(paths[0], dry_run=True)
+    # 同一天出现多次的现金只是警告
+    assert [(row['手机号'], row['状态'], row['行数'], row['警告数']) for row in report] == [('13800138000', '校验通过', 4, 2)]
+    assert (issues['级别'] == '警告').all()
+
+    report, issues = process_file(paths[1], dry_run=True)
+    assert [(row['状态'], row['错误数']) for row in report] == [('校验未通过', 4)]
+    assert issues.loc[issues['级别'] == '错误', '行号'].tolist() == [2, 3, 4, 5]
+
+
+# 模拟连接池中的连接：所有事务都写入同一个FakeImportCursor
+class FakePool:
+    def __init__(self):
+        self.db = FakeImportCursor()
+        self.commits = 0
+
+    @contextmanager
+    def connection(self):
+        yield self
+
+    def cursor(self):
+        return self.db
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+# 文件名是手机号的CSV：数据块流式传给导入，总行数未知，行数按实际导入计算
+def test_phone_named_csv_imports_every_row(tmp_path, monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(batch_import, 'get_pool', lambda: pool)
+    monkeypatch.setattr(batch_import, 'load_subjects', lambda conn: subjects_df)
+    data = rows.drop(columns='手机号').iloc[:3]
+    path = tmp_path / '13800138000.csv'
+    path.write_bytes(export_frame(data, 'csv'))
+
+    report, issues = process_file(str(path))
+    assert [(row['状态'], row['行数'], row['新增']) for row in report] == [('成功', 3, 3)]
+    assert pool.commits == 1
+    assert len(pool.db.balances) == 3
+    # 导入记录中的行数与实际写入一致
+    assert [logged[3] for logged in pool.db.logged] == [3]
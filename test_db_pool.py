@@ -0,0 +1,176 @@
+import threading
+import time
+
+import pytest
+from pymysql.constants import SERVER_STATUS
+import db_pool
+from db_config import JOB_INFO, LOADER_INFO, POOL_HEADROOM, POOL_INFO, PREFETCH_INFO
+from db_pool import ConnectionPool, PoolTimeout
+
+
+# 模拟pymysql连接：记录ping/rollback/close，可设置为已断开或回滚失败
+class FakeConnection:
+    def __init__(self, n, **kwargs):
+        self.n = n
+        self.kwargs = kwargs
+        self.open = True
+        self.alive = True           # False时ping失败（如服务端已断开）
+        self.in_trans = False
+        self.rollback_fails = False
+        self.calls = []
+
+    @property
+    def server_status(self):
+        return SERVER_STATUS.SERVER_STATUS_IN_TRANS if self.in_trans else 0
+
+    def ping(self, reconnect=True):
+        self.calls.append('ping')
+        if not self.alive:
+            raise ConnectionError("连接已断开")
+
+    def rollback(self):
+        self.calls.append('rollback')
+        if self.rollback_fails:
+            raise ConnectionError("连接已断开")
+        self.in_trans = False
+
+    def close(self):
+        self.calls.append('close')
+        self.open = False
+
+
+# 模拟pymysql.connect：按顺序编号新建的连接
+class FakeConnect:
+    def __init__(self):
+        self.connections = []
+
+    def __call__(self, **kwargs):
+        conn = FakeConnection(len(self.connections) + 1, **kwargs)
+        self.connections.append(conn)
+        return conn
+
+
+def make_pool(**kwargs):
+    connect = FakeConnect()
+    return ConnectionPool({'host': 'localhost', 'database': 'test'}, connect=connect, **kwargs), connect
+
+
+def test_connections_are_reused_and_configured():
+    pool, connect = make_pool(size=2)
+    with pool.connection() as conn:
+        assert conn.kwargs['autocommit'] is True
+        assert conn.kwargs['host'] == 'localhost'
+    with pool.connection() as again:
+        assert again is conn
+    assert conn.calls == ['ping']
+    stats = pool.stats()
+    assert (stats['checkouts'], stats['new_connections'], stats['in_use'], stats['idle']) == (2, 1, 0, 1)
+
+
+def test_acquire_times_out_when_exhausted():
+    pool, _ = make_pool(size=1, timeout=0.05)
+    conn = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    stats = pool.stats()
+    assert (stats['waits'], stats['timeouts'], stats['in_use']) == (1, 1, 1)
+
+
+def test_waiting_thread_gets_released_connection():
+    pool, _ = make_pool(size=1, timeout=5)
+    conn = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    while pool.stats()['waits'] == 0:
+        time.sleep(0.001)
+    pool.release(conn)
+    waiter.join(5)
+    assert got == [conn]
+
+
+def test_old_connections_are_recycled(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(db_pool.time, 'monotonic', lambda: now[0])
+    pool, connect = make_pool(recycle=60)
+    with pool.connection() as first:
+        pass
+    now[0] += 61
+    with pool.connection() as second:
+        pass
+    assert second is not first
+    assert first.calls == ['close']
+    assert pool.stats()['recycled'] == 1
+
+
+def test_dead_connection_is_replaced_by_pre_ping():
+    pool, connect = make_pool()
+    with pool.connection() as first:
+        pass
+    first.alive = False
+    with pool.connection() as second:
+        pass
+    assert second is connect.connections[1]
+    assert first.calls == ['ping', 'close']
+    assert pool.stats()['ping_failures'] == 1
+
+
+def test_failed_checkout_frees_its_slot():
+    pool, connect = make_pool(size=1, timeout=0.05)
+
+    def refuse(**kwargs):
+        raise ConnectionError("无法连接")
+    pool.connect = refuse
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    pool.connect = connect
+    with pool.connection():
+        pass
+    assert pool.stats()['in_use'] == 0
+
+
+def test_release_rolls_back_open_transactions():
+    pool, _ = make_pool()
+    with pool.connection() as conn:
+        conn.in_trans = True
+    assert conn.calls == ['rollback']
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            raise ValueError("查询出错")
+    # 出错时即使没有进行中的事务也回滚
+    assert conn.calls == ['rollback', 'ping', 'rollback']
+    assert pool.stats()['idle'] == 1
+
+
+def test_broken_connections_are_discarded():
+    pool, connect = make_pool()
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            conn.rollback_fails = True
+            raise ValueError("查询出错")
+    assert conn.calls[-1] == 'close'
+    with pool.connection() as closed:
+        closed.open = False
+    stats = pool.stats()
+    assert (stats['discarded'], stats['idle'], stats['in_use']) == (2, 0, 0)
+    with pool.connection() as fresh:
+        assert fresh is connect.connections[2]
+
+
+def test_close_closes_idle_connections():
+    pool, connect = make_pool()
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    pool.close()
+    assert [conn.open for conn in connect.connections] == [False, False]
+    assert pool.stats()['idle'] == 0
+
+
+# 看板加载、后台导入、预取同时占满各自的线程时，页面查询仍有连接可用
+def test_pool_leaves_headroom_beyond_worker_threads():
+    workers = LOADER_INFO['workers'] + JOB_INFO['workers'] + PREFETCH_INFO['workers']
+    assert POOL_HEADROOM > 0
+    assert POOL_INFO['size'] >= workers + POOL_HEADROOM
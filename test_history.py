@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from history import downsample_history, lttb, net_worth_series
+from period_utils import bucket_start, history_bucket
+from queries import history_sql
+
+
+def test_bucket_by_range_length():
+    assert history_bucket('2026-01-01', '2026-12-31') == '日'
+    assert history_bucket('2016-01-01', '2026-12-31') == '周'
+    assert history_bucket('1980-01-01', '2026-12-31') == '月'
+    assert history_bucket('2026-01-01', '2026-03-31', max_buckets=30) == '周'
+
+
+def test_bucket_start():
+    assert bucket_start('2026-10-18', '日') == '2026-10-18'
+    assert bucket_start('2026-10-18', '周') == '2026-10-12'    # 周一
+    assert bucket_start('2026-10-18', '月') == '2026-10-01'
+
+
+def test_history_sql_placeholders():
+    assert all(history_sql(bucket).count('%s') == 6 for bucket in ['日', '周', '月'])
+
+
+def test_net_worth_carries_balances_forward():
+    rows = pd.DataFrame([
+        # 期初余额（范围开始前的最后一条）记在第一个单位上，同一单位内有更新的记录时以后者为准
+        ('2026-01-01', '2025-12-31', 1, '资产', 100.0),
+        ('2026-01-01', '2025-11-30', 2, '负债', 50.0),
+        ('2026-01-01', '2026-01-03', 1, '资产', 120.0),
+        ('2026-02-01', '2026-02-10', 2, '负债', 40.0),
+        ('2026-03-01', '2026-03-05', 3, '资产', 10.0),
+        ('2026-03-01', '2026-03-01', 3, '资产', 5.0),
+    ], columns=['bucket', 'record_date', 'subject_id', 'subject_type', 'current_balance'])
+    history = net_worth_series(rows)
+    assert history['时间'].dt.strftime('%Y-%m-%d').tolist() == ['2026-01-01', '2026-02-01', '2026-03-01']
+    assert history['总资产'].tolist() == [120.0, 120.0, 130.0]
+    assert history['总负债'].tolist() == [50.0, 40.0, 40.0]
+    assert history['净资产'].tolist() == [70.0, 80.0, 90.0]
+    assert net_worth_series(rows.iloc[0:0]).empty
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(10000)
+    y = np.sin(x / 500.0)
+    y[4321] = 50.0
+    selected = lttb(x, y, 200)
+    assert len(selected) == 200
+    assert selected[0] == 0 and selected[-1] == len(x) - 1
+    assert (np.diff(selected) > 0).all()
+    assert 4321 in selected
+    assert (lttb(x[:100], y[:100], 200) == np.arange(100)).all()
+
+
+def test_downsample_history_uses_same_points():
+    times = pd.date_range('2016-01-01', periods=3650, freq='D')
+    history = pd.DataFrame({'时间': times, '总资产': np.arange(3650.0), '总负债': np.zeros(3650)})
+    history['净资产'] = history['总资产'] - history['总负债']
+    sampled = downsample_history(history, 500)
+    assert len(sampled) == 500
+    assert sampled['时间'].iloc[0] == times[0] and sampled['时间'].iloc[-1] == times[-1]
+    assert (sampled['总资产'] - sampled['总负债'] == sampled['净资产']).all()
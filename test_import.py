@@ -1,67 +1,502 @@
+from collections import Counter
+from io import BytesIO
+
+import openpyxl
 import pandas as pd
-import pymysql
-from db_config import MYSQL_INFO
-
-# 测试数据：模拟Excel中的数据
-test_data = {
-    '日期': ['2026-01-07', '2026-01-07'],
-    '科目名称': ['银行卡存款【浦发】', '银行卡存款【浦发】'],
-    '科目类型': ['资产', '资产'],
-    '金额': [350000.00, 5558.64],
-    '备注': ['卖房剩余', '']
-}
-
-test_df = pd.DataFrame(test_data)
-print("测试数据:")
-print(test_df)
-
-# 模拟修改后的导入逻辑
-print("\n模拟处理过程:")
-
-# 连接数据库获取科目信息
-try:
-    conn = pymysql.connect(**MYSQL_INFO)
-    query = "SELECT * FROM t_personal_subject"
-    subjects_df = pd.read_sql(query, conn)
-    conn.close()
-    print("\n数据库中的科目信息:")
-    print(subjects_df)
-    
-    # 创建科目名称到ID列表的映射
-    subject_map = {}
-    for _, row in subjects_df.iterrows():
-        name = row['subject_name']
-        if name not in subject_map:
-            subject_map[name] = []
-        subject_map[name].append(row['subject_id'])
-    
-    print("\n科目映射:")
-    print(subject_map)
-    
-    # 处理测试数据
-    test_df['subject_id'] = None
-    
-    # 为每个相同科目名称的行分配不同的ID
-    for name, ids in subject_map.items():
-        name_rows = test_df[test_df['科目名称'] == name]
-        if not name_rows.empty:
-            for i, (idx, row) in enumerate(name_rows.iterrows()):
-                test_df.at[idx, 'subject_id'] = ids[i % len(ids)]
-    
-    print("\n处理后的数据:")
-    print(test_df)
-    
-    # 验证是否成功分配了不同的ID
-    if '银行卡存款【浦发】' in test_df['科目名称'].values:
-        pufa_rows = test_df[test_df['科目名称'] == '银行卡存款【浦发】']
-        print("\n浦发银行相关行:")
-        print(pufa_rows)
-        
-        if len(pufa_rows) == 2 and len(pufa_rows['subject_id'].unique()) == 2:
-            print("\n✅ 测试成功：相同科目名称的两条数据分配了不同的ID")
-        else:
-            print("\n❌ 测试失败：没有为相同科目名称的两条数据分配不同的ID")
-    
-    conn.close()
-except Exception as e:
-    print(f"\n❌ 测试失败: {e}")
\ No newline at end of file
+import pytest
+from data_import import (
+    STAGING_CREATE_SQL, STAGING_DIFF_SQL, STAGING_INSERT_SQL, STAGING_MERGE_SQL, UPSERT_BALANCE_SQL, ImportValidationError,
+    check_import_frame, clean_import_frame, diff_balances, export_frame, file_hash, import_chunks, read_excel_chunks,
+    read_import_chunks, resolve_subject_ids, stage_balances, subjects_needed, write_balances
+)
+from db_config import BULK_IMPORT_INFO
+from local_store import local_detail
+from queries import ROLLUP_REFRESH_SQL, summarize_detail
+
+# 测试数据：模拟Excel中的数据和数据库中的科目信息（含重复科目名称）
+subjects_df = pd.DataFrame({
+    'subject_id': [1, 2, 11, 12, 3, 9],
+    'subject_name': ['现金', '银行卡存款', '银行卡存款【浦发】', '银行卡存款【浦发】', '支付宝/微信余额', '房贷'],
+    'subject_type': ['资产', '资产', '资产', '资产', '资产', '负债'],
+    'subject_seq': [1, 1, 1, 2, 1, 1],
+})
+
+test_df = pd.DataFrame({
+    '日期': ['2026-01-07'] * 7,
+    '科目名称': ['银行卡存款【浦发】', '现金', '银行卡存款【浦发】', '新科目', '银行卡存款【浦发】', '房贷', '新科目'],
+    '科目类型': ['资产', '资产', '资产', '资产', '资产', '负债', '资产'],
+    '金额': [350000.00, 1500.00, 5558.64, 100.00, 20.00, 795000.00, 50.00],
+    '备注': ['卖房剩余', '', '', '', '', '', ''],
+})
+
+
+def resolved_ids(df):
+    resolved, unresolved = resolve_subject_ids(df, subjects_df)
+    full = pd.concat([resolved, unresolved]).sort_index()
+    assert full.index.equals(df.index)
+    return full['subject_id'].astype(object).where(full['subject_id'].notna(), None).tolist()
+
+
+def test_same_day_rows_take_successive_seqs():
+    cleaned = clean_import_frame(test_df)
+    # 同一天的第i次出现记到第i个同名科目上：浦发三行依次为序号1、2、3
+    assert cleaned['科目序号'].tolist() == [1, 1, 2, 1, 3, 1, 2]
+    assert resolved_ids(cleaned) == [11, 1, 12, None, None, 9, None]
+
+
+def test_seq_restarts_every_day():
+    # 两张浦发卡：1月只有一行，2月两行，2月的两行分别记到11和12上
+    df = pd.DataFrame({
+        '日期': ['2026-01-31', '2026-02-28', '2026-02-28'],
+        '科目名称': ['银行卡存款【浦发】'] * 3,
+        '科目类型': ['资产'] * 3,
+        '金额': [110.0, 120.0, 500.0],
+    })
+    assert resolved_ids(clean_import_frame(df)) == [11, 11, 12]
+
+
+def test_same_name_with_other_type_is_another_subject():
+    df = pd.DataFrame({'日期': ['2026-01-07'], '科目名称': ['现金'], '科目类型': ['负债'], '金额': [1.0]})
+    assert resolved_ids(clean_import_frame(df)) == [None]
+
+
+def test_unknown_subjects_are_split_out():
+    resolved, unresolved = resolve_subject_ids(clean_import_frame(test_df), subjects_df)
+    assert unresolved['科目名称'].tolist() == ['新科目', '银行卡存款【浦发】', '新科目']
+    assert unresolved['subject_id'].isna().all()
+    assert resolved['subject_id'].astype(int).tolist() == [11, 1, 12, 9]
+    # 需要新建的科目：新科目两个，浦发第3个
+    assert list(subjects_needed(unresolved).itertuples(index=False, name=None)) == [
+        ('新科目', '资产', 1), ('新科目', '资产', 2), ('银行卡存款【浦发】', '资产', 3)
+    ]
+
+
+def test_empty_frame():
+    resolved, unresolved = resolve_subject_ids(clean_import_frame(test_df.iloc[0:0]), subjects_df)
+    assert resolved.empty and unresolved.empty
+
+
+# 生成一个Excel文件（与下载模板相同的列）
+def make_workbook(df):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False):
+        ws.append(list(row))
+    buffer = BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_streamed_chunks_match_whole_file():
+    total_rows, chunks = read_excel_chunks(make_workbook(test_df), chunk_size=3)
+    # 各块之间传入同一个Counter，科目序号跨块连续，结果与整体解析一致
+    seen = Counter()
+    chunks = [check_import_frame(chunk, seen)[0] for chunk in chunks]
+    assert total_rows == len(test_df)
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert sum((resolved_ids(chunk) for chunk in chunks), []) == resolved_ids(clean_import_frame(test_df))
+
+
+def test_subjects_needed_across_chunks():
+    # 新卡第一次出现在第一块；第二块中同一天出现两次，需要第2个新卡
+    seen = Counter()
+    first, _ = check_import_frame(pd.DataFrame({'日期': ['2026-01-31'], '科目名称': ['新卡'], '科目类型': ['资产'], '金额': [1.0]}), seen)
+    second, _ = check_import_frame(pd.DataFrame({
+        '日期': ['2026-02-28', '2026-02-28'], '科目名称': ['新卡', '新卡'], '科目类型': ['资产', '资产'], '金额': [2.0, 3.0]
+    }), seen)
+    assert first['科目序号'].tolist() == [1]
+    assert second['科目序号'].tolist() == [1, 2]
+    known = pd.concat([subjects_df, pd.DataFrame([[20, '新卡', '资产', 1]], columns=subjects_df.columns)])
+    _, unresolved = resolve_subject_ids(second, known)
+    assert list(subjects_needed(unresolved).itertuples(index=False, name=None)) == [('新卡', '资产', 2)]
+
+
+def test_clean_import_frame_rejects_bad_type():
+    bad = test_df.copy()
+    bad.loc[1, '科目类型'] = '收入'
+    with pytest.raises(ImportValidationError):
+        clean_import_frame(bad)
+
+
+def test_all_issues_reported_with_row_numbers():
+    bad = test_df.copy()
+    bad.index = range(2, len(bad) + 2)      # 与read_excel_chunks一致，索引为Excel行号
+    bad.loc[3, '科目类型'] = '收入'
+    bad.loc[5, '日期'] = '2026-13-45'
+    bad['金额'] = bad['金额'].astype(object)
+    bad.loc[8, '金额'] = 'abc'
+    _, issues = check_import_frame(bad)
+    errors = issues[issues['级别'] == '错误'].sort_values('行号')
+    assert errors[['行号', '列']].values.tolist() == [[3, '科目类型'], [5, '日期'], [8, '金额']]
+
+    with pytest.raises(ImportValidationError) as excinfo:
+        clean_import_frame(bad)
+    assert len(excinfo.value.issues[excinfo.value.issues['级别'] == '错误']) == 3
+
+
+def test_duplicates_across_chunks_are_warnings():
+    seen = Counter()
+    _, first = check_import_frame(test_df.iloc[:1], seen)
+    _, second = check_import_frame(test_df.iloc[1:], seen)
+    assert first.empty
+    # 浦发（第0、2、4行）和新科目（第3、6行）同一天出现多次：重复的行为警告，不阻止导入
+    assert second['行号'].tolist() == [2, 4, 6]
+    assert (second['级别'] == '警告').all()
+    assert second['原因'].str.contains('第i个同名科目').all()
+
+
+def test_too_many_same_day_rows_is_an_error():
+    df = pd.DataFrame({'日期': ['2026-01-07'] * 128, '科目名称': ['现金'] * 128, '科目类型': ['资产'] * 128, '金额': [1.0] * 128})
+    _, issues = check_import_frame(df)
+    errors = issues[issues['级别'] == '错误']
+    assert errors['行号'].tolist() == [127]
+    assert (issues['级别'] == '警告').sum() == 126
+
+
+# CSV/Parquet与Excel走同一套校验，规范化后的数据一致
+@pytest.mark.parametrize("file_format", ['csv', 'parquet'])
+def test_csv_and_parquet_match_excel(file_format):
+    _, excel_chunks = read_excel_chunks(make_workbook(test_df), chunk_size=3)
+    expected = pd.concat([clean_import_frame(chunk) for chunk in excel_chunks])
+
+    total_rows, chunks = read_import_chunks(BytesIO(export_frame(test_df, file_format)), f"data.{file_format}", chunk_size=3)
+    chunks = [clean_import_frame(chunk) for chunk in chunks]
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert total_rows in (None, len(test_df))
+    actual = pd.concat(chunks)
+    pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False)
+
+
+def test_csv_row_numbers_skip_blank_lines():
+    content = "日期,科目名称,科目类型,金额,备注\n2026-01-07,现金,资产,100,\n\n2026-01-07,房贷,收入,200,\n"
+    _, chunks = read_import_chunks(BytesIO(content.encode('utf-8')), "data.csv")
+    _, issues = check_import_frame(next(chunks))
+    # 空行不计入数据，但行号与文件中的行一致
+    assert issues['行号'].tolist() == [4]
+
+
+# 两张浦发卡：1月只有11有记录，2月两张都有，3月只有12有记录
+balances_df = pd.DataFrame({
+    'subject_id': [11, 1, 11, 12, 12],
+    'record_date': ['2026-01-31', '2026-02-28', '2026-02-28', '2026-02-28', '2026-03-31'],
+    'current_balance': [110.0, 50.0, 120.0, 500.0, 600.0],
+    'remark': ['', '', '', '工资卡', ''],
+})
+
+
+# 与EXPORT_SQL相同的导出结果
+def exported_rows():
+    rows = balances_df.merge(subjects_df, on='subject_id').sort_values(['record_date', 'subject_id'])
+    return pd.DataFrame({
+        '日期': rows['record_date'], '科目名称': rows['subject_name'], '科目类型': rows['subject_type'],
+        '金额': rows['current_balance'], '备注': rows['remark'], '科目序号': rows['subject_seq'],
+    })
+
+
+# 导出的文件重新导入后，每行仍对应原来的科目
+@pytest.mark.parametrize("file_format", ['xlsx', 'csv', 'parquet'])
+def test_export_round_trip(file_format):
+    _, chunks = read_import_chunks(BytesIO(export_frame(exported_rows(), file_format)), f"data.{file_format}", chunk_size=2)
+    seen = Counter()
+    resolved = []
+    for chunk in chunks:
+        cleaned, issues = check_import_frame(chunk, seen)
+        assert issues.empty
+        known, unknown = resolve_subject_ids(cleaned, subjects_df)
+        assert unknown.empty
+        resolved.append(known)
+    resolved = pd.concat(resolved)
+    actual = sorted(zip(resolved['subject_id'].astype(int), resolved['日期'], resolved['金额']))
+    expected = sorted(zip(balances_df['subject_id'], balances_df['record_date'], balances_df['current_balance']))
+    assert actual == expected
+
+
+def test_seq_column_is_validated():
+    df = pd.DataFrame({
+        '日期': ['2026-01-07'] * 5,
+        '科目名称': ['银行卡存款【浦发】'] * 5,
+        '科目类型': ['资产'] * 5,
+        '金额': [1.0] * 5,
+        '科目序号': [2, 'x', 1.5, None, 2],
+    })
+    cleaned, issues = check_import_frame(df)
+    errors = issues[issues['级别'] == '错误']
+    assert errors[['行号', '列']].values.tolist() == [[1, '科目序号'], [2, '科目序号'], [4, '科目序号']]
+    # 未填写序号的行按出现次数编号
+    assert cleaned['科目序号'].tolist()[3] == 1
+
+
+def test_unsupported_format():
+    with pytest.raises(ValueError):
+        read_import_chunks(BytesIO(b""), "data.xls")
+
+
+def test_diff_writes_only_new_and_changed_rows():
+    incoming = pd.DataFrame({
+        'subject_id': [1, 2, 3, 4, 4],
+        '日期': ['2026-01-07'] * 5,
+        '金额': [100.0, 200.0, 300.0, 1.0, 400.0],
+        '备注': ['', '工资', '', '', ''],
+    })
+    # 数据库中：1 完全相同（金额为DECIMAL转换来的值）、2 备注不同、3 金额不同、4 不存在
+    existing = pd.DataFrame({
+        'subject_id': [1, 2, 3, 5],
+        '日期': ['2026-01-07'] * 4,
+        '金额': [100.004, 200.0, 300.5, 9.0],
+        '备注': ['', '', '', ''],
+    })
+    changed, inserted, updated, unchanged = diff_balances(incoming, existing)
+    assert (inserted, updated, unchanged) == (1, 2, 1)
+    # 文件内重复的键以最后一行为准
+    assert changed['subject_id'].tolist() == [2, 3, 4]
+    assert changed['金额'].tolist() == [200.0, 300.0, 400.0]
+
+
+def test_diff_against_empty_table():
+    changed, inserted, updated, unchanged = diff_balances(test_df.assign(subject_id=range(len(test_df))), pd.DataFrame(
+        columns=['subject_id', '日期', '金额', '备注']
+    ))
+    assert (len(changed), inserted, updated, unchanged) == (len(test_df), len(test_df), 0, 0)
+
+
+def test_file_hash_rewinds():
+    buffer = make_workbook(test_df)
+    assert file_hash(buffer) == file_hash(buffer)
+    assert buffer.tell() == 0
+    assert file_hash(buffer) != file_hash(make_workbook(test_df.iloc[1:]))
+
+
+# 只记录executemany调用的游标，用于检查分批写入（不连接数据库）
+class RecordingCursor:
+    def __init__(self):
+        self.calls = []
+
+    def executemany(self, sql, rows):
+        self.calls.append((sql, rows))
+
+
+def test_write_and_stage_in_batches():
+    resolved = test_df.assign(subject_id=range(1, len(test_df) + 1))
+
+    cursor = RecordingCursor()
+    write_balances(cursor, resolved, '13800138000', chunk_size=3)
+    assert [len(rows) for _, rows in cursor.calls] == [3, 3, 1]
+    assert all(sql == UPSERT_BALANCE_SQL for sql, _ in cursor.calls)
+    assert cursor.calls[0][1][0] == ('13800138000', 1, '2026-01-07', 350000.0, '卖房剩余')
+
+    cursor = RecordingCursor()
+    stage_balances(cursor, resolved, batch_size=5)
+    assert [len(rows) for _, rows in cursor.calls] == [5, 2]
+    assert all(sql == STAGING_INSERT_SQL for sql, _ in cursor.calls)
+    assert cursor.calls[0][1][0] == (1, '2026-01-07', 350000.0, '卖房剩余')
+
+
+# 在内存中模拟导入用到的表的游标（不连接数据库）：科目表、明细表、中转表和导入记录，并记录执行过的语句
+# 库中utf8mb4排序规则下的比较：忽略大小写和末尾空格
+def collate(name):
+    return name.rstrip().casefold()
+
+
+class FakeImportCursor:
+    def __init__(self, subjects=subjects_df, balances=(), last_hash=None):
+        self.subjects = [tuple(row) for row in subjects[['subject_id', 'subject_name', 'subject_type', 'subject_seq']].values.tolist()]
+        self.balances = {(subject_id, day): (amount, remark) for subject_id, day, amount, remark in balances}
+        self.staged = {}
+        self.last_hash = last_hash
+        self.logged = []
+        self.statements = []        # 执行过的语句
+        self.params = []            # 对应的参数
+        self.result = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+        self.params.append(params)
+        text = ' '.join(sql.split())
+        self.result = []
+        if text.startswith("SELECT file_hash FROM t_import_log"):
+            self.result = [(self.last_hash,)] if self.last_hash else []
+        elif text.startswith("INSERT INTO t_import_log"):
+            self.logged.append(params)
+        elif text.startswith("SELECT subject_id, subject_name, subject_type, subject_seq FROM t_personal_subject WHERE"):
+            self.result = [row for row in self.subjects if collate(row[1]) in map(collate, params)]
+        elif text.startswith("SELECT DISTINCT subject_id FROM t_personal_balance"):
+            self.result = [(subject_id,) for subject_id in sorted({key[0] for key in self.balances})]
+        elif text.startswith("SELECT subject_id, record_date, current_balance, remark FROM t_personal_balance"):
+            _, first, last = params
+            self.result = [(key[0], key[1], *value) for key, value in self.balances.items() if first <= key[1] <= last]
+        elif sql == STAGING_DIFF_SQL:
+            changed = [key for key, value in self.staged.items() if self.balances.get(key) != value]
+            inserted = sum(key not in self.balances for key in self.staged)
+            dates = [day for _, day in changed]
+            self.result = [(len(self.staged), inserted, len(self.staged) - len(changed),
+                            min(dates) if dates else None, max(dates) if dates else None)]
+        elif sql == STAGING_MERGE_SQL:
+            self.balances.update(self.staged)
+
+    def executemany(self, sql, rows):
+        self.statements.append(sql)
+        self.params.append(rows)
+        if sql.lstrip().startswith("INSERT IGNORE INTO t_personal_subject"):
+            for name, subject_type, seq in rows:
+                if not any((collate(row[1]), *row[2:]) == (collate(name), subject_type, seq) for row in self.subjects):
+                    self.subjects.append((max(row[0] for row in self.subjects) + 1, name, subject_type, seq))
+        elif sql == UPSERT_BALANCE_SQL:
+            self.balances.update({(subject_id, day): (amount, remark) for _, subject_id, day, amount, remark in rows})
+        elif sql == STAGING_INSERT_SQL:
+            self.staged.update({(subject_id, day): (amount, remark) for subject_id, day, amount, remark in rows})
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def params_of(self, sql):
+        return [params for statement, params in zip(self.statements, self.params) if statement == sql]
+
+
+def import_rows(rows):
+    return pd.DataFrame(rows, columns=['日期', '科目名称', '科目类型', '金额', '备注'])
+
+
+# 明细表中已有：11在1月31日110元，现金在2月28日50元
+def fake_cursor(**options):
+    return FakeImportCursor(balances=[(11, '2026-01-31', 110.0, ''), (1, '2026-02-28', 50.0, '')], **options)
+
+
+upload = [
+    import_rows([('2026-01-31', '银行卡存款【浦发】', '资产', 110.0, '')]),
+    import_rows([('2026-02-28', '现金', '资产', 50.0, ''), ('2026-02-28', '银行卡存款【浦发】', '资产', 120.0, '')]),
+    import_rows([('2026-02-28', '银行卡存款【浦发】', '资产', 500.0, ''), ('2026-03-31', '房贷', '负债', 0.0, '')]),
+]
+
+
+def test_import_chunks_writes_changes_and_refreshes_touched_months():
+    cursor = fake_cursor()
+    progress = []
+    result = import_chunks(cursor, upload, '13800138000', subjects_df, on_progress=progress.append, file_hash='abc', file_name='a.xlsx')
+    # 从未记录过的科目（房贷）金额为0的行不导入；1月两行与库中相同
+    assert (result['rows'], result['inserted'], result['updated'], result['unchanged']) == (4, 2, 0, 2)
+    assert (result['new_subjects'], result['skipped'], result['bulk']) == (0, False, False)
+    assert progress == [1, 3, 5]
+    assert cursor.balances[(11, '2026-02-28')] == (120.0, '') and cursor.balances[(12, '2026-02-28')] == (500.0, '')
+    # 只刷新写入过的月份（2月）
+    assert cursor.params_of(ROLLUP_REFRESH_SQL) == [('13800138000', '2026-02-01', '2026-03-01')]
+    assert len(cursor.logged) == 1 and cursor.logged[0][1:4] == ('abc', 'a.xlsx', 4)
+
+
+def test_identical_upload_is_skipped():
+    cursor = fake_cursor(last_hash='abc')
+    result = import_chunks(cursor, iter(upload), '13800138000', subjects_df, file_hash='abc')
+    assert result['skipped'] and result['rows'] == 0
+    assert UPSERT_BALANCE_SQL not in cursor.statements and not cursor.logged
+
+
+def test_errors_are_collected_then_raised():
+    bad = import_rows([('2026-03-31', '房贷', '收入', 2.0, ''), ('2026-02-30', '现金', '资产', 1.0, '')])
+    cursor = fake_cursor()
+    progress = []
+    with pytest.raises(ImportValidationError) as excinfo:
+        import_chunks(cursor, [upload[0], bad, upload[1]], '13800138000', subjects_df, on_progress=progress.append, file_hash='abc')
+    # 出错后的块仍会校验（报告全部问题），但不再写入，也不刷新汇总、不记录导入
+    assert excinfo.value.issues['原因'].str.contains('日期格式|科目类型必须').sum() == 2
+    assert progress == [1, 3, 5]
+    assert (11, '2026-02-28') not in cursor.balances
+    assert ROLLUP_REFRESH_SQL not in cursor.statements and not cursor.logged
+
+
+@pytest.mark.parametrize("total_rows, bulk", [(5, False), (BULK_IMPORT_INFO['threshold'], True), (None, False)])
+def test_bulk_path_selected_by_total_rows(total_rows, bulk):
+    cursor = fake_cursor()
+    result = import_chunks(cursor, upload, '13800138000', subjects_df, total_rows=total_rows)
+    assert result['bulk'] == bulk
+    assert (STAGING_CREATE_SQL in cursor.statements) == bulk
+    # 两种方式的统计和写入结果相同
+    assert (result['rows'], result['inserted'], result['updated'], result['unchanged']) == (4, 2, 0, 2)
+    assert cursor.balances[(12, '2026-02-28')] == (500.0, '')
+    assert cursor.params_of(ROLLUP_REFRESH_SQL) == [('13800138000', '2026-02-01', '2026-03-01')]
+
+
+def test_same_day_rows_in_a_later_chunk_get_their_own_subject():
+    chunks = [
+        import_rows([('2026-01-31', '新卡', '资产', 1.0, '')]),
+        import_rows([('2026-02-28', '新卡', '资产', 2.0, ''), ('2026-02-28', '新卡', '资产', 3.0, '')]),
+    ]
+    cursor = fake_cursor()
+    result = import_chunks(cursor, chunks, '13800138000', subjects_df, chunk_size=1)
+    new_cards = [row for row in cursor.subjects if row[1] == '新卡']
+    assert [row[3] for row in new_cards] == [1, 2]
+    assert (result['new_subjects'], result['inserted']) == (2, 3)
+    assert {cursor.balances[(row[0], '2026-02-28')][0] for row in new_cards} == {2.0, 3.0}
+
+
+# 只差首尾空格或大小写的科目名称在库中是同一个科目：去掉空格后创建一次，各种写法都记到这个科目上
+def test_names_differing_in_spaces_or_case_are_one_subject():
+    chunks = [
+        import_rows([('2026-01-31', 'ETF ', '资产', 1.0, ''), ('2026-02-28', ' 现金', '资产', 2.0, '')]),
+        import_rows([('2026-02-28', 'etf', '资产', 3.0, ''), ('2026-03-31', 'Etf', '资产', 4.0, '')]),
+    ]
+    cursor = fake_cursor()
+    result = import_chunks(cursor, chunks, '13800138000', subjects_df, chunk_size=1)
+    etf = [row for row in cursor.subjects if collate(row[1]) == 'etf']
+    assert [row[1:] for row in etf] == [('ETF', '资产', 1)]
+    assert (result['new_subjects'], result['inserted'], result['updated']) == (1, 3, 1)
+    assert cursor.balances[(etf[0][0], '2026-02-28')] == (3.0, '')
+    assert cursor.balances[(1, '2026-02-28')] == (2.0, '')
+
+
+def test_same_day_names_differing_in_case_take_successive_seqs():
+    cleaned = clean_import_frame(import_rows([('2026-01-31', 'ETF', '资产', 1.0, ''), ('2026-01-31', 'etf ', '资产', 2.0, '')]))
+    assert cleaned['科目名称'].tolist() == ['ETF', 'etf']
+    assert cleaned['科目序号'].tolist() == [1, 2]
+
+
+# 期末余额口径下的总资产：每个科目取period_end之前的最后一条
+def as_of_assets(cursor, period_end):
+    rows = pd.DataFrame(
+        [(pb_id, subject_id, day, amount, remark) for pb_id, ((subject_id, day), (amount, remark)) in enumerate(cursor.balances.items())],
+        columns=['pb_id', 'subject_id', 'record_date', 'current_balance', 'remark']
+    ).assign(record_date=lambda df: pd.to_datetime(df['record_date']))
+    return summarize_detail(local_detail(rows, subjects_df, '2026-01-01', period_end, as_of=True))['总资产']
+
+
+# 已有记录的科目（现金）记0：写入，期末余额口径的总资产随之下降；从未记录过的科目记0不导入，也不创建科目
+def test_zero_amount_clears_a_held_subject():
+    cursor = fake_cursor()
+    assert as_of_assets(cursor, '2026-04-01') == 160.0
+    result = import_chunks(cursor, [import_rows([
+        ('2026-03-31', '现金', '资产', 0.0, ''), ('2026-03-31', '新科目', '资产', 0.0, ''), ('2026-03-31', '房贷', '负债', 0.0, ''),
+    ])], '13800138000', subjects_df)
+    assert (result['rows'], result['inserted'], result['new_subjects']) == (1, 1, 0)
+    assert cursor.balances[(1, '2026-03-31')] == (0.0, '')
+    assert as_of_assets(cursor, '2026-04-01') == 110.0
+    assert as_of_assets(cursor, '2026-03-31') == 160.0
+
+
+# 本文件中先记过非0金额的新科目，之后记0也写入
+def test_zero_amount_after_earlier_rows_in_the_file():
+    chunks = [import_rows([('2026-01-31', '新卡', '资产', 100.0, '')]), import_rows([('2026-02-28', '新卡', '资产', 0.0, '')])]
+    cursor = fake_cursor()
+    result = import_chunks(cursor, chunks, '13800138000', subjects_df)
+    assert (result['rows'], result['inserted'], result['new_subjects']) == (2, 2, 1)
+    assert as_of_assets(cursor, '2026-03-01') == 160.0
+
+
+# 模板中未填写金额的行：警告并跳过，不占用科目序号
+def test_blank_amount_rows_are_skipped():
+    chunk = import_rows([('2026-03-31', '现金', '资产', None, ''), ('2026-03-31', '现金', '资产', 20.0, '')])
+    cleaned, issues = check_import_frame(chunk)
+    assert issues[['行号', '级别', '原因']].values.tolist() == [[0, '警告', '金额为空，该行不导入']]
+    assert cleaned['科目序号'].tolist()[1] == 1
+    cursor = fake_cursor()
+    result = import_chunks(cursor, [chunk], '13800138000', subjects_df)
+    assert (result['rows'], result['inserted']) == (1, 1)
+    assert cursor.balances[(1, '2026-03-31')] == (20.0, '')
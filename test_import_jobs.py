@@ -0,0 +1,75 @@
+import threading
+import time
+from import_jobs import FAILED, SUCCEEDED, ImportJobQueue
+
+# 用记录执行顺序的runner代替真实导入（不连接数据库）
+def make_queue(runner, workers=1, keep_finished=200):
+    return ImportJobQueue(workers=workers, keep_finished=keep_finished, runner=runner)
+
+
+def wait_all(jobs, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not all(job.done for job in jobs) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert all(job.done for job in jobs)
+
+
+def test_users_take_turns():
+    order = []
+    started = threading.Event()
+    gate = threading.Event()
+
+    def runner(job):
+        started.set()
+        gate.wait()
+        order.append(job.file_name)
+        job.status = SUCCEEDED
+
+    queue = make_queue(runner)
+    # 第一个任务开始运行、占住唯一的工作线程之后再提交其余任务，其余任务都在排队
+    jobs = [queue.submit('A', 'A1', b'')]
+    assert started.wait(5)
+    jobs += [queue.submit(phone, name, b'') for phone, name in [('A', 'A2'), ('A', 'A3'), ('B', 'B1'), ('C', 'C1')]]
+    gate.set()
+    wait_all(jobs)
+    assert order == ['A1', 'B1', 'C1', 'A2', 'A3']
+
+
+def test_one_running_job_per_user():
+    running = []
+    peak = {}
+    lock = threading.Lock()
+    gate = threading.Event()
+
+    def runner(job):
+        with lock:
+            running.append(job.phone_number)
+            peak[job.phone_number] = max(peak.get(job.phone_number, 0), running.count(job.phone_number))
+        gate.wait()
+        with lock:
+            running.remove(job.phone_number)
+        job.status = SUCCEEDED
+
+    queue = make_queue(runner, workers=3)
+    jobs = [queue.submit('A', f'A{i}', b'') for i in range(4)] + [queue.submit('B', 'B1', b'')]
+    gate.set()
+    wait_all(jobs)
+    assert peak == {'A': 1, 'B': 1}
+
+
+def test_failures_and_pruning():
+    def runner(job):
+        if job.file_name == 'bad':
+            raise RuntimeError('boom')
+        job.status = SUCCEEDED
+
+    queue = make_queue(runner, keep_finished=2)
+    jobs = [queue.submit('A', name, b'data') for name in ['ok1', 'bad', 'ok2']]
+    wait_all(jobs)
+    assert jobs[1].status == FAILED and 'boom' in jobs[1].message
+    # 结束后释放文件内容，只保留最近的2个任务
+    assert all(job.content is None for job in jobs)
+    assert [job.file_name for job in queue.jobs_for('A')] == ['ok2', 'bad']
+    assert queue.get(jobs[0].job_id) is None
+    stats = queue.stats()
+    assert (stats['submitted'], stats['succeeded'], stats['failed'], stats['pending'], stats['running']) == (3, 2, 1, 0, 0)
@@ -0,0 +1,121 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import pytest
+import local_store
+from local_store import COUNT_SQL, DELTA_SQL, SNAPSHOT_SQL, LocalStore, local_detail, local_trend
+from result_cache import invalidate_user
+
+PHONE = '13800000011'
+subjects_df = pd.DataFrame({'subject_id': [1, 2, 3], 'subject_name': ['现金', '房产', '房贷'], 'subject_type': ['资产', '资产', '负债']})
+
+
+# 模拟库中的明细表：按SQL返回全量/增量/行数，并记录执行过的语句
+class FakeDatabase:
+    def __init__(self, rows):
+        self.rows = pd.DataFrame(rows, columns=['pb_id', 'subject_id', 'record_date', 'current_balance', 'remark', 'updated_at'])
+        self.statements = []
+        self.down = False
+
+    @contextmanager
+    def connection(self):
+        if self.down:
+            raise ConnectionError("数据库不可用")
+        yield self
+
+    def read_sql(self, sql, conn, params=None):
+        self.statements.append(sql)
+        if sql == COUNT_SQL:
+            pb_ids = self.rows['pb_id']
+            return pd.DataFrame({'n': [len(pb_ids)], 'max_id': [pb_ids.max()], 'sum_id': [pb_ids.sum()]})
+        if sql == DELTA_SQL:
+            return self.rows[pd.to_datetime(self.rows['updated_at']) >= params[1]].copy()
+        assert sql == SNAPSHOT_SQL
+        return self.rows.copy()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDatabase([
+        (1, 1, '2026-01-31', 100.0, '', datetime(2026, 2, 1, 9)),
+        (2, 2, '2026-01-31', 1000.0, '', datetime(2026, 2, 1, 9)),
+        (3, 3, '2026-01-31', 500.0, '', datetime(2026, 2, 1, 9)),
+        (4, 1, '2026-02-28', 150.0, '', datetime(2026, 3, 1, 9)),
+    ])
+    monkeypatch.setattr(local_store.pd, 'read_sql', db.read_sql)
+    return db
+
+
+def test_full_then_incremental_sync(db, tmp_path):
+    store = LocalStore(str(tmp_path), sync_seconds=3600, connection=db.connection)
+    assert len(store.rows(PHONE)) == 4
+    assert (tmp_path / f"{PHONE}.parquet").exists()
+
+    # 间隔内不再访问数据库
+    store.rows(PHONE)
+    assert db.statements == [SNAPSHOT_SQL]
+
+    # 导入后（版本号变化）只拉取修改和新增的行
+    db.rows.loc[db.rows['pb_id'] == 4, ['current_balance', 'updated_at']] = [160.0, datetime(2026, 3, 2, 9)]
+    db.rows.loc[len(db.rows)] = (5, 2, '2026-03-31', 1100.0, '', datetime(2026, 4, 1, 9))
+    invalidate_user(PHONE)
+    rows = store.rows(PHONE)
+    assert db.statements[1:] == [DELTA_SQL, COUNT_SQL]
+    assert sorted(rows['pb_id']) == [1, 2, 3, 4, 5]
+    assert rows.set_index('pb_id').loc[4, 'current_balance'] == 160.0
+    assert store.stats()['delta_rows'] == 2
+
+    # 新进程从本地文件继续增量同步
+    assert len(LocalStore(str(tmp_path), connection=db.connection).rows(PHONE)) == 5
+    assert db.statements[-2:] == [DELTA_SQL, COUNT_SQL]
+
+
+def test_deleted_rows_trigger_full_sync(db, tmp_path):
+    store = LocalStore(str(tmp_path), sync_seconds=0, connection=db.connection)
+    store.rows(PHONE)
+    db.rows = db.rows[db.rows['pb_id'] != 2]
+    rows = store.rows(PHONE)
+    assert sorted(rows['pb_id']) == [1, 3, 4]
+    assert store.stats()['full_syncs'] == 2
+
+
+# 删除一行的同时，有一行updated_at早于本地最新updated_at的记录（并发导入中较晚提交的事务）写入，
+# 增量拉取不到它，行数不变；same-max-id 时另有一行正常拉取到，pb_id的最大值也不变
+@pytest.mark.parametrize("extra_rows", [[], [(6, 3, '2026-03-31', 400.0, '', datetime(2026, 4, 1, 9))]],
+                         ids=['new-max-id', 'same-max-id'])
+def test_delete_plus_late_insert_triggers_full_sync(db, tmp_path, extra_rows):
+    store = LocalStore(str(tmp_path), sync_seconds=0, connection=db.connection)
+    store.rows(PHONE)
+    db.rows = db.rows[db.rows['pb_id'] != 2].reset_index(drop=True)
+    for row in [(5, 2, '2026-03-31', 1100.0, '', datetime(2026, 2, 15, 9))] + extra_rows:
+        db.rows.loc[len(db.rows)] = row
+    rows = store.rows(PHONE)
+    assert sorted(rows['pb_id']) == sorted(db.rows['pb_id'])
+    assert store.stats()['full_syncs'] == 2
+
+
+def test_stale_snapshot_used_when_database_is_down(db, tmp_path):
+    store = LocalStore(str(tmp_path), sync_seconds=0, connection=db.connection)
+    store.rows(PHONE)
+    db.down = True
+    assert len(store.rows(PHONE)) == 4
+    assert store.stats()['stale_reads'] == 1
+    with pytest.raises(ConnectionError):
+        LocalStore(str(tmp_path / "empty"), connection=db.connection).rows(PHONE)
+
+
+def test_local_results_match_sql_semantics(db, tmp_path):
+    rows = LocalStore(str(tmp_path), connection=db.connection).rows(PHONE)
+
+    # 期间累计：第一季度现金记了两次，相加
+    totals = local_detail(rows, subjects_df, '2026-01-01', '2026-04-01').set_index('subject_name')
+    assert totals['current_balance'].to_dict() == {'现金': 250.0, '房产': 1000.0, '房贷': 500.0}
+    # 期末余额：每个科目取最后一条
+    latest = local_detail(rows, subjects_df, '2026-01-01', '2026-04-01', as_of=True).set_index('subject_name')
+    assert latest['current_balance'].to_dict() == {'现金': 150.0, '房产': 1000.0, '房贷': 500.0}
+
+    trend = local_trend(rows, subjects_df, '月度', '2026-03-01', 3)
+    assert trend.values.tolist() == [['2026-01', 1100.0, 500.0], ['2026-02', 150.0, 0.0]]
+    trend = local_trend(rows, subjects_df, '月度', '2026-03-01', 3, as_of=True)
+    assert trend.values.tolist() == [['2026-01', 1100.0, 500.0], ['2026-02', 1150.0, 500.0], ['2026-03', 1150.0, 500.0]]
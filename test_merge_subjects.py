@@ -0,0 +1,44 @@
+import pandas as pd
+from data_import import clean_import_frame, subjects_needed
+from merge_subjects import plan_subject_merge
+
+# 科目5/6/7是旧版导入产生的重复"基金"科目；11/12是两张同名银行卡，同一天都有记录
+subjects_df = pd.DataFrame({
+    'subject_id': [1, 5, 6, 7, 11, 12],
+    'subject_name': ['现金', '基金', '基金', '基金', '银行卡【浦发】', '银行卡【浦发】'],
+    'subject_type': ['资产'] * 6,
+})
+
+balances_df = pd.DataFrame({
+    'pb_id': [1, 2, 3, 4, 5, 6],
+    'phone_number': ['13800138000'] * 6,
+    'subject_id': [1, 5, 6, 7, 11, 12],
+    'record_date': ['2026-01-31', '2026-01-31', '2026-02-28', '2026-03-31', '2026-01-31', '2026-01-31'],
+    'current_balance': [100.0, 200.0, 300.0, 400.0, 500.0, 600.0],
+    'remark': [''] * 6,
+})
+
+
+def test_duplicates_collapse_to_one_subject():
+    remapped, kept, removed = plan_subject_merge(subjects_df, balances_df)
+    assert sorted(removed) == [6, 7]
+    # 基金在6、7上的记录改挂到5
+    assert remapped.set_index('pb_id')['new_subject_id'].to_dict() == {3: 5, 4: 5}
+
+
+def test_same_day_duplicates_are_kept():
+    _, kept, removed = plan_subject_merge(subjects_df, balances_df)
+    assert 11 not in removed and 12 not in removed
+    pufa = kept[kept['subject_name'] == '银行卡【浦发】']
+    assert pufa['subject_seq'].tolist() == [1, 2]
+
+
+def test_subjects_needed_counts_same_day_rows():
+    df = pd.DataFrame({
+        '日期': ['2026-01-31', '2026-01-31', '2026-02-28', '2026-02-28'],
+        '科目名称': ['新卡', '新卡', '新卡', '新基金'],
+        '科目类型': ['资产'] * 4,
+        '金额': [1.0] * 4,
+    })
+    needed = subjects_needed(clean_import_frame(df))
+    assert list(needed.itertuples(index=False, name=None)) == [('新卡', '资产', 1), ('新卡', '资产', 2), ('新基金', '资产', 1)]
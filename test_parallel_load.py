@@ -0,0 +1,39 @@
+import threading
+import time
+import pytest
+from parallel_load import load_concurrently
+
+
+def sleeper(seconds, value):
+    def run():
+        time.sleep(seconds)
+        return value
+    return run
+
+
+def test_tasks_run_concurrently():
+    results, timings = load_concurrently({'a': sleeper(0.2, 1), 'b': sleeper(0.2, 2)})
+    assert results == {'a': 1, 'b': 2}
+    assert timings['顺序合计'] >= 0.4
+    assert timings['并发墙钟'] < 0.35
+
+
+def test_wrap_runs_in_worker_thread():
+    threads = []
+
+    def wrap(func):
+        def run():
+            threads.append(threading.current_thread().name)
+            return func()
+        return run
+
+    load_concurrently({'a': sleeper(0, 1), 'b': sleeper(0, 2)}, wrap=wrap)
+    assert len(threads) == 2 and all(name.startswith('dashboard-loader') for name in threads)
+
+
+def test_errors_propagate():
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        load_concurrently({'a': sleeper(0, 1), 'b': fail})
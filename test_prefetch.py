@@ -0,0 +1,62 @@
+import threading
+from period_utils import period_dates
+from prefetch import Prefetcher
+
+
+def test_period_dates_match_selectors():
+    assert period_dates('年度', 2026) == ('2026-01-01', '2026-12-31')
+    assert period_dates('季度', 2026, 1) == ('2026-01-01', '2026-03-31')
+    assert period_dates('季度', 2026, 4) == ('2026-10-01', '2026-12-31')
+    assert period_dates('月度', 2024, 2) == ('2024-02-01', '2024-02-29')
+    assert period_dates('月度', 2026, 12) == ('2026-12-01', '2026-12-31')
+
+
+def test_tasks_run_in_order_and_failures_are_counted():
+    done = threading.Event()
+    calls = []
+
+    def fail():
+        raise RuntimeError("数据库不可用")
+
+    prefetcher = Prefetcher(workers=1)
+    prefetcher.start('13800000001', [lambda: calls.append(1), fail, lambda: calls.append(2), done.set])
+    assert done.wait(5)
+    assert calls == [1, 2]
+    stats = prefetcher.stats()
+    assert (stats['tasks'], stats['failed']) == (3, 1)
+
+
+def test_cancel_stops_remaining_tasks():
+    blocker = threading.Event()
+    running = threading.Event()
+    calls = []
+
+    def first():
+        running.set()
+        blocker.wait(5)
+        calls.append('first')
+
+    prefetcher = Prefetcher(workers=1)
+    prefetcher.start('13800000002', [first, lambda: calls.append('second')])
+    assert running.wait(5)
+    prefetcher.cancel('13800000002')
+    blocker.set()
+    prefetcher._executor.shutdown(wait=True)
+    # 正在执行的任务会执行完，之后的任务不再执行
+    assert calls == ['first']
+    assert prefetcher.stats()['cancelled'] == 1
+    assert prefetcher.stats()['active'] == 0
+
+
+def test_pending_users_are_bounded():
+    blocker = threading.Event()
+    prefetcher = Prefetcher(workers=1, max_pending=2)
+    assert prefetcher.start('13800000003', [lambda: blocker.wait(5)])
+    assert prefetcher.start('13800000004', [lambda: None])
+    assert not prefetcher.start('13800000005', [lambda: None])
+    # 同一用户重新开始时取消旧的预取，不占用额外名额
+    assert prefetcher.start('13800000004', [lambda: None])
+    blocker.set()
+    prefetcher._executor.shutdown(wait=True)
+    stats = prefetcher.stats()
+    assert (stats['started'], stats['rejected'], stats['cancelled'], stats['active']) == (3, 1, 1, 0)
@@ -0,0 +1,75 @@
+import json
+import pymysql
+import query_metrics
+from query_metrics import InstrumentedCursor, fingerprint, fingerprint_id, prometheus_text, query_stats, record_cache
+
+
+def test_fingerprint_ignores_literals_and_value_lists():
+    assert fingerprint("SELECT *\n  FROM t WHERE a = %s AND b = 'x' LIMIT 10") == "SELECT * FROM t WHERE a = ? AND b = ? LIMIT ?"
+    # executemany展开的多行INSERT与单行归为同一条语句
+    many = b"INSERT INTO t (a, b) VALUES ('1', 2),('3', 4),('5', 6)"
+    assert fingerprint(many) == fingerprint("INSERT INTO t (a, b) VALUES (%s, %s)")
+
+
+def test_fingerprint_collapses_in_lists():
+    # IN列表的长度随导入的数据变化，不同长度归为同一条语句
+    two = fingerprint("SELECT a FROM t WHERE name IN (%s, %s) AND b = %s")
+    assert two == "SELECT a FROM t WHERE name IN (...) AND b = ?"
+    assert fingerprint(b"SELECT a FROM t WHERE name IN ('x','y','z') AND b = 1") == two
+
+
+def test_query_map_is_bounded(monkeypatch):
+    monkeypatch.setattr(query_metrics, '_queries', {})
+    monkeypatch.setitem(query_metrics.METRICS_INFO, 'max_fingerprints', 3)
+    for i in range(10):
+        query_metrics.record_query(f"SELECT c{i} FROM t_test_bounded", None, 0.001, 1, 'app.get_data')
+    stats = {row['SQL']: row['次数'] for row in query_stats()}
+    assert len(stats) == 4
+    # 超出上限的语句仍计入总数
+    assert stats[query_metrics.OVERFLOW_KEY[0]] == 7
+
+
+def test_executemany_is_recorded_once_with_caller(monkeypatch):
+    def fake_execute(self, query, args=None):
+        self.rowcount = 1
+        return 1
+
+    monkeypatch.setattr(pymysql.cursors.Cursor, 'execute', fake_execute)
+    cursor = InstrumentedCursor(None)
+    sql = "UPDATE t_test_metrics SET a = %s WHERE b = %s"
+    cursor.executemany(sql, [(1, 2), (3, 4), (5, 6)])
+    cursor.execute(sql, (7, 8))
+
+    row, = [row for row in query_stats() if row['指纹'] == fingerprint_id(fingerprint(sql))]
+    # executemany内部逐行调用execute，只记录外层一次
+    assert row['次数'] == 2
+    assert row['行数'] == 4
+    assert row['调用函数'] == 'test_query_metrics.test_executemany_is_recorded_once_with_caller'
+
+
+def test_slow_queries_keep_params(monkeypatch):
+    monkeypatch.setitem(query_metrics.METRICS_INFO, 'slow_ms', 0)
+    query_metrics.record_query("SELECT 1 FROM t_test_slow WHERE a = %s", ('13800000001',), 0.002, 1, 'app.get_data')
+    assert query_metrics.slow_queries()[-1]['params'] == "('13800000001',)"
+
+
+def test_metrics_file_formats(tmp_path, monkeypatch):
+    path = tmp_path / "metrics.jsonl"
+    monkeypatch.setitem(query_metrics.METRICS_INFO, 'file', str(path))
+    monkeypatch.setattr(query_metrics, '_export', {'file': None, 'flushed_at': 0.0})
+    query_metrics.record_query("SELECT a FROM t_test_file WHERE b = %s", (1,), 0.01, 3, 'app.get_trend_data')
+    record_cache('get_trend_data', 'hit')
+    query_metrics._export['file'].close()
+    events = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [event['kind'] for event in events] == ['query', 'cache']
+    assert events[0]['rows'] == 3 and events[0]['caller'] == 'app.get_trend_data'
+
+    path = tmp_path / "metrics.prom"
+    monkeypatch.setitem(query_metrics.METRICS_INFO, 'file', str(path))
+    monkeypatch.setitem(query_metrics.METRICS_INFO, 'format', 'prometheus')
+    query_metrics.record_query("SELECT a FROM t_test_file WHERE b = %s", (2,), 0.01, 3, 'app.get_trend_data')
+    text = path.read_text(encoding='utf-8')
+    assert text == prometheus_text()
+    fid = fingerprint_id(fingerprint("SELECT a FROM t_test_file WHERE b = %s"))
+    assert f'balance_query_total{{fingerprint="{fid}",caller="app.get_trend_data"}} 2' in text
+    assert 'balance_cache_events_total{cache="get_trend_data",event="hit"}' in text
@@ -0,0 +1,75 @@
+import pymysql
+import pytest
+from datetime import date, timedelta
+from period_utils import period_range, trend_window
+from queries import ASOF_DETAIL_SQL, DETAIL_SQL, PERIOD_TOTALS_SQL, ROLLUP_REFRESH_SQL, SUMMARY_SQL, detail_page_sql, trend_sql
+
+# 用EXPLAIN验证看板明细查询走 idx_user_date (phone_number, record_date, ...) 的范围扫描，
+# 趋势查询走月度汇总表主键 (phone_number, period_month, ...) 的范围扫描，
+# 期末余额查询在 idx_user_subject_date (phone_number, subject_id, record_date) 上做松散索引扫描，
+# 按日期排序的明细分页沿 idx_user_date 按 (record_date, subject_id) 读取，不排序
+# 测试数据写入测试库（见conftest.py），在事务中写入，测试结束后回滚，不会留在库里
+TEST_PHONE = '19900000000'
+
+
+@pytest.fixture(scope="module")
+def conn(test_db, seed_balances):
+    with test_db.cursor() as cursor:
+        cursor.execute("SELECT subject_id FROM t_personal_subject ORDER BY subject_id LIMIT 5")
+        subject_ids = [row[0] for row in cursor.fetchall()]
+
+        # 模拟多年的每日记录，让优化器在日期区间上有明显的选择性
+        start = date(2022, 1, 1)
+        seed_balances(TEST_PHONE, [
+            (subject_id, (start + timedelta(days=d)).strftime("%Y-%m-%d"), 100.0)
+            for d in range(365 * 5)
+            for subject_id in subject_ids
+        ])
+        cursor.execute(ROLLUP_REFRESH_SQL, (TEST_PHONE, '2022-01-01', '2027-01-01'))
+    return test_db
+
+
+def explain_balance_table(conn, sql, params, table='b'):
+    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    cursor.execute("EXPLAIN " + sql, params)
+    plan = [row for row in cursor.fetchall() if row['table'] == table]
+    cursor.close()
+    assert len(plan) == 1
+    return plan[0]
+
+
+@pytest.mark.parametrize("time_period_type, start_date, end_date", [
+    ('年度', '2025-01-01', '2025-12-31'),
+    ('季度', '2025-04-01', '2025-06-30'),
+    ('月度', '2025-06-01', '2025-07-01'),
+    ('自定义', '2025-03-15', '2025-08-20'),
+])
+@pytest.mark.parametrize("sql", [DETAIL_SQL, PERIOD_TOTALS_SQL, SUMMARY_SQL], ids=['detail', 'totals', 'summary'])
+def test_period_queries_use_date_index(conn, sql, time_period_type, start_date, end_date):
+    params = (TEST_PHONE, *period_range(time_period_type, start_date, end_date))
+    plan = explain_balance_table(conn, sql, params)
+    assert plan['key'] == 'idx_user_date'
+    assert plan['type'] == 'range'
+
+
+@pytest.mark.parametrize("time_period_type", ['年度', '季度', '月度'])
+def test_trend_query_uses_rollup_primary_key(conn, time_period_type):
+    _, window_start, window_end = trend_window(time_period_type, '2025-06-01', 3)
+    plan = explain_balance_table(conn, trend_sql(time_period_type), (TEST_PHONE, window_start, window_end), table='m')
+    assert plan['key'] == 'PRIMARY'
+    assert plan['type'] == 'range'
+
+
+def test_asof_latest_uses_loose_index_scan(conn):
+    plan = explain_balance_table(conn, ASOF_DETAIL_SQL, (TEST_PHONE, '2026-01-01'), table='l')
+    assert plan['key'] == 'idx_user_subject_date'
+    assert 'Using index for group-by' in plan['Extra']
+
+
+@pytest.mark.parametrize("sort", ['日期（新→旧）', '日期（旧→新）'])
+@pytest.mark.parametrize("after", [None, ('2024-06-30', 1)], ids=['first', 'next'])
+def test_detail_page_reads_in_index_order(conn, sort, after):
+    sql, params = detail_page_sql(TEST_PHONE, '2022-01-01', '2027-01-01', sort, after=after)
+    plan = explain_balance_table(conn, sql, params)
+    assert plan['key'] == 'idx_user_date'
+    assert 'filesort' not in (plan['Extra'] or '')
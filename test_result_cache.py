@@ -0,0 +1,135 @@
+import threading
+import time
+import pandas as pd
+import result_cache
+from result_cache import cache_stats, catalog_cache, invalidate_catalog, invalidate_user, user_cache
+
+calls = []
+
+
+@user_cache("test_user_query")
+def user_query(period, phone_number=None):
+    calls.append((period, phone_number))
+    return f"{phone_number}:{period}"
+
+
+@catalog_cache("test_catalog_query")
+def catalog_query():
+    calls.append('catalog')
+    return ['现金', '房贷']
+
+
+def test_import_only_invalidates_that_user():
+    calls.clear()
+    user_query('2026', phone_number='13800000001')
+    user_query('2026', phone_number='13800000002')
+    user_query('2026', phone_number='13800000001')
+    assert len(calls) == 2
+
+    invalidate_user('13800000001')
+    user_query('2026', phone_number='13800000001')
+    user_query('2026', phone_number='13800000002')
+    assert calls[-1] == ('2026', '13800000001')
+    assert len(calls) == 3
+
+    stats = cache_stats()['test_user_query']
+    assert stats['hits'] == 2
+    assert stats['misses'] == 3
+    assert stats['evictions'] == 1
+
+
+def test_user_import_keeps_catalog_cache():
+    calls.clear()
+    catalog_query()
+    invalidate_user('13800000001')
+    catalog_query()
+    assert calls == ['catalog']
+
+    invalidate_catalog()
+    catalog_query()
+    assert calls == ['catalog', 'catalog']
+
+
+def test_result_computed_during_import_is_not_stored():
+    calls.clear()
+
+    # 模拟查询过程中该用户导入了新数据
+    @user_cache("test_racing_query")
+    def racing_query(phone_number=None):
+        calls.append(phone_number)
+        invalidate_user(phone_number)
+        return 'stale'
+
+    racing_query(phone_number='13800000003')
+    racing_query(phone_number='13800000003')
+    assert len(calls) == 2
+    assert result_cache.cache_stats()['test_racing_query']['entries'] == 0
+
+
+def test_lru_eviction_by_entry_count():
+    @user_cache("test_lru_entries", max_entries=2, max_bytes=None)
+    def query(period, phone_number=None):
+        calls.append(period)
+        return period
+
+    calls.clear()
+    query('2024', phone_number='13800000004')
+    query('2025', phone_number='13800000004')
+    query('2024', phone_number='13800000004')   # 2024变为最近使用
+    query('2026', phone_number='13800000004')   # 淘汰最久未使用的2025
+    query('2024', phone_number='13800000004')
+    query('2025', phone_number='13800000004')
+    assert calls == ['2024', '2025', '2026', '2025']
+    assert cache_stats()['test_lru_entries']['lru_evictions'] == 2
+
+
+def test_byte_budget_uses_dataframe_memory():
+    frame = pd.DataFrame({'subject_name': ['银行卡存款'] * 1000, 'current_balance': [1.0] * 1000})
+    nbytes = result_cache.value_nbytes(frame)
+    assert nbytes == frame.memory_usage(index=True, deep=True).sum()
+
+    @user_cache("test_lru_bytes", max_entries=None, max_bytes=int(nbytes * 2.5))
+    def query(period, phone_number=None):
+        return frame.copy()
+
+    for period in ['2023', '2024', '2025']:
+        query(period, phone_number='13800000005')
+    stats = cache_stats()['test_lru_bytes']
+    assert stats['entries'] == 2
+    assert stats['bytes'] <= stats['max_bytes']
+
+    @user_cache("test_lru_oversized", max_entries=None, max_bytes=nbytes - 1)
+    def too_big(phone_number=None):
+        return frame
+
+    too_big(phone_number='13800000005')
+    assert cache_stats()['test_lru_oversized']['entries'] == 0
+    assert cache_stats()['test_lru_oversized']['oversized'] == 1
+
+
+def test_concurrent_callers_share_one_computation():
+    started = threading.Event()
+    release = threading.Event()
+
+    # 模拟后台预取正在查询时，页面也请求同一个键
+    @user_cache("test_single_flight")
+    def slow_query(period, phone_number=None):
+        calls.append(period)
+        started.set()
+        release.wait(5)
+        return period
+
+    calls.clear()
+    results = []
+    prefetch = threading.Thread(target=lambda: results.append(slow_query('2026', phone_number='13800000006')))
+    prefetch.start()
+    started.wait(5)
+    page = threading.Thread(target=lambda: results.append(slow_query('2026', phone_number='13800000006')))
+    page.start()
+    time.sleep(0.05)
+    release.set()
+    prefetch.join(5)
+    page.join(5)
+    assert results == ['2026', '2026']
+    assert calls == ['2026']
+    assert cache_stats()['test_single_flight']['joined'] == 1
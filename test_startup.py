@@ -0,0 +1,28 @@
+import json
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 在新进程中运行首屏，进程内已导入的模块不影响结果
+FIRST_PAINT = f"""
+import json, sys
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({os.path.join(APP_DIR, 'app.py')!r}, default_timeout=60).run()
+print(json.dumps({{
+    'exceptions': [e.value for e in at.exception],
+    'form': [w.label for w in at.text_input],
+    'loaded': [m for m in ('plotly.express', 'openpyxl', 'pyarrow.parquet') if m in sys.modules],
+}}))
+"""
+
+
+def test_first_paint_does_not_load_chart_or_excel_modules():
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [APP_DIR, os.environ.get('PYTHONPATH')])))
+    proc = subprocess.run([sys.executable, "-c", FIRST_PAINT], capture_output=True, text=True, env=env, cwd=APP_DIR, timeout=120)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert result['exceptions'] == []
+    assert result['form'] == ['手机号']
+    assert result['loaded'] == []
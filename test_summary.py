@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+from period_utils import period_range
+from queries import DETAIL_SQL, PERIOD_TOTALS_SQL, SUMMARY_SQL, detail_page_sql, summarize_detail
+
+# 验证由明细数据计算的汇总与原来单独的汇总查询（SUMMARY_SQL）结果一致
+TEST_PHONE = '19900000002'
+
+
+def test_summary_from_detail():
+    df_detail = pd.DataFrame({
+        'subject_name': ['现金', '房产', '房贷', '已删除科目'],
+        'subject_type': ['资产', '资产', '负债', None],
+        'current_balance': [1500.0, 1000000.0, 795000.0, 999.0],
+    })
+    df_sum = summarize_detail(df_detail)
+    assert df_sum.to_dict() == {'总资产': 1001500.0, '总负债': 795000.0, '净资产': 206500.0}
+
+
+def test_empty_detail_gives_zero_summary():
+    df_detail = pd.DataFrame(columns=['subject_name', 'subject_type', 'current_balance', 'remark', 'record_date'])
+    df_sum = summarize_detail(df_detail)
+    assert df_sum.to_dict() == {'总资产': 0.0, '总负债': 0.0, '净资产': 0.0}
+
+
+# 测试数据写入测试库（见conftest.py），模块结束后回滚
+@pytest.fixture(scope="module")
+def conn(test_db, seed_balances):
+    with test_db.cursor() as cursor:
+        cursor.execute("SELECT subject_id FROM t_personal_subject ORDER BY subject_id")
+        subject_ids = [row[0] for row in cursor.fetchall()]
+    seed_balances(TEST_PHONE, [
+        (subject_id, f"2025-{month:02d}-28", 1000.0 * month + subject_id)
+        for month in range(1, 13)
+        for subject_id in subject_ids
+    ])
+    return test_db
+
+
+@pytest.mark.parametrize("time_period_type, start_date, end_date", [
+    ('年度', '2025-01-01', '2025-12-31'),
+    ('季度', '2025-04-01', '2025-06-30'),
+    ('月度', '2025-06-01', '2025-07-01'),
+    ('自定义', '2025-03-15', '2025-08-20'),
+    ('年度', '2030-01-01', '2030-12-31'),
+])
+@pytest.mark.parametrize("detail_sql", [DETAIL_SQL, PERIOD_TOTALS_SQL], ids=['detail', 'totals'])
+def test_matches_two_query_version(conn, detail_sql, time_period_type, start_date, end_date):
+    params = (TEST_PHONE, *period_range(time_period_type, start_date, end_date))
+    df_detail = pd.read_sql(detail_sql, conn, params=params)
+    expected = pd.read_sql(SUMMARY_SQL, conn, params=params).iloc[0].fillna(0).astype(float)
+    actual = summarize_detail(df_detail)
+    pd.testing.assert_series_equal(actual, expected, check_names=False, check_exact=False)
+
+
+def test_detail_page_sql_keyset_params():
+    sql, params = detail_page_sql('13800000001', '2026-01-01', '2027-01-01', '金额（低→高）', subject_type='资产',
+                                  after=(100.0, 7), page_size=20)
+    assert "ORDER BY b.current_balance ASC, b.pb_id ASC" in sql
+    assert "(b.current_balance > %s OR (b.current_balance = %s AND b.pb_id > %s))" in sql
+    assert params == ('13800000001', '2026-01-01', '2027-01-01', '资产', 100.0, 100.0, 7, 21)
+    assert sql.count('%s') == len(params)
+
+
+def test_detail_page_sql_date_sort_breaks_ties_by_subject():
+    sql, params = detail_page_sql('13800000001', '2026-01-01', '2027-01-01', '日期（新→旧）',
+                                  after=('2026-03-31', 5), page_size=20)
+    # 与 idx_user_date (phone_number, record_date, subject_id, ...) 的顺序一致
+    assert "ORDER BY b.record_date DESC, b.subject_id DESC" in sql
+    assert "(b.record_date < %s OR (b.record_date = %s AND b.subject_id < %s))" in sql
+    assert params == ('13800000001', '2026-01-01', '2027-01-01', '2026-03-31', '2026-03-31', 5, 21)